@@ -146,6 +146,18 @@ interface RecordingResult {
   videoPath: string;
   outputDir: string;
   events: InteractionEvent[];
+  idlePausedAtCapture: boolean;
+  media: VideoMeta | null;
+}
+
+// VIDEO_META line: the recorder's single ffprobe of the video
+interface VideoMeta {
+  duration: number;
+  codec: string | null;
+  width: number | null;
+  height: number | null;
+  frames: number | null;
+  bitrate: number | null;
 }
 
 async function createSandbox(apiKey: string): Promise<{ daytona: Daytona; sandbox: Sandbox }> {
@@ -260,7 +272,20 @@ async function recordVideo(
     throw new Error(`Demo recorder did not produce a video.\nOutput:\n${output}`);
   }
 
-  return { verdict, reasoning, videoPath, outputDir, events };
+  // Idle LLM think time already paused out of the capture → no freezes to remove
+  const idlePausedAtCapture = getLine("IDLE_REMOVED_SEC") !== "";
+
+  let media: VideoMeta | null = null;
+  const metaLine = getLine("VIDEO_META");
+  if (metaLine) {
+    try {
+      media = JSON.parse(metaLine) as VideoMeta;
+    } catch {
+      console.log("[recordVideo] failed to parse VIDEO_META, ignoring");
+    }
+  }
+
+  return { verdict, reasoning, videoPath, outputDir, events, idlePausedAtCapture, media };
 }
 
 
@@ -272,6 +297,7 @@ async function postprocessVideo(
   sandbox: Sandbox,
   videoPath: string,
   events: InteractionEvent[],
+  freezeRemoval = true,
   width = 1920,
   height = 1080,
 ): Promise<string> {
@@ -285,7 +311,8 @@ async function postprocessVideo(
 
   // Run the pre-baked postprocess script from the snapshot
   const result = await sandbox.process.executeCommand(
-    `node /opt/aura/postprocess.mjs "${videoPath}" "${outputPath}" /tmp/aura_events.json /opt/aura/cursor.png ${width} ${height}`,
+    `node /opt/aura/postprocess.mjs "${videoPath}" "${outputPath}" /tmp/aura_events.json /opt/aura/cursor.png ${width} ${height}` +
+    (freezeRemoval ? "" : " --no-freeze-removal"),
     undefined, undefined, 180,
   );
 
@@ -416,7 +443,10 @@ async function runPipeline(msg: PrPipelineMessage, env: Env): Promise<void> {
           log("step 10.5", `post-processing video with ${recording.events.length} event(s)`);
           await updateComment("✨ Post-processing video (zoom effects, cursor overlay)...");
           try {
-            finalVideoPath = await postprocessVideo(sandbox, recording.videoPath, recording.events);
+            finalVideoPath = await postprocessVideo(
+              sandbox, recording.videoPath, recording.events, !recording.idlePausedAtCapture,
+              recording.media?.width ?? undefined, recording.media?.height ?? undefined,
+            );
             log("step 10.5", `post-processing done: ${finalVideoPath}`);
           } catch (ppErr) {
             const ppMsg = ppErr instanceof Error ? ppErr.message : String(ppErr);
@@ -0,0 +1,97 @@
+"""
+import_bench.py — import-time budget for demo_recorder, fails when exceeded.
+
+Each check runs in a fresh interpreter (several times, median taken) so
+nothing is cached in sys.modules:
+
+    import       `import demo_recorder` plus the light public names
+                 (DiffAnalyzer, build_prompt)
+    help         `python -m demo_recorder.cli --help`, interpreter startup
+                 subtracted
+
+Both must stay under their budget and must not load any of the heavy
+modules (browser_use, langchain, httpx, ...). Exits 1 otherwise, so CI
+can run it as a gate:
+
+    uv run python benchmarks/import_bench.py
+    uv run python benchmarks/import_bench.py --import-budget-ms 50 --help-budget-ms 150 --runs 9
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY = ("browser_use", "langchain_core", "httpx", "playwright", "cdp_use", "dotenv")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import demo_recorder
+from demo_recorder import DiffAnalyzer, build_prompt
+elapsed = time.perf_counter() - started
+print(json.dumps({{"sec": elapsed, "heavy": [m for m in {HEAVY!r} if m in sys.modules]}}))
+"""
+
+HELP_PROBE = f"""
+import json, runpy, sys
+sys.argv = ["record-demo", "--help"]
+try:
+    runpy.run_module("demo_recorder.cli", run_name="__main__")
+except SystemExit:
+    pass
+print(json.dumps({{"heavy": [m for m in {HEAVY!r} if m in sys.modules]}}), file=sys.stderr)
+"""
+
+
+def run(code: str) -> tuple[float, str, str]:
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return time.perf_counter() - started, proc.stdout, proc.stderr
+
+
+def measure_import(runs: int) -> tuple[float, list[str]]:
+    samples, heavy = [], set()
+    for _ in range(runs):
+        _, out, _ = run(IMPORT_PROBE)
+        probe = json.loads(out.strip().splitlines()[-1])
+        samples.append(probe["sec"])
+        heavy.update(probe["heavy"])
+    return statistics.median(samples), sorted(heavy)
+
+
+def measure_help(runs: int) -> tuple[float, list[str]]:
+    baseline = statistics.median(run("pass")[0] for _ in range(runs))
+    samples, heavy = [], set()
+    for _ in range(runs):
+        wall, _, err = run(HELP_PROBE)
+        samples.append(wall - baseline)
+        heavy.update(json.loads(err.strip().splitlines()[-1])["heavy"])
+    return max(0.0, statistics.median(samples)), sorted(heavy)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fail if demo_recorder imports or --help exceed their time budget")
+    parser.add_argument("--import-budget-ms", type=float, default=100.0, help="Budget for `import demo_recorder` (default: 100)")
+    parser.add_argument("--help-budget-ms", type=float, default=250.0, help="Budget for `record-demo --help` (default: 250)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per check; the median counts (default: 5)")
+    args = parser.parse_args()
+
+    failed = False
+    for name, (sec, heavy), budget_ms in (
+        ("import demo_recorder", measure_import(args.runs), args.import_budget_ms),
+        ("record-demo --help", measure_help(args.runs), args.help_budget_ms),
+    ):
+        ms = sec * 1000
+        ok = ms <= budget_ms and not heavy
+        failed |= not ok
+        print(f"  {'✅' if ok else '❌'} {name}: {ms:.1f} ms (budget {budget_ms:g} ms)")
+        if heavy:
+            print(f"     loaded heavy modules: {', '.join(heavy)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
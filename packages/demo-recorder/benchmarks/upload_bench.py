@@ -0,0 +1,140 @@
+"""
+upload_bench.py — upload throughput and end-to-end latency, fully offline.
+
+Starts the local Convex stand-in (demo_recorder.local_convex) with the
+requested latency / bandwidth / failure injection, then uploads synthetic
+videos of each size at each concurrency level through the real upload path
+(pooled client, streamed bodies, retries).
+
+    uv run python benchmarks/upload_bench.py
+    uv run python benchmarks/upload_bench.py --sizes 1,25,100 --concurrency 1,4,8 \\
+        --latency-ms 40 --bandwidth-mbps 200 --fail-rate 0.05 --prefetch
+
+Latency is measured from "video is ready" to "viewable URL known", i.e.
+what the end of run_tasks waits for. With --prefetch the upload URL is
+fetched before the clock starts, as run_tasks does.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from demo_recorder.local_convex import Faults, LocalConvex
+from demo_recorder.uploader import (
+    RetryPolicy,
+    UploadError,
+    close_convex_client,
+    convex_client,
+    generate_upload_url,
+    upload_blob,
+)
+
+MB = 1024 * 1024
+
+
+def make_video(directory: Path, size_mb: float) -> Path:
+    """A file of random bytes (incompressible, like encoded video)."""
+    path = directory / f"synthetic-{size_mb:g}mb.mp4"
+    remaining = int(size_mb * MB)
+    with path.open("wb") as f:
+        while remaining > 0:
+            chunk = os.urandom(min(remaining, 4 * MB))
+            f.write(chunk)
+            remaining -= len(chunk)
+    return path
+
+
+async def timed_upload(url: str, path: Path, retry: RetryPolicy, prefetch: bool) -> float | None:
+    client = convex_client()
+    upload_url = None
+    if prefetch:
+        try:
+            upload_url = await generate_upload_url(client, url)
+        except (UploadError, httpx.HTTPError):
+            pass  # like UploadUrlPrefetch: the upload fetches its own
+    started = time.monotonic()
+    uploaded = await upload_blob(client, url, path, "video/mp4", retry=retry, upload_url=upload_url)
+    if uploaded is None:
+        return None
+    return time.monotonic() - started
+
+
+async def run_level(url: str, path: Path, concurrency: int, rounds: int, retry: RetryPolicy, prefetch: bool) -> dict:
+    latencies: list[float] = []
+    failures = 0
+    started = time.monotonic()
+    for _ in range(rounds):
+        results = await asyncio.gather(*(
+            timed_upload(url, path, retry, prefetch) for _ in range(concurrency)
+        ))
+        latencies += [r for r in results if r is not None]
+        failures += sum(1 for r in results if r is None)
+    wall = time.monotonic() - started
+    size = path.stat().st_size
+    latencies.sort()
+    return {
+        "uploads": len(latencies),
+        "failed": failures,
+        "throughput_mbps": len(latencies) * size * 8 / 1_000_000 / wall if wall else 0.0,
+        "p50_s": statistics.median(latencies) if latencies else float("nan"),
+        "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else float("nan"),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    sizes = [float(s) for s in args.sizes.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    retry = RetryPolicy(attempts=args.attempts, base_sec=args.backoff, max_sec=args.backoff * 16)
+    faults = Faults(
+        latency_ms=args.latency_ms,
+        bandwidth_mbps=args.bandwidth_mbps,
+        fail_rate=args.fail_rate,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp, LocalConvex(faults=faults) as server:
+        print(
+            f"Local Convex at {server.url} — latency {args.latency_ms:g} ms, "
+            f"bandwidth {args.bandwidth_mbps or 'unlimited'} Mbit/s per upload, "
+            f"fail rate {args.fail_rate:g}, prefetch {'on' if args.prefetch else 'off'}"
+        )
+        print(f"{'size':>8} {'conc':>5} {'ok':>5} {'fail':>5} {'Mbit/s':>9} {'p50 s':>8} {'p95 s':>8}")
+        try:
+            for size_mb in sizes:
+                path = make_video(Path(tmp), size_mb)
+                for concurrency in levels:
+                    row = await run_level(server.url, path, concurrency, args.rounds, retry, args.prefetch)
+                    print(
+                        f"{size_mb:>6g}MB {concurrency:>5} {row['uploads']:>5} {row['failed']:>5} "
+                        f"{row['throughput_mbps']:>9.1f} {row['p50_s']:>8.3f} {row['p95_s']:>8.3f}"
+                    )
+                path.unlink()
+        finally:
+            await close_convex_client()
+        print(
+            f"Server: {server.stats.blobs} blob(s), {server.stats.bytes_received / MB:.1f} MB, "
+            f"{server.stats.failures_injected} injected failure(s), calls {server.stats.calls}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline upload benchmark against a local Convex stand-in")
+    parser.add_argument("--sizes", default="1,10,50", help="Comma-separated video sizes in MB (default: 1,10,50)")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels (default: 1,4)")
+    parser.add_argument("--rounds", type=int, default=3, help="Batches per size/concurrency level (default: 3)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Server delay per response (default: 20)")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="Per-upload bandwidth cap (default: none)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Probability a server call answers 503")
+    parser.add_argument("--attempts", type=int, default=5, help="Retry attempts per upload (default: 5)")
+    parser.add_argument("--backoff", type=float, default=0.05, help="Retry base delay in seconds (default: 0.05)")
+    parser.add_argument("--prefetch", action="store_true", help="Fetch the upload URL before timing starts")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 #!/usr/bin/env node
 // Post-processing pipeline: zoom effects + cursor overlay + freeze removal
-// Usage: node postprocess.mjs <input> <output> <events.json> <cursor.png> <width> <height>
+// Usage: node postprocess.mjs <input> <output> <events.json> <cursor.png> <width> <height> [--no-freeze-removal]
+//
+// --no-freeze-removal skips the freezedetect decode + re-encode pass, for
+// recordings whose idle time was already paused out at capture.
 
 import { execFile } from "node:child_process";
 import { promisify } from "node:util";
@@ -10,13 +13,23 @@ import { tmpdir } from "node:os";
 
 const execFileAsync = promisify(execFile);
 
-const [,, inputPath, outputPath, eventsPath, cursorPath, widthStr, heightStr] = process.argv;
+const [,, inputPath, outputPath, eventsPath, cursorPath, widthStr, heightStr, ...flags] = process.argv;
+const freezeRemoval = !flags.includes("--no-freeze-removal");
 const width = parseInt(widthStr);
 const height = parseInt(heightStr);
+// Recordings may be variable-frame-rate (static frames dropped at capture).
+// Every filter chain resamples to a constant rate first so time-based zoom
+// animations and frame-count-based setpts behave as on a CFR input.
+const outputFps = 25;
 const events = JSON.parse(await readFile(eventsPath, "utf8"));
 const clicks = events.filter(e => e.type === "click");
 
 if (clicks.length === 0) {
+  if (!freezeRemoval) {
+    console.log("No click events and freeze removal disabled, copying input.");
+    await execFileAsync("ffmpeg", ["-y", "-i", inputPath, "-c", "copy", outputPath]);
+    process.exit(0);
+  }
   console.log("No click events, skipping zoom/cursor. Running freeze removal only.");
   const freezes = await detectFreezes(inputPath);
   if (freezes.length > 0) {
@@ -138,7 +151,7 @@ const scaleExpr = buildCursorScaleExpr(events, 32);
 const firstT = Math.max(0, Math.min(...clicks.map(e => e.atMs / 1000)) - 0.5);
 
 const filterComplex =
-  `[0:v]scale=w='iw*(${zoomExpr})':h='ih*(${zoomExpr})':eval=frame,` +
+  `[0:v]fps=${outputFps},scale=w='iw*(${zoomExpr})':h='ih*(${zoomExpr})':eval=frame,` +
   `crop=${width}:${height}:x='${cropX}':y='${cropY}'[processed];` +
   `[1:v]scale=w='${scaleExpr}':h='${scaleExpr}':eval=frame[cursor];` +
   `[processed][cursor]overlay=x='${curOX}-2':y='${curOY}-1':` +
@@ -167,8 +180,8 @@ console.log("  Zoom + cursor done");
 // ── Step 2: Freeze detection ─────────────────────────────────────────
 
 console.log("Postprocess step 2: freeze detection...");
-const freezes = await detectFreezes(zoomedPath);
-console.log(`  ${freezes.length} freeze(s)`);
+const freezes = freezeRemoval ? await detectFreezes(zoomedPath) : [];
+console.log(freezeRemoval ? `  ${freezes.length} freeze(s)` : "  skipped (idle paused at capture)");
 
 // ── Step 3: Freeze removal ───────────────────────────────────────────
 
@@ -235,7 +248,7 @@ async function removeFreezes(inp, out, freezes, keepDuration = 1.5) {
 
   await execFileAsync("ffmpeg", [
     "-y", "-i", inp,
-    "-vf", `select='${selectExpr}',setpts=N/FRAME_RATE/TB`,
+    "-vf", `fps=${outputFps},select='${selectExpr}',setpts=N/FRAME_RATE/TB`,
     "-c:v", "libx264", "-preset", "medium", "-crf", "20",
     "-pix_fmt", "yuv420p", "-movflags", "+faststart",
     out,
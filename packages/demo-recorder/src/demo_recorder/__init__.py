@@ -1,5 +1,42 @@
-from .recorder import DemoRecorder, record_demo
-from .diff_analyzer import DiffAnalyzer
-from .task_runner import run_tasks, TasksResult, build_prompt
+"""
+demo_recorder — record video demos of browser automation tasks.
 
-__all__ = ["DemoRecorder", "record_demo", "DiffAnalyzer", "run_tasks", "TasksResult", "build_prompt"]
+Public names are resolved on first access (module __getattr__), so
+`import demo_recorder` and light helpers such as DiffAnalyzer or
+build_prompt never pull in browser_use, the LLM clients or httpx.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+_LAZY = {
+    "DemoRecorder": ".recorder",
+    "record_demo": ".recorder",
+    "DiffAnalyzer": ".diff_analyzer",
+    "run_tasks": ".task_runner",
+    "TasksResult": ".task_runner",
+    "build_prompt": ".prompt",
+    "BrowserPool": ".browser_pool",
+}
+
+__all__ = ["DemoRecorder", "record_demo", "DiffAnalyzer", "run_tasks", "TasksResult", "build_prompt", "BrowserPool"]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
+
+
+if TYPE_CHECKING:
+    from .browser_pool import BrowserPool
+    from .diff_analyzer import DiffAnalyzer
+    from .prompt import build_prompt
+    from .recorder import DemoRecorder, record_demo
+    from .task_runner import TasksResult, run_tasks
@@ -0,0 +1,184 @@
+"""
+batch.py — run many task suites from JSONL with bounded concurrency.
+
+Each input line is one suite:
+
+    {"id": "checkout", "tasks": [{"id": "...", "description": "..."}], "base_url": "http://..."}
+
+Besides "id" and "tasks", a line may override any of SUITE_OPTIONS; the
+rest comes from the batch's own flags, exactly as for a single run. The id
+names the suite's output directory, so it must be a slug (letters, digits,
+".", "_", "-") and unique within the batch.
+Lines are read as they arrive (a file or stdin), so a producer can keep
+appending suites while earlier ones record. `concurrency` workers pull
+suites off a bounded queue and share one LLM client per model, the
+process-wide X display pool and, for headless runs, one warm BrowserPool.
+
+Every finished suite produces one result line — printed as
+`SUITE_RESULT: {...}` and, with results_path, appended to a JSONL file —
+in completion order, not input order.
+"""
+
+import asyncio
+import json
+import re
+import sys
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
+from typing import IO
+
+from .browser_pool import BrowserPool
+from .recorder import get_llm
+from .task_runner import TasksResult, default_output_dir
+
+SUITE_OPTIONS = (
+    "base_url", "output_dir", "max_steps", "model", "convex_url", "capture_mode",
+    "pause_idle", "idle_hold_sec", "container", "chunk_size", "shards", "group_by",
+    "replay", "direct",
+)
+
+SUITE_ID_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,127}")
+
+RunSuite = Callable[[list[dict], dict], Awaitable[TasksResult]]
+
+
+async def read_lines(stream: IO[str]) -> AsyncIterator[str]:
+    """Lines of a file or pipe, read off the event loop as they arrive."""
+    while line := await asyncio.to_thread(stream.readline):
+        if line.strip():
+            yield line
+
+
+def result_line(suite_id: str, result: TasksResult | None, error: str | None = None) -> dict:
+    if result is None:
+        return {"suite": suite_id, "success": False, "error": error}
+    return {
+        "suite": suite_id,
+        "success": result.success,
+        "verdict": result.verdict,
+        "reasoning": result.verdict_reasoning,
+        "video": str(result.video_path) if result.video_path else None,
+        "video_meta": result.media,
+        "output_dir": str(result.output_path),
+        "video_url": result.video_url,
+        "error": result.error,
+    }
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        run_suite: RunSuite,
+        defaults: dict,
+        concurrency: int = 2,
+        pool_size: int | None = None,
+        results_path: Path | None = None,
+    ):
+        self.run_suite = run_suite
+        self.defaults = defaults
+        self.concurrency = concurrency
+        # One warm browser per worker unless told otherwise
+        self.pool_size = concurrency if pool_size is None else pool_size
+        self.results_path = results_path
+        # Without an explicit --output-dir, suites land in demos/<timestamp>/<suite id>
+        self.root = Path(defaults["output_dir"]) if defaults.get("output_dir") else default_output_dir()
+        self._llms: dict = {}
+        self._suite_ids: set[str] = set()
+        self._pool: BrowserPool | None = None
+        self.results: list[dict] = []
+
+    def _options(self, suite: dict) -> dict:
+        unknown = set(suite) - {"id", "tasks", *SUITE_OPTIONS}
+        if unknown:
+            raise ValueError(f"unknown suite option(s): {', '.join(sorted(unknown))}")
+        options = {**self.defaults, **{k: suite[k] for k in SUITE_OPTIONS if k in suite}}
+        options["output_dir"] = Path(suite["output_dir"]) if "output_dir" in suite else self.root / suite["id"]
+        options["browser_pool"] = self._pool
+        return options
+
+    def _suite_id(self, suite: dict, default: str) -> str:
+        suite_id = suite.setdefault("id", default)
+        if isinstance(suite_id, int):
+            suite_id = suite["id"] = str(suite_id)
+        if not isinstance(suite_id, str) or not SUITE_ID_RE.fullmatch(suite_id):
+            raise ValueError(f"suite id {suite_id!r} must be 1-128 letters, digits, '.', '_' or '-'")
+        if suite_id in self._suite_ids:
+            raise ValueError(f"duplicate suite id {suite_id!r}")
+        self._suite_ids.add(suite_id)
+        return suite_id
+
+    def _llm(self, model: str):
+        if model not in self._llms:
+            self._llms[model] = get_llm(model)
+        return self._llms[model]
+
+    def _emit(self, line: dict) -> None:
+        self.results.append(line)
+        print(f"SUITE_RESULT: {json.dumps(line)}", flush=True)
+        if self.results_path is not None:
+            with self.results_path.open("a") as f:
+                f.write(json.dumps(line) + "\n")
+
+    async def _run_one(self, number: int, raw: str) -> None:
+        suite_id = f"suite-{number}"
+        try:
+            suite = json.loads(raw)
+            if not isinstance(suite, dict):
+                raise ValueError("a suite line must be a JSON object")
+            suite_id = self._suite_id(suite, suite_id)
+            tasks = suite.get("tasks")
+            if not isinstance(tasks, list) or not tasks:
+                raise ValueError('"tasks" must be a non-empty JSON array')
+            options = self._options(suite)
+        except ValueError as exc:  # includes JSONDecodeError
+            self._emit(result_line(suite_id, None, f"line {number}: {exc}"))
+            return
+        try:
+            options["llm"] = self._llm(options.get("model", "browser-use"))
+            result = await self.run_suite(tasks, options)
+        except Exception as exc:  # noqa: BLE001 — one bad suite must not end the batch
+            self._emit(result_line(suite_id, None, f"{type(exc).__name__}: {exc}"))
+            return
+        self._emit(result_line(suite_id, result))
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while (item := await queue.get()) is not None:
+            await self._run_one(*item)
+
+    async def run(self, lines: AsyncIterator[str]) -> list[dict]:
+        """Run every suite in `lines`; returns the result lines."""
+        if self.defaults.get("headless") and self.pool_size > 0:
+            self._pool = BrowserPool(self.pool_size, self.defaults.get("capture_backend", "x11grab"))
+        # A short queue keeps reading just ahead of the workers
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            number = 0
+            async for line in lines:
+                number += 1
+                await queue.put((number, line))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if self._pool is not None:
+                await self._pool.close()
+        return self.results
+
+
+async def run_batch(
+    suites: str,
+    run_suite: RunSuite,
+    defaults: dict,
+    concurrency: int = 2,
+    pool_size: int | None = None,
+    results_path: Path | None = None,
+) -> list[dict]:
+    """Run the suites in the JSONL file `suites` ("-" for stdin)."""
+    runner = BatchRunner(run_suite, defaults, concurrency, pool_size, results_path)
+    if suites == "-":
+        return await runner.run(read_lines(sys.stdin))
+    with open(suites) as stream:
+        return await runner.run(read_lines(stream))
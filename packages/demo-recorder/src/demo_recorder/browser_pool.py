@@ -0,0 +1,282 @@
+"""
+browser_pool.py — pre-launched browsers reused across run_tasks calls.
+
+A cold run_tasks launches Chromium (and, for x11grab capture, an Xvfb
+display) before the agent can take its first step. A BrowserPool keeps
+`size` browsers running and connected over CDP; each run leases one, and
+on return it is reset to a blank, storage-free state for the next run:
+
+    - every tab but one is closed and the remaining one goes to about:blank;
+    - cookies are cleared, and so is all storage (local/session storage,
+      IndexedDB, cache storage, service workers) of every origin the run
+      visited;
+    - granted permissions are reset.
+
+The HTTP cache is kept on purpose: re-fetching the app's static assets
+is exactly the cold start the pool is there to avoid.
+
+Leases are health-checked (Xvfb alive, CDP answers within health_timeout)
+and a browser is recycled after max_uses runs or whenever a check or reset
+fails; its replacement launches in the background.
+
+    pool = BrowserPool(size=2, backend="screencast")
+    await pool.start()
+    for suite in suites:
+        await run_tasks(suite, headless=True, capture_backend="screencast", browser_pool=pool)
+    await pool.close()
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from browser_use import BrowserProfile, BrowserSession
+
+from .display import VirtualDisplay, start_xvfb, stop_xvfb
+from .screencast import CAPTURE_BACKENDS
+
+
+def headless_profile(display: VirtualDisplay | None, **extra) -> BrowserProfile:
+    """
+    Profile for headless capture: kiosk Chromium on the Xvfb display for
+    x11grab, or a truly headless browser (screencast) when display is None.
+    """
+    if display is not None:
+        # Non-headless on virtual display, kiosk mode hides toolbar
+        # so viewport = full 1920x1080 display = accurate click coordinates.
+        # DISPLAY goes to Chromium's own environment, not os.environ.
+        return BrowserProfile(
+            headless=False,
+            args=["--kiosk", f"--display={display.name}"],
+            env=display.env(),
+            wait_between_actions=1.5,
+            minimum_wait_page_load_time=1.0,
+            **extra,
+        )
+    # Truly headless; the page itself is recorded over CDP
+    return BrowserProfile(
+        headless=True,
+        viewport={"width": 1920, "height": 1080},
+        window_size={"width": 1920, "height": 1080},
+        wait_between_actions=1.5,
+        minimum_wait_page_load_time=1.0,
+        **extra,
+    )
+
+
+def _origin(url: str) -> str | None:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+@dataclass
+class WarmBrowser:
+    session: BrowserSession
+    display: VirtualDisplay | None
+    launch_sec: float                 # Xvfb + Chromium start + CDP connect
+    uses: int = 0
+    origins: set[str] = field(default_factory=set)  # visited during the current lease
+
+    def visited(self, *urls: str) -> None:
+        """Remember origins whose storage must be cleared on return."""
+        self.origins.update(o for o in map(_origin, urls) if o)
+
+
+class BrowserPool:
+    """Keeps `size` warm browsers for one capture backend."""
+
+    def __init__(
+        self,
+        size: int = 2,
+        backend: str = "x11grab",
+        max_uses: int = 20,
+        health_timeout: float = 5.0,
+    ):
+        if backend not in CAPTURE_BACKENDS:
+            raise ValueError(f"Unknown capture backend {backend!r} (expected one of {CAPTURE_BACKENDS})")
+        self.size = size
+        self.backend = backend
+        self.max_uses = max_uses
+        self.health_timeout = health_timeout
+        # Idle browsers; None wakes a waiting lease after a failed launch
+        self._idle: asyncio.Queue[WarmBrowser | None] = asyncio.Queue()
+        self._launch_error: Exception | None = None
+        self._live = 0                    # launched or launching, leased or idle
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+        self.launched = 0
+        self.recycled = 0
+        self.leases = 0
+        self.lease_waits: list[float] = []
+
+    # ── Launch / retire ────────────────────────────────────────────────
+
+    async def _launch(self) -> WarmBrowser:
+        started = time.monotonic()
+        display = await start_xvfb("1920x1080x24") if self.backend == "x11grab" else None
+        try:
+            # keep_alive: the agent must not kill a pooled browser on close
+            session = BrowserSession(browser_profile=headless_profile(display, keep_alive=True))
+            await session.start()
+        except BaseException:
+            await asyncio.shield(stop_xvfb(display))
+            raise
+        self.launched += 1
+        return WarmBrowser(session=session, display=display, launch_sec=time.monotonic() - started)
+
+    async def _fill_one(self) -> None:
+        try:
+            browser = await self._launch()
+        except Exception as exc:  # noqa: BLE001
+            self._live -= 1
+            self._launch_error = exc
+            self._idle.put_nowait(None)
+            return
+        if self._closed:
+            await self._retire(browser)
+            return
+        self._idle.put_nowait(browser)
+
+    def _replenish(self) -> None:
+        """Launch browsers in the background until the pool is back at size."""
+        while not self._closed and self._live < self.size:
+            self._live += 1
+            task = asyncio.create_task(self._fill_one())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _retire(self, browser: WarmBrowser) -> None:
+        try:
+            await browser.session.kill()
+        except Exception:  # noqa: BLE001 — already dead is fine
+            pass
+        finally:
+            await stop_xvfb(browser.display)
+
+    async def _discard(self, browser: WarmBrowser) -> None:
+        self._live -= 1
+        self.recycled += 1
+        await self._retire(browser)
+        self._replenish()
+
+    # ── Health / reset ─────────────────────────────────────────────────
+
+    async def healthy(self, browser: WarmBrowser) -> bool:
+        if browser.display is not None and browser.display.proc.returncode is not None:
+            return False
+        try:
+            cdp = browser.session.cdp_client
+            await asyncio.wait_for(cdp.send.Browser.getVersion(), self.health_timeout)
+        except Exception:  # noqa: BLE001 — disconnected, crashed or hung
+            return False
+        return True
+
+    async def reset(self, browser: WarmBrowser) -> None:
+        """Close extra tabs, blank the last one and clear the run's storage."""
+        cdp = browser.session.cdp_client
+        targets = await cdp.send.Target.getTargets()
+        pages = [t for t in targets["targetInfos"] if t["type"] == "page"]
+        browser.visited(*(t["url"] for t in pages))
+        if pages:
+            keep = pages[0]["targetId"]
+        else:
+            keep = (await cdp.send.Target.createTarget(params={"url": "about:blank"}))["targetId"]
+        for page in pages[1:]:
+            await cdp.send.Target.closeTarget(params={"targetId": page["targetId"]})
+        tab = await browser.session.get_or_create_cdp_session(target_id=keep, focus=True)
+        await tab.cdp_client.send.Page.navigate(params={"url": "about:blank"}, session_id=tab.session_id)
+
+        await cdp.send.Storage.clearCookies()
+        for origin in sorted(browser.origins):
+            await cdp.send.Storage.clearDataForOrigin(params={"origin": origin, "storageTypes": "all"})
+        await cdp.send.Browser.resetPermissions()
+        browser.origins.clear()
+
+    # ── Leasing ────────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        """
+        Launch the whole pool and wait until it is warm. Raises RuntimeError
+        if no browser could be launched; leases then retry the launch.
+        """
+        self._replenish()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        # Failed launches left wake-up markers no lease is waiting for
+        ready = []
+        while not self._idle.empty():
+            browser = self._idle.get_nowait()
+            if browser is not None:
+                ready.append(browser)
+        for browser in ready:
+            self._idle.put_nowait(browser)
+        if not ready and self.size > 0:
+            raise RuntimeError(f"Browser pool launch failed: {self._launch_error}")
+
+    async def lease(self) -> WarmBrowser:
+        """Wait for a healthy idle browser (launching more if below size)."""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        started = time.monotonic()
+        while True:
+            self._replenish()
+            browser = await self._idle.get()
+            if browser is None:
+                raise RuntimeError(f"Browser pool launch failed: {self._launch_error}")
+            if await self.healthy(browser):
+                break
+            print("  ⚠️ Pooled browser failed its health check; replacing it")
+            await self._discard(browser)
+        browser.uses += 1
+        self.leases += 1
+        self.lease_waits.append(time.monotonic() - started)
+        return browser
+
+    async def release(self, browser: WarmBrowser, healthy: bool = True) -> None:
+        """
+        Return a leased browser. It is reset for the next lease, or recycled
+        if the run marked it unhealthy, it has served max_uses runs, or the
+        reset fails.
+        """
+        if self._closed or not healthy or browser.uses >= self.max_uses:
+            await self._discard(browser)
+            return
+        try:
+            await asyncio.wait_for(self.reset(browser), self.health_timeout * 2)
+        except Exception as exc:  # noqa: BLE001
+            print(f"  ⚠️ Pooled browser reset failed ({exc}); recycling it")
+            await self._discard(browser)
+            return
+        self._idle.put_nowait(browser)
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._idle.empty():
+            browser = self._idle.get_nowait()
+            if browser is not None:
+                await self._retire(browser)
+        self._live = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "backend": self.backend,
+            "launched": self.launched,
+            "recycled": self.recycled,
+            "leases": self.leases,
+            "idle": self._idle.qsize(),
+            "lease_wait_max_sec": round(max(self.lease_waits, default=0.0), 3),
+        }
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
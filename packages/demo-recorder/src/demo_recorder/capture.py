@@ -0,0 +1,749 @@
+"""
+capture.py — ffmpeg x11grab screen capture of a virtual display.
+
+ffmpeg runs as an asyncio subprocess with `-progress pipe:1`, and a reader
+task keeps the encoded frame counter up to date. Callers await real
+readiness signals (first encoded frame, frame counter reaching a target)
+instead of fixed sleeps, without blocking the event loop.
+
+x11grab stamps every frame with the wall clock, and ffmpeg reports the
+first frame's stamp as the input's `start:` time. That instant, moved onto
+the monotonic clock, is media t=0 — MediaTimeline maps agent events onto
+the video with it.
+
+Capture modes:
+    vfr — (default) mpdecimate drops frames identical to the previous one
+          before they reach x264, so a static screen (the agent waiting on
+          the LLM) costs almost nothing to encode. Timestamps stay exact
+          and at most fps/2 frames in a row are dropped, so a static screen
+          still gets a frame about every half second (fps/(fps//2 + 1),
+          ~2 fps at 25 fps) and progress and seeking keep moving.
+    cfr — constant frame rate, every grabbed frame is encoded.
+
+Containers:
+    fmp4 — (default) fragmented MP4 with a keyframe + fragment every
+           segment_sec. Everything up to the last fragment is playable even
+           if ffmpeg is killed before it can finalize the file.
+    mp4  — classic MP4; only valid once ffmpeg writes the moov atom on 'q'.
+    hls  — rolling segment_sec MPEG-TS segments under segments/ plus an
+           m3u8 playlist per span. Each finished segment is playable on its
+           own as soon as it is listed; stop() writes recording.m3u8 and
+           stream-copies the segments into recording.mp4.
+
+A pausable recorder captures in spans: pause() finishes the current ffmpeg
+process, resume() starts a new one, and stop() stitches the parts together
+with a stream copy. Paused time is never grabbed or encoded, and the
+timeline collapses the gaps so events still land on the right frame.
+Fragmented MP4 never touches disk from ffmpeg directly: each capture
+span, and the join of several spans, is streamed out of ffmpeg through a
+pipe and hashed on the way to disk, so output_sha256 is known when stop()
+returns and upload dedup does not re-read the file. The classic mp4
+container needs a seekable file for its moov atom, so it is written by
+ffmpeg and output_sha256 stays None; its upload hashes the finished file
+once with sha256_file. HLS segments are uploaded as they finish and are
+not deduplicated.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import re
+import subprocess
+import time
+from asyncio.subprocess import PIPE, Process
+from dataclasses import dataclass
+from pathlib import Path
+
+from .dedup import HASH_CHUNK
+from .process import kill, run_process
+
+_INPUT_START_RE = re.compile(r"Duration: .*, start: (\d+\.\d+)")
+
+CAPTURE_MODES = ("vfr", "cfr")
+CONTAINERS = ("fmp4", "mp4", "hls")
+
+FRAGMENTED_MOVFLAGS = "+frag_keyframe+empty_moov+default_base_moof"
+
+
+# ── HLS segments ───────────────────────────────────────────────────────
+
+@dataclass
+class Segment:
+    """One finished HLS segment."""
+    path: Path
+    duration: float
+    span: int
+
+
+def _read_segment_list(playlist: Path, span: int) -> list[Segment]:
+    # ffmpeg rewrites the list in place as segments finish, so tolerate a
+    # half-written file: an entry only counts once its EXTINF is complete.
+    try:
+        lines = playlist.read_text().splitlines()
+    except OSError:
+        return []
+    segments: list[Segment] = []
+    duration: float | None = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#EXTINF:"):
+            try:
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            except ValueError:
+                duration = None
+        elif line and not line.startswith("#") and duration is not None:
+            path = playlist.parent / line
+            if path.exists():
+                segments.append(Segment(path, duration, span))
+            duration = None
+    return segments
+
+
+def read_segments(segment_dir: Path) -> list[Segment]:
+    """Every finished segment under a recording's segments/ directory, in order."""
+    segments: list[Segment] = []
+    for playlist in sorted(segment_dir.glob("span[0-9][0-9][0-9].m3u8")):
+        segments += _read_segment_list(playlist, int(playlist.stem[len("span"):]))
+    return segments
+
+
+def build_playlist(entries: list[tuple[str, float, int]], ended: bool = True) -> str:
+    """
+    Render an HLS media playlist from (uri, duration, span) entries.
+
+    A discontinuity is marked wherever the span changes, i.e. where capture
+    was paused and a new ffmpeg process began.
+    """
+    target = max((math.ceil(duration) for _, duration, _ in entries), default=1)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{target}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+    ]
+    if ended:
+        lines.append("#EXT-X-PLAYLIST-TYPE:VOD")
+    previous_span: int | None = None
+    for uri, duration, span in entries:
+        if previous_span is not None and span != previous_span:
+            lines.append("#EXT-X-DISCONTINUITY")
+        lines += [f"#EXTINF:{duration:.6f},", uri]
+        previous_span = span
+    if ended:
+        lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+# ── Media timeline ─────────────────────────────────────────────────────
+
+@dataclass
+class CaptureSpan:
+    origin_mono: float              # monotonic instant of the span's first frame
+    media_start: float              # where the span begins in the final video (s)
+    duration: float | None = None   # encoded length (s); None while recording
+
+
+@dataclass
+class MediaTimeline:
+    """Maps monotonic-clock instants onto the recording's media timeline."""
+    spans: list[CaptureSpan]
+    wall_offset: float  # time.time() - time.monotonic(), sampled once per run
+    fps: int = 25
+
+    @classmethod
+    def starting_at(cls, origin_mono: float, wall_offset: float, fps: int = 25) -> "MediaTimeline":
+        """Timeline of one uninterrupted capture whose first frame is at origin_mono."""
+        return cls(spans=[CaptureSpan(origin_mono, 0.0)], wall_offset=wall_offset, fps=fps)
+
+    @property
+    def origin_mono(self) -> float:
+        return self.spans[0].origin_mono
+
+    def media_ms(self, mono: float) -> int:
+        """
+        Milliseconds into the video for a monotonic instant, snapped to a frame.
+
+        Instants inside a paused gap map to the first frame after it.
+        """
+        media = 0.0
+        for span in self.spans:
+            if mono < span.origin_mono:
+                media = span.media_start
+                break
+            offset = mono - span.origin_mono
+            if span.duration is not None:
+                offset = min(offset, span.duration)
+            media = span.media_start + offset
+            if span.duration is None or mono - span.origin_mono < span.duration:
+                break
+        frames = max(0, round(media * self.fps))
+        return int(frames * 1000 / self.fps)
+
+    def media_ms_from_wall(self, wall: float) -> int:
+        """Same as media_ms for a time.time() instant (e.g. browser-use metadata)."""
+        return self.media_ms(wall - self.wall_offset)
+
+
+# ── One ffmpeg process ─────────────────────────────────────────────────
+
+class _FfmpegCapture:
+    """
+    One ffmpeg capture process writing one output file.
+
+    With frames_on_stdin, ffmpeg reads its input from stdin (e.g. JPEG
+    frames pushed by a screencast) and is stopped by closing stdin rather
+    than by sending 'q'.
+
+    With hash_output, the command ends without an output and ffmpeg
+    writes to a pipe instead; the bytes are hashed (sha256) on their way
+    to output_path.
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        output_path: Path,
+        index: int,
+        frames_on_stdin: bool = False,
+        hash_output: bool = False,
+    ):
+        self.command = command
+        self.output_path = output_path  # the media file, or the playlist for hls
+        self.index = index
+        self.frames_on_stdin = frames_on_stdin
+        self.hash_output = hash_output
+        self.sha256: str | None = None  # set once a hashed output is complete
+        self.proc: Process | None = None
+        self.frame = 0
+        self.out_time = 0.0
+        self.started_mono: float | None = None
+        self.first_frame_wall: float | None = None  # x11grab stamp of frame 0
+        self.progress_origin: float | None = None   # earliest (arrival - out_time)
+        self._cond = asyncio.Condition()
+        self._readers: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self) -> None:
+        if not self.hash_output:
+            self.proc = await asyncio.create_subprocess_exec(
+                *self.command, stdin=PIPE, stdout=PIPE, stderr=PIPE,
+            )
+        else:
+            # stdout carries -progress, so the media goes out on its own pipe
+            read_fd, write_fd = os.pipe()
+            try:
+                self.proc = await asyncio.create_subprocess_exec(
+                    *self.command, f"pipe:{write_fd}",
+                    stdin=PIPE, stdout=PIPE, stderr=PIPE, pass_fds=(write_fd,),
+                )
+            except BaseException:
+                os.close(read_fd)
+                raise
+            finally:
+                os.close(write_fd)  # EOF reaches us when ffmpeg exits
+        self.started_mono = time.monotonic()
+        self._readers = [
+            asyncio.create_task(self._read_progress()),
+            asyncio.create_task(self._read_log()),
+        ]
+        if self.hash_output:
+            self._readers.append(asyncio.create_task(asyncio.to_thread(self._write_hashed, read_fd)))
+
+    def _write_hashed(self, read_fd: int) -> None:
+        # Unbuffered, so the file on disk is as far along as ffmpeg is
+        digest = hashlib.sha256()
+        with open(read_fd, "rb", buffering=0) as pipe, self.output_path.open("wb", buffering=0) as out:
+            while chunk := pipe.read(HASH_CHUNK):
+                digest.update(chunk)
+                out.write(chunk)
+        self.sha256 = digest.hexdigest()
+
+    def write(self, data: bytes) -> bool:
+        """Queue input bytes for a frames_on_stdin process; False if it has exited."""
+        if not self.running or self.proc.stdin.is_closing():
+            return False
+        self.proc.stdin.write(data)
+        return True
+
+    async def stop(self) -> None:
+        """Stop ffmpeg gracefully ('q', or EOF on stdin) so it flushes the file."""
+        proc = self.proc
+        if proc is None:
+            return
+        if proc.returncode is None:
+            try:
+                if self.frames_on_stdin:
+                    proc.stdin.close()
+                else:
+                    proc.stdin.write(b"q")
+                    await proc.stdin.drain()
+                await asyncio.wait_for(proc.wait(), 10)
+            except (OSError, TimeoutError):
+                await kill(proc)
+            except asyncio.CancelledError:
+                await asyncio.shield(kill(proc))
+                raise
+        await asyncio.gather(*self._readers, return_exceptions=True)
+
+    async def _read_progress(self) -> None:
+        # -progress emits key=value blocks terminated by a progress= line
+        async for raw in self.proc.stdout:
+            key, _, value = raw.decode(errors="replace").strip().partition("=")
+            if key == "frame" and value.isdigit():
+                async with self._cond:
+                    self.frame = int(value)
+                    self._cond.notify_all()
+            elif key == "out_time_us" and value.lstrip("-").isdigit():
+                async with self._cond:
+                    self.out_time = int(value) / 1_000_000
+                    self._cond.notify_all()
+            elif key == "progress" and self.frame > 0:
+                # The block arrived after its last frame was muxed, so the
+                # smallest (arrival - media time) seen is the tightest bound
+                # on when frame 0 was grabbed.
+                estimate = time.monotonic() - self.out_time
+                if self.progress_origin is None or estimate < self.progress_origin:
+                    self.progress_origin = estimate
+        await self.proc.wait()
+        async with self._cond:
+            self._cond.notify_all()  # wake waiters: ffmpeg has exited
+
+    async def _read_log(self) -> None:
+        # Drain stderr so ffmpeg never blocks on it; the input banner
+        # carries the wall-clock stamp of the first grabbed frame.
+        async for raw in self.proc.stderr:
+            if self.first_frame_wall is None:
+                match = _INPUT_START_RE.search(raw.decode(errors="replace"))
+                # Only trust it if it really is a wall-clock stamp
+                if match and abs(float(match.group(1)) - time.time()) < 3600:
+                    self.first_frame_wall = float(match.group(1))
+
+    async def wait_for(self, reached, what: str, timeout: float) -> float:
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(timeout):
+                async with self._cond:
+                    while not reached():
+                        if not self.running:
+                            raise RuntimeError(f"ffmpeg exited before {what}")
+                        await self._cond.wait()
+        except TimeoutError:
+            raise TimeoutError(f"ffmpeg did not reach {what} in {timeout:.1f}s") from None
+        return time.monotonic() - started
+
+    def origin_mono(self, wall_offset: float) -> float:
+        """Best available estimate of when frame 0 was grabbed."""
+        if self.first_frame_wall is not None:
+            return self.first_frame_wall - wall_offset
+        if self.progress_origin is not None:
+            return self.progress_origin
+        return self.started_mono or time.monotonic()
+
+
+# ── Screen recorder ────────────────────────────────────────────────────
+
+class ScreenRecorder:
+    """ffmpeg screen capture of a virtual display, optionally in pausable spans."""
+
+    frames_on_stdin = False  # subclasses that push frames into ffmpeg set this
+
+    def __init__(
+        self,
+        output_path: Path,
+        display: str,
+        resolution: str = "1920x1080",
+        fps: int = 25,
+        mode: str = "vfr",
+        pausable: bool = False,
+        container: str = "fmp4",
+        segment_sec: float = 4.0,
+    ):
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode {mode!r} (expected one of {CAPTURE_MODES})")
+        if container not in CONTAINERS:
+            raise ValueError(f"Unknown container {container!r} (expected one of {CONTAINERS})")
+        self.output_path = output_path
+        self.display = display
+        self.resolution = resolution
+        self.fps = fps
+        self.mode = mode
+        self.pausable = pausable
+        self.container = container
+        self.segment_sec = segment_sec
+        self.segment_dir = output_path.parent / "segments"
+        self.wall_offset = time.time() - time.monotonic()
+        self._parts: list[_FfmpegCapture] = []
+        self._current: _FfmpegCapture | None = None
+        self._stopped = False
+        # sha256 of output_path, hashed while written; None for the mp4
+        # container and for a join that failed
+        self.output_sha256: str | None = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self._parts)
+
+    @property
+    def paused(self) -> bool:
+        return self.started and self._current is None and not self._stopped
+
+    # ── Lifecycle ──────────────────────────────────────────────────────
+
+    def _encode_args(self) -> list[str]:
+        if self.mode == "vfr":
+            # max=N: never drop more than N frames in a row
+            return [
+                "-vf", f"mpdecimate=max={max(1, self.fps // 2)}",
+                "-fps_mode", "vfr",
+            ]
+        return []
+
+    def _part_path(self, index: int) -> Path:
+        if not self.pausable:
+            return self.output_path
+        return self.output_path.with_name(
+            f"{self.output_path.stem}.part{index:03d}{self.output_path.suffix}"
+        )
+
+    def _output_args(self, index: int) -> tuple[list[str], Path]:
+        # A keyframe every segment_sec bounds fragment / segment length
+        keyframes = ["-force_key_frames", f"expr:gte(t,n_forced*{self.segment_sec})"]
+        if self.container == "hls":
+            self.segment_dir.mkdir(parents=True, exist_ok=True)
+            playlist = self.segment_dir / f"span{index:03d}.m3u8"
+            return [
+                *keyframes,
+                "-f", "segment",
+                "-segment_time", str(self.segment_sec),
+                "-segment_format", "mpegts",
+                "-segment_list", str(playlist),
+                "-segment_list_type", "m3u8",
+                "-y",
+                str(self.segment_dir / f"span{index:03d}_%05d.ts"),
+            ], playlist
+        path = self._part_path(index)
+        if self.container == "fmp4":
+            # The output pipe is appended by _FfmpegCapture (hash_output)
+            return [
+                *keyframes,
+                "-movflags", FRAGMENTED_MOVFLAGS,
+                "-f", "mp4",
+            ], path
+        return ["-y", str(path)], path
+
+    def _input_args(self) -> list[str]:
+        return [
+            "-f", "x11grab",
+            "-video_size", self.resolution,
+            "-framerate", str(self.fps),
+            "-i", self.display,
+        ]
+
+    async def _launch(self) -> _FfmpegCapture:
+        index = len(self._parts)
+        output_args, path = self._output_args(index)
+        part = _FfmpegCapture(
+            [
+                "ffmpeg",
+                "-nostats",
+                "-progress", "pipe:1",
+                "-stats_period", "0.1",
+                *self._input_args(),
+                *self._encode_args(),
+                "-c:v", "libx264",
+                "-preset", "ultrafast",
+                "-pix_fmt", "yuv420p",
+                *output_args,
+            ],
+            path,
+            index,
+            frames_on_stdin=self.frames_on_stdin,
+            hash_output=self.container == "fmp4",
+        )
+        await part.start()
+        self._parts.append(part)
+        self._current = part
+        return part
+
+    async def start(self) -> None:
+        """Start ffmpeg. Returns once it is spawned; await wait_until_ready() for frame 1."""
+        await self._launch()
+        print(
+            f"  Screen recording started on {self.display} "
+            f"({self.mode}, {self.container}) → {self.output_path.name}"
+        )
+
+    async def pause(self) -> None:
+        """Finish the current span; nothing is grabbed until resume()."""
+        part, self._current = self._current, None
+        if part is not None:
+            await part.stop()
+
+    async def resume(self, timeout: float = 10.0) -> float:
+        """Start a new span and wait until its first frame is encoded."""
+        if not self.paused:
+            return 0.0
+        await self._launch()
+        return await self.wait_until_ready(timeout)
+
+    async def stop(self) -> None:
+        """Stop capture and, for a pausable recorder, stitch the spans."""
+        if self._stopped:
+            return
+        self._stopped = True
+        await self.pause()
+        if self._parts:
+            print("  Screen recording stopped")
+        if self.container == "hls":
+            await self._join_segments()
+        elif self.pausable:
+            await self._join_parts()
+        elif self._parts:
+            self.output_sha256 = self._parts[0].sha256
+
+    async def abort(self) -> None:
+        """Kill capture without joining anything (e.g. the run failed)."""
+        self._stopped = True
+        part, self._current = self._current, None
+        if part is not None and part.proc is not None:
+            await kill(part.proc)
+
+    async def _concat(self, files: list[tuple[Path, float]]) -> bool:
+        """
+        Stream-copy files into output_path with the concat demuxer.
+
+        Except for the classic mp4 container (whose moov is rewritten at
+        the end), ffmpeg writes fragmented MP4 to a pipe and the bytes are
+        hashed as they go to disk.
+        """
+        # Explicit durations keep the concat timeline identical to timeline()
+        list_path = self.output_path.with_suffix(".ffconcat")
+        list_path.write_text("ffconcat version 1.0\n" + "".join(
+            f"file '{path.resolve()}'\nduration {duration:.6f}\n" for path, duration in files
+        ))
+        command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path), "-c", "copy"]
+        try:
+            if self.container == "mp4":
+                returncode = (await run_process([*command, str(self.output_path)], timeout=60)).returncode
+            else:
+                returncode = await asyncio.wait_for(self._concat_hashed(command), 60)
+        except (subprocess.TimeoutExpired, TimeoutError):
+            returncode = -1
+        finally:
+            list_path.unlink()
+        if returncode != 0:
+            print(f"  Warning: joining {len(files)} capture files failed (rc={returncode})")
+            return False
+        return True
+
+    async def _concat_hashed(self, command: list[str]) -> int:
+        partial = self.output_path.with_name(self.output_path.name + ".partial")
+        proc = await asyncio.create_subprocess_exec(
+            *command, "-movflags", FRAGMENTED_MOVFLAGS, "-f", "mp4", "pipe:1",
+            stdin=asyncio.subprocess.DEVNULL, stdout=PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+        digest = hashlib.sha256()
+        try:
+            with partial.open("wb") as out:
+                while chunk := await proc.stdout.read(1024 * 1024):
+                    digest.update(chunk)
+                    out.write(chunk)
+            returncode = await proc.wait()
+        except BaseException:
+            await asyncio.shield(kill(proc))
+            partial.unlink(missing_ok=True)
+            raise
+        if returncode == 0:
+            partial.replace(self.output_path)
+            self.output_sha256 = digest.hexdigest()
+        else:
+            partial.unlink(missing_ok=True)
+        return returncode
+
+    async def _join_parts(self) -> None:
+        captured = [
+            p for p in self._parts
+            if p.output_path.exists() and p.output_path.stat().st_size > 0
+        ]
+        if not captured:
+            return
+        if len(captured) == 1:
+            captured[0].output_path.replace(self.output_path)
+            self.output_sha256 = captured[0].sha256
+            return
+        parts = [(p.output_path, self._span_duration(p)) for p in captured]
+        if await self._concat(parts):
+            for path, _ in parts:
+                path.unlink()
+
+    async def _join_segments(self) -> None:
+        # The segments (and their playlists) stay on disk; the joined mp4 is
+        # a stream copy for tools that want a single file.
+        segments = self.completed_segments()
+        if not segments:
+            return
+        playlist = self.output_path.with_suffix(".m3u8")
+        playlist.write_text(build_playlist([
+            (seg.path.relative_to(self.output_path.parent).as_posix(), seg.duration, seg.span)
+            for seg in segments
+        ]))
+        await self._concat([(seg.path, seg.duration) for seg in segments])
+
+    # ── Segments ───────────────────────────────────────────────────────
+
+    def completed_segments(self) -> list[Segment]:
+        """Every finished HLS segment so far, in playback order."""
+        if self.container != "hls":
+            return []
+        segments: list[Segment] = []
+        for part in self._parts:
+            segments += _read_segment_list(part.output_path, part.index)
+        return segments
+
+    # ── Readiness ──────────────────────────────────────────────────────
+
+    async def wait_for_frame(self, target: int, timeout: float) -> float:
+        """
+        Wait until the current span has encoded at least `target` frames.
+
+        Returns the time actually waited. Raises TimeoutError if the
+        counter doesn't get there in time and RuntimeError if ffmpeg exits.
+        """
+        part = self._current
+        if part is None:
+            raise RuntimeError("screen recording is not running")
+        return await part.wait_for(lambda: part.frame >= target, f"frame {target}", timeout)
+
+    async def wait_until_ready(self, timeout: float = 10.0) -> float:
+        """Wait until ffmpeg has encoded its first frame."""
+        return await self.wait_for_frame(1, timeout)
+
+    async def wait_for_tail(self, margin_sec: float = 0.5, timeout: float = 5.0) -> float:
+        """
+        Wait until the media timeline covers "now" plus a small margin, so
+        the last action is fully on screen in the recording.
+
+        Works on encoded media time rather than frame count, since in vfr
+        mode a static screen produces far fewer than fps frames per second.
+        """
+        part = self._current
+        if part is None:
+            return 0.0  # paused: the last action is already in a finished span
+        target = time.monotonic() - part.origin_mono(self.wall_offset) + margin_sec
+        return await part.wait_for(lambda: part.out_time >= target, f"t={target:.2f}s", timeout)
+
+    # ── Timeline ───────────────────────────────────────────────────────
+
+    def _span_duration(self, part: _FfmpegCapture) -> float:
+        if self.container == "hls":
+            # The playlist's EXTINF durations are exactly what the joined
+            # file and any HLS player will use
+            listed = sum(seg.duration for seg in _read_segment_list(part.output_path, part.index))
+            if listed > 0:
+                return listed
+        # out_time is the end of the last muxed packet; very short spans may
+        # not have reported any progress yet
+        if part.out_time > 0:
+            return part.out_time
+        return 1 / self.fps
+
+    def timeline(self) -> MediaTimeline:
+        """Media timeline anchored at the best available first-frame estimates."""
+        spans: list[CaptureSpan] = []
+        media_start = 0.0
+        for part in self._parts:
+            running = part is self._current
+            duration = None if running else self._span_duration(part)
+            spans.append(CaptureSpan(part.origin_mono(self.wall_offset), media_start, duration))
+            media_start += duration or 0.0
+        if not spans:
+            return MediaTimeline.starting_at(time.monotonic(), self.wall_offset, self.fps)
+        return MediaTimeline(spans=spans, wall_offset=self.wall_offset, fps=self.fps)
+
+    def sync_report(self) -> dict:
+        """How frame 0 was located, how far the estimates disagree, and idle removed."""
+        report: dict = {
+            "backend": "x11grab", "fps": self.fps, "mode": self.mode, "container": self.container,
+            "source": "process_start",
+        }
+        if not self._parts:
+            return report
+        first = self._parts[0]
+        report["first_frame_wallclock"] = first.first_frame_wall
+        if first.first_frame_wall is not None:
+            report["source"] = "x11grab_start"
+        elif first.progress_origin is not None:
+            report["source"] = "progress"
+        if first.started_mono is not None:
+            origin = first.origin_mono(self.wall_offset)
+            report["startup_latency_ms"] = round((origin - first.started_mono) * 1000, 1)
+        if first.first_frame_wall is not None and first.progress_origin is not None:
+            x11_origin = first.first_frame_wall - self.wall_offset
+            report["skew_ms"] = round((first.progress_origin - x11_origin) * 1000, 1)
+        if self.pausable:
+            spans = self.timeline().spans
+            idle = sum(
+                max(0.0, nxt.origin_mono - (cur.origin_mono + (cur.duration or 0.0)))
+                for cur, nxt in zip(spans, spans[1:])
+            )
+            report["spans"] = len(spans)
+            report["idle_removed_sec"] = round(idle, 3)
+        return report
+
+
+# ── Idle gating ────────────────────────────────────────────────────────
+
+class IdleGate:
+    """
+    Pauses a ScreenRecorder while the agent waits on the LLM.
+
+    Call action_finished() when a step's actions are done and
+    action_starting() right before the next step's actions run. Capture
+    keeps rolling for hold_sec after the last action (so the result stays
+    on screen for context) and is then paused until the next action.
+    """
+
+    def __init__(self, recorder: ScreenRecorder, hold_sec: float = 1.0):
+        self.recorder = recorder
+        self.hold_sec = hold_sec
+        self.resume_waits: list[float] = []
+        self._pending: asyncio.Task | None = None
+        self._holding = False  # pending task is still in its hold sleep
+
+    def action_finished(self) -> None:
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._pause_after_hold())
+
+    async def _pause_after_hold(self) -> None:
+        self._holding = True
+        try:
+            await asyncio.sleep(self.hold_sec)
+        finally:
+            self._holding = False
+        await self.recorder.pause()
+
+    async def _settle(self) -> None:
+        task, self._pending = self._pending, None
+        if task is None or task.done():
+            return
+        if self._holding:
+            task.cancel()
+        # A pause already in flight must finish before anything else
+        # touches the recorder.
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def action_starting(self) -> None:
+        await self._settle()
+        if self.recorder.paused:
+            self.resume_waits.append(await self.recorder.resume())
+
+    async def close(self) -> None:
+        """Drop any scheduled pause, leaving the recorder as it is."""
+        await self._settle()
@@ -5,28 +5,285 @@ Called by Claude Code (or any agent) to record a UI verification session.
 
 Usage:
     python -m demo_recorder.cli --tasks '[{"id":"login-success","description":"..."}]' --base-url http://localhost:3000
+    python -m demo_recorder.cli drain-uploads       # retry uploads that failed earlier
+    python -m demo_recorder.cli serve               # keep a warm daemon; later calls use it
+    python -m demo_recorder.cli batch --suites suites.jsonl --concurrency 4 --headless
+    python -m demo_recorder.cli enqueue --priority pr --tasks '[...]' --headless   # then: worker
 
 Output (stdout, parseable by the caller):
     VERDICT: pass
     REASONING: Both verification steps completed successfully...
     VIDEO: /path/to/demos/2026-03-01-120000/recording.mp4
+    VIDEO_META: {"duration": 12.4, "codec": "h264", "width": 1920, "height": 1080, ...}
     OUTPUT_DIR: /path/to/demos/2026-03-01-120000
 """
 
 import argparse
 import asyncio
 import json
+import os
 import sys
 from pathlib import Path
 
-from dotenv import load_dotenv
+# Only light imports up here: when a daemon is running, `record` hands the
+# job over without ever loading browser_use, the LLM clients or httpx.
+from demo_recorder.daemon import DEFAULT_SOCKET, forwarded_env, serve, submit
 
-load_dotenv()
 
-from demo_recorder.task_runner import run_tasks
+def _run(coro):
+    """asyncio.run() that also closes the pooled Convex client before the loop ends."""
+    from demo_recorder.uploader import close_convex_client
+
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_convex_client()
+
+    return asyncio.run(main())
+
+
+def drain_uploads(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="record-demo drain-uploads",
+        description="Retry uploads that were spooled after failing during a recording",
+    )
+    parser.add_argument(
+        "--spool-dir",
+        type=str,
+        default=None,
+        help="Spool directory (default: $DEMO_RECORDER_SPOOL or ~/.cache/demo-recorder/spool)",
+    )
+    args = parser.parse_args(argv)
+
+    from demo_recorder.spool import UploadSpool
+
+    spool = UploadSpool(Path(args.spool_dir) if args.spool_dir else None)
+    results = _run(spool.drain())
+    for entry, url in results:
+        print(f"OUTPUT_DIR: {entry.output_dir}")
+        print(f"VIDEO_URL: {url}" if url else f"SPOOLED: {entry.id} ({entry.last_error})")
+
+    remaining = len(spool.entries())
+    print(f"DRAINED: {sum(1 for _, url in results if url)}, REMAINING: {remaining}")
+    if remaining:
+        sys.exit(1)
+
+
+def serve_command(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="record-demo serve",
+        description="Keep imports, LLM clients and warm browsers loaded and run record jobs sent by record-demo",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help=f"Unix socket to listen on (default: $DEMO_RECORDER_SOCKET or {DEFAULT_SOCKET})",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=1,
+        help="Warm browsers kept per headless capture backend (default: 1, 0 disables the pool)",
+    )
+    parser.add_argument(
+        "--max-uses",
+        type=int,
+        default=20,
+        help="Runs before a pooled browser is recycled (default: 20)",
+    )
+    parser.add_argument(
+        "--warm",
+        choices=["x11grab", "screencast", "none"],
+        default="x11grab",
+        help="Capture backend whose browsers are launched at startup (default: x11grab); others warm up on first use",
+    )
+    parser.add_argument(
+        "--max-jobs",
+        type=int,
+        default=2,
+        help="Record jobs run at the same time; others queue (default: 2)",
+    )
+    args = parser.parse_args(argv)
+    serve(
+        Path(args.socket) if args.socket else None,
+        pool_size=args.pool_size,
+        max_uses=args.max_uses,
+        max_jobs=args.max_jobs,
+        warm=None if args.warm == "none" else args.warm,
+    )
+
+
+def batch_command(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="record-demo batch",
+        description="Record many task suites from a JSONL file, a few at a time",
+    )
+    parser.add_argument(
+        "--suites",
+        type=str,
+        required=True,
+        help='JSONL file, or - for stdin; one suite per line: {"id": "...", "tasks": [...], ...overrides}',
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=2,
+        help="Suites recorded at the same time (default: 2)",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=None,
+        help="Warm browsers shared by headless suites (default: --concurrency, 0 disables the pool)",
+    )
+    parser.add_argument(
+        "--results",
+        type=str,
+        default=None,
+        help="Also append each suite's result line to this JSONL file",
+    )
+    add_run_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from demo_recorder.batch import run_batch
+
+    results = _run(run_batch(
+        args.suites,
+        run_suite,
+        run_options(args),
+        concurrency=args.concurrency,
+        pool_size=args.pool_size,
+        results_path=Path(args.results) if args.results else None,
+    ))
+    failed = sum(1 for r in results if not r["success"])
+    print(f"SUITES: {len(results)}, FAILED: {failed}")
+    if failed:
+        sys.exit(1)
+
+
+def _queue_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--queue",
+        type=str,
+        default=None,
+        help="Queue database (default: $DEMO_RECORDER_QUEUE or ~/.cache/demo-recorder/jobs.db)",
+    )
+
+
+def enqueue_command(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="record-demo enqueue",
+        description="Queue a recording for `record-demo worker`; other flags are the usual record flags",
+    )
+    _queue_argument(parser)
+    parser.add_argument(
+        "--priority",
+        type=str,
+        default="default",
+        help="pr (0), default (50), nightly (100) or a number; lower runs first",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Attempts before the job is marked failed (default: 3)",
+    )
+    args, record_argv = parser.parse_known_args(argv)
+    record_parser().parse_args(record_argv)  # reject bad record flags now, not in the worker
+
+    from demo_recorder.jobqueue import JobQueue, parse_priority
+
+    try:
+        priority = parse_priority(args.priority)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    queue = JobQueue(Path(args.queue) if args.queue else None)
+    payload = {"argv": record_argv, "cwd": str(Path.cwd()), "env": _caller_env()}
+    job_id = queue.enqueue(payload, priority, args.max_attempts)
+    print(f"JOB_ID: {job_id}")
+
+
+def worker_command(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="record-demo worker",
+        description="Run queued recordings one at a time, each in its own process",
+    )
+    _queue_argument(parser)
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=2.0,
+        help="Seconds between polls of an empty queue (default: 2)",
+    )
+    parser.add_argument(
+        "--lease-sec",
+        type=float,
+        default=60.0,
+        help="Lease length; the worker heartbeats every third of it (default: 60)",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Exit when the queue is empty instead of waiting for more jobs",
+    )
+    args = parser.parse_args(argv)
+
+    from demo_recorder.jobqueue import JobQueue, run_worker
+
+    queue = JobQueue(Path(args.queue) if args.queue else None, lease_sec=args.lease_sec)
+    asyncio.run(run_worker(queue, args.poll, args.once))
+
+
+def queue_stats(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="record-demo queue-stats",
+        description="Print queue depth and wait-time metrics as JSON",
+    )
+    _queue_argument(parser)
+    args = parser.parse_args(argv)
+
+    from demo_recorder.jobqueue import JobQueue
+
+    print(json.dumps(JobQueue(Path(args.queue) if args.queue else None).metrics(), indent=2))
+
+
+COMMANDS = {
+    "drain-uploads": drain_uploads,
+    "serve": serve_command,
+    "batch": batch_command,
+    "enqueue": enqueue_command,
+    "worker": worker_command,
+    "queue-stats": queue_stats,
+}
 
 
 def main() -> None:
+    argv = sys.argv[1:]
+    if argv and argv[0] in COMMANDS:
+        _load_env()
+        COMMANDS[argv[0]](argv[1:])
+        return
+    record(argv)
+
+
+def _load_env() -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def _caller_env() -> dict[str, str]:
+    """What this process would run a job with: the same .env _load_env reads, plus os.environ."""
+    from dotenv import dotenv_values, find_dotenv
+
+    dotenv = {k: v for k, v in dotenv_values(find_dotenv()).items() if v is not None}
+    return forwarded_env(dict(os.environ), dotenv)
+
+
+def record_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Run browser-use demo recorder from the CLI",
     )
@@ -36,6 +293,17 @@ def main() -> None:
         required=True,
         help='JSON array of tasks: \'[{"id": "step-1", "description": "..."}]\'',
     )
+    add_run_arguments(parser)
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Run in this process even if a record-demo serve daemon is running",
+    )
+    return parser
+
+
+def add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    """Flags shared by a single recording and `batch` (where they are per-suite defaults)."""
     parser.add_argument(
         "--base-url",
         type=str,
@@ -71,51 +339,152 @@ def main() -> None:
         action="store_true",
         help="Run browser in headless mode (required for containers/CI)",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--capture-mode",
+        choices=["vfr", "cfr"],
+        default="vfr",
+        help="Headless screen capture: vfr only encodes changed frames (default), cfr encodes constant 25 fps",
+    )
+    parser.add_argument(
+        "--no-pause-idle",
+        action="store_true",
+        help="Keep capturing while the agent waits on the LLM (headless mode pauses capture by default)",
+    )
+    parser.add_argument(
+        "--idle-hold",
+        type=float,
+        default=1.0,
+        help="Seconds of capture kept after each action before pausing (default: 1.0)",
+    )
+    parser.add_argument(
+        "--container",
+        choices=["fmp4", "mp4", "hls"],
+        default="fmp4",
+        help="Headless recording format: fragmented MP4 (default, crash-safe), mp4, or hls segments + playlist",
+    )
+    parser.add_argument(
+        "--capture-backend",
+        choices=["x11grab", "screencast"],
+        default="x11grab",
+        help="Headless capture source: x11grab of an Xvfb display (default), or Chrome's DevTools screencast (no Xvfb)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10,
+        help="Tasks per agent; longer lists run as consecutive fresh agents in one browser and recording (default: 10, 0 = one agent)",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split the tasks into up to N independent groups run as concurrent sessions, stitched into one video (default: 1)",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=["route", "id"],
+        default="route",
+        help="Group tasks for --shards by the route they navigate to (default) or by id prefix (auth-1, auth-2 → auth)",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Replay the cached actions of an earlier passing run of the same tasks and pages without the LLM; diverging chunks fall back to the agent",
+    )
+    parser.add_argument(
+        "--no-direct",
+        action="store_true",
+        help="Send every task to the agent, including ones written in the task grammar (Navigate / Type / Click / Confirm id=...)",
+    )
+
+
+def run_options(args: argparse.Namespace) -> dict:
+    """run_tasks / run_sharded keyword arguments for the parsed run flags."""
+    options = {
+        "base_url": args.base_url,
+        "output_dir": args.output_dir,
+        "max_steps": args.max_steps,
+        "model": args.model,
+        "convex_url": args.convex_url,
+        "headless": args.headless,
+        "capture_mode": args.capture_mode,
+        "pause_idle": not args.no_pause_idle,
+        "idle_hold_sec": args.idle_hold,
+        "container": args.container,
+        "capture_backend": args.capture_backend,
+        "chunk_size": args.chunk_size or None,
+        "replay": args.replay,
+        "direct": not args.no_direct,
+    }
+    if args.shards > 1:
+        options.update(shards=args.shards, group_by=args.shard_by)
+    return options
+
+
+async def run_suite(tasks: list[dict], options: dict):
+    """run_tasks, or run_sharded when options ask for shards."""
+    if options.get("shards", 1) > 1:
+        from demo_recorder.shards import run_sharded
+
+        return await run_sharded(tasks, **options)
+    from demo_recorder.task_runner import run_tasks
+
+    return await run_tasks(tasks, **options)
+
+
+def record(argv: list[str]) -> None:
+    args = record_parser().parse_args(argv)
+    if not args.no_daemon:
+        code = submit(argv, env=_caller_env())
+        if code is not None:
+            sys.exit(code)
+    _load_env()
+    sys.exit(_run(run_record(args)))
+
+
+async def run_record(args: argparse.Namespace, cwd: Path | None = None, llm=None, browser_pool=None) -> int:
+    """
+    Run one record job and print its parseable result; returns the exit code.
+
+    The daemon calls this with the client's cwd (relative and default
+    output directories resolve against it), its cached LLM and a pool.
+    """
+    from demo_recorder.task_runner import default_output_dir
 
     # Parse tasks JSON
     try:
         tasks = json.loads(args.tasks)
     except json.JSONDecodeError as e:
         print(f"ERROR: --tasks is not valid JSON: {e}", file=sys.stderr)
-        sys.exit(1)
+        return 1
 
     if not isinstance(tasks, list) or not tasks:
         print("ERROR: --tasks must be a non-empty JSON array", file=sys.stderr)
-        sys.exit(1)
+        return 1
+
+    options = run_options(args)
+    if cwd is not None:
+        output_dir = options["output_dir"]
+        options["output_dir"] = cwd / output_dir if output_dir else default_output_dir(cwd)
 
-    # Run the demo
-    result = asyncio.run(
-        run_tasks(
-            tasks=tasks,
-            base_url=args.base_url,
-            output_dir=args.output_dir,
-            max_steps=args.max_steps,
-            model=args.model,
-            convex_url=args.convex_url,
-            headless=args.headless,
-        )
-    )
-
-    # Find the video file (trimmed recording.mp4 preferred, fallback to raw)
-    video_path = None
-    for pattern in ("recording.mp4", "*.mp4", "*.webm"):
-        matches = list(result.output_path.glob(pattern))
-        if matches:
-            video_path = matches[0]
-            break
-
-    # Structured output Claude Code can parse
+    # Run the demo, as concurrent shards if asked to
+    result = await run_suite(tasks, {**options, "llm": llm, "browser_pool": browser_pool})
+
+    # Structured output Claude Code can parse. The video was picked and
+    # probed once by run_tasks (also in OUTPUT_DIR/manifest.json).
     print(f"VERDICT: {result.verdict or 'unknown'}")
     print(f"REASONING: {result.verdict_reasoning or ''}")
-    print(f"VIDEO: {video_path or 'not found'}")
+    print(f"VIDEO: {result.video_path or 'not found'}")
+    if result.media:
+        print(f"VIDEO_META: {json.dumps(result.media)}")
     print(f"OUTPUT_DIR: {result.output_path}")
     if result.video_url:
         print(f"VIDEO_URL: {result.video_url}")
 
     if not result.success:
         print(f"ERROR: {result.error}", file=sys.stderr)
-        sys.exit(1)
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,324 @@
+"""
+daemon.py — `record-demo serve`: a resident process that runs record jobs.
+
+A one-shot `record-demo` pays for importing browser_use / langchain /
+httpx, building the LLM client and launching a browser before the agent's
+first step. The daemon does all of that once and keeps it: imports stay
+loaded, LLM clients are cached per model and headless runs lease warm
+browsers from a BrowserPool per capture backend.
+
+`record-demo` connects to the daemon's Unix socket when it is running and
+sends its own argv, cwd and environment (see forwarded_env). Everything the
+job prints (progress, VERDICT, VIDEO, OUTPUT_DIR, ...) is streamed back and
+the client exits with the job's exit code, so callers see exactly what a
+local run would print.
+
+The caller's API keys, Convex settings and .env values are applied to
+os.environ for the duration of the job; jobs with the same environment run
+side by side, a job with a different one waits until they are done. The
+DEMO_RECORDER_* paths are read once at import, so a caller whose values
+differ from the daemon's is refused and runs the job itself.
+
+Wire format — newline-delimited JSON over the socket:
+    client → {"argv": [...], "cwd": "/path", "env": {...}}
+    daemon → {"out": "text"} / {"err": "text"} ... then {"exit": 0}
+             or, before any output, {"refused": "reason"}
+
+This module is imported by the client on every call, so the client half
+only uses the standard library; the daemon half imports the heavy
+modules when it starts.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+from pathlib import Path
+
+DEFAULT_SOCKET = Path(
+    os.environ.get("DEMO_RECORDER_SOCKET")
+    or Path.home() / ".cache" / "demo-recorder" / "daemon.sock"
+)
+
+
+# ── Environment ────────────────────────────────────────────────────────
+
+# Read once when the modules load (spool, artifact index, replay cache), so
+# they cannot differ per job; the socket only matters to the client
+FIXED_PREFIX = "DEMO_RECORDER_"
+CLIENT_ONLY = {"DEMO_RECORDER_SOCKET"}
+
+
+def is_forwarded(key: str) -> bool:
+    """Variables a job depends on: our own settings, Convex and API keys."""
+    return key.startswith((FIXED_PREFIX, "CONVEX")) or key.endswith("_API_KEY")
+
+
+def forwarded_env(environ: dict[str, str], dotenv: dict[str, str] | None = None) -> dict[str, str]:
+    """
+    The environment a local run of the caller would see for the job: every
+    .env value (os.environ wins, as with load_dotenv) plus the forwarded
+    variables of environ.
+    """
+    env = {**(dotenv or {})}
+    env.update((k, v) for k, v in environ.items() if k in env or is_forwarded(k))
+    return {k: v for k, v in env.items() if k not in CLIENT_ONLY}
+
+
+def job_overlay(base: dict[str, str], env: dict[str, str]) -> dict[str, str | None]:
+    """Changes to the daemon's environment `base` for a job sent `env`; None unsets."""
+    keys = {k for k in base if is_forwarded(k)} | set(env)
+    return {k: env.get(k) for k in keys - CLIENT_ONLY if not k.startswith(FIXED_PREFIX)}
+
+
+def fixed_mismatch(base: dict[str, str], env: dict[str, str]) -> list[str]:
+    """DEMO_RECORDER_* variables whose caller value differs from the daemon's."""
+    keys = {k for k in (*base, *env) if k.startswith(FIXED_PREFIX)} - CLIENT_ONLY
+    return sorted(k for k in keys if base.get(k) != env.get(k))
+
+
+# ── Client ─────────────────────────────────────────────────────────────
+
+def submit(
+    argv: list[str],
+    socket_path: Path | None = None,
+    env: dict[str, str] | None = None,
+) -> int | None:
+    """
+    Run `record-demo <argv>` in the daemon with the caller's forwarded
+    environment `env`, relaying its output.
+
+    Returns the job's exit code, or None if no daemon is listening or it
+    refused the job (the caller then runs the job itself).
+    """
+    path = socket_path or DEFAULT_SOCKET
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None  # stale socket from a daemon that is gone
+
+    with sock, sock.makefile("rwb") as stream:
+        request = {"argv": argv, "cwd": os.getcwd(), "env": env if env is not None else forwarded_env(dict(os.environ))}
+        stream.write(json.dumps(request).encode() + b"\n")
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+            elif "err" in message:
+                sys.stderr.write(message["err"])
+                sys.stderr.flush()
+            elif "exit" in message:
+                return message["exit"]
+            elif "refused" in message:
+                print(f"record-demo daemon: {message['refused']}; running locally", file=sys.stderr)
+                return None
+    print("ERROR: record-demo daemon closed the connection mid-job", file=sys.stderr)
+    return 1
+
+
+# ── Per-job output routing ─────────────────────────────────────────────
+
+# The job a coroutine belongs to. asyncio tasks and to_thread() calls copy
+# the context, so everything a job prints — including from its helper
+# tasks — reaches that job's client.
+_job_writer: contextvars.ContextVar[asyncio.StreamWriter | None] = contextvars.ContextVar(
+    "_job_writer", default=None,
+)
+
+
+class _JobStream(io.TextIOBase):
+    """sys.stdout / sys.stderr replacement that sends a job's output to its client."""
+
+    def __init__(self, stream, key: str, loop: asyncio.AbstractEventLoop):
+        self._stream = stream
+        self._key = key
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def write(self, text: str) -> int:
+        writer = _job_writer.get()
+        if writer is None or writer.is_closing():
+            return self._stream.write(text)
+        data = json.dumps({self._key: text}).encode() + b"\n"
+        if threading.get_ident() == self._loop_thread:
+            writer.write(data)
+        else:  # a job's to_thread() helper; transports are not thread-safe
+            self._loop.call_soon_threadsafe(writer.write, data)
+        return len(text)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+# ── Daemon ─────────────────────────────────────────────────────────────
+
+class RecordDaemon:
+    def __init__(
+        self,
+        socket_path: Path | None = None,
+        pool_size: int = 1,
+        max_uses: int = 20,
+        max_jobs: int = 2,
+        warm: str | None = "x11grab",
+    ):
+        self.socket_path = socket_path or DEFAULT_SOCKET
+        self.pool_size = pool_size
+        self.max_uses = max_uses
+        self.warm = warm   # backend whose pool is launched up front
+        self._jobs = asyncio.Semaphore(max_jobs)
+        self._pools: dict = {}   # capture backend -> BrowserPool
+        self._llms: dict = {}    # (model, job environment) -> LLM client
+        self.served = 0
+        self._base_env = dict(os.environ)  # the daemon's own, restored between environments
+        self._env_key: str | None = None   # environment the running jobs share
+        self._env_jobs = 0
+        self._env_changed = asyncio.Condition()
+
+    def _pool(self, backend: str):
+        from .browser_pool import BrowserPool
+
+        if self.pool_size <= 0:
+            return None
+        if backend not in self._pools:
+            self._pools[backend] = BrowserPool(self.pool_size, backend, max_uses=self.max_uses)
+        return self._pools[backend]
+
+    def _llm(self, model: str, env_key: str):
+        from .recorder import get_llm
+
+        # Clients read their API key when built, so each environment gets its own
+        if (model, env_key) not in self._llms:
+            self._llms[model, env_key] = get_llm(model)
+        return self._llms[model, env_key]
+
+    def _apply_env(self, overlay: dict[str, str | None]) -> None:
+        for key in set(os.environ) - set(self._base_env):
+            del os.environ[key]
+        os.environ.update(self._base_env)
+        for key, value in overlay.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    @contextlib.asynccontextmanager
+    async def _job_env(self, env: dict[str, str]):
+        """Apply a job's environment; yields its key. Jobs with another one wait."""
+        overlay = job_overlay(self._base_env, env)
+        key = json.dumps(overlay, sort_keys=True)
+        async with self._env_changed:
+            await self._env_changed.wait_for(lambda: self._env_jobs == 0 or self._env_key == key)
+            if self._env_key != key:
+                self._apply_env(overlay)
+                self._env_key = key
+            self._env_jobs += 1
+        try:
+            yield key
+        finally:
+            async with self._env_changed:
+                self._env_jobs -= 1
+                if self._env_jobs == 0:  # idle: back to the daemon's own environment
+                    self._apply_env({})
+                    self._env_key = None
+                self._env_changed.notify_all()
+
+    async def _run_job(self, request: dict) -> int:
+        from .cli import record_parser, run_record
+
+        try:
+            args = record_parser().parse_args(request["argv"])
+        except SystemExit as exc:  # argparse already printed why
+            return exc.code if isinstance(exc.code, int) else 2
+        async with self._jobs, self._job_env(request.get("env", {})) as env_key:
+            return await run_record(
+                args,
+                cwd=Path(request["cwd"]),
+                llm=self._llm(args.model, env_key),
+                browser_pool=self._pool(args.capture_backend) if args.headless else None,
+            )
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        _job_writer.set(writer)  # this connection's task and everything it spawns
+        reply: dict
+        try:
+            request = json.loads(await reader.readline())
+            mismatch = fixed_mismatch(self._base_env, request.get("env", {}))
+            if mismatch:
+                reply = {"refused": f"caller and daemon disagree on {', '.join(mismatch)}"}
+            else:
+                reply = {"exit": await self._run_job(request)}
+        except Exception as exc:  # noqa: BLE001 — report to the client, keep serving
+            print(f"ERROR: {type(exc).__name__}: {exc}", file=sys.stderr)
+            reply = {"exit": 1}
+        if "exit" in reply:
+            self.served += 1
+        _job_writer.set(None)
+        try:
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass  # client went away; the job's artifacts are still on disk
+
+    def _claim_socket(self) -> None:
+        if self.socket_path.exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(str(self.socket_path))
+            except OSError:
+                self.socket_path.unlink()  # left behind by a daemon that died
+            else:
+                raise RuntimeError(f"A record-demo daemon is already listening on {self.socket_path}")
+            finally:
+                probe.close()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def serve(self) -> None:
+        from .uploader import close_convex_client
+        from . import task_runner  # noqa: F401 — load browser_use & co. before the first job
+
+        self._claim_socket()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+
+        server = await asyncio.start_unix_server(self._handle, path=str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        if self.pool_size > 0 and self.warm:
+            try:
+                await self._pool(self.warm).start()
+            except RuntimeError as exc:
+                print(f"  ⚠️ Could not pre-warm {self.warm} browsers ({exc}); jobs will launch them")
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = _JobStream(stdout, "out", loop), _JobStream(stderr, "err", loop)
+        print(f"record-demo daemon listening on {self.socket_path} (pid {os.getpid()})")
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            server.close()
+            self.socket_path.unlink(missing_ok=True)
+            for pool in self._pools.values():
+                await pool.close()
+            await close_convex_client()
+            sys.stdout, sys.stderr = stdout, stderr
+            print(f"record-demo daemon stopped after {self.served} job(s)")
+
+
+def serve(socket_path: Path | None = None, **options) -> None:
+    """Run the daemon in the foreground until SIGINT / SIGTERM."""
+    asyncio.run(RecordDaemon(socket_path, **options).serve())
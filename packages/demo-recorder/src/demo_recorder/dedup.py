@@ -0,0 +1,109 @@
+"""
+dedup.py — content-addressed index of artifacts already in Convex storage.
+
+Re-runs and retried CI jobs often produce byte-identical artifacts. Every
+successful upload records sha256 → storageId/URL here (per deployment), and
+upload_blob skips the transfer when the content is already stored.
+
+An entry is only trusted for MAX_AGE_SEC, and upload_blob checks that a
+hit's URL still answers before using it; a blob deleted from storage is
+evicted and uploaded again.
+
+Hashes are computed as the bytes are produced where possible (fragmented
+MP4 recordings are hashed while ffmpeg streams them to disk, see
+ScreenRecorder; the events file and thumbnail are hashed in memory);
+sha256_file is the fallback for files written by someone else.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_INDEX_PATH = Path(
+    os.environ.get(
+        "DEMO_RECORDER_ARTIFACT_INDEX",
+        Path.home() / ".cache" / "demo-recorder" / "artifacts.db",
+    )
+)
+
+HASH_CHUNK = 1024 * 1024
+MAX_AGE_SEC = 7 * 24 * 3600
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactIndex:
+    """
+    sqlite-backed map of (deployment, sha256) → stored blob.
+
+    Each call opens its own connection, so one index can be used from
+    worker threads and by several processes at once.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path or DEFAULT_INDEX_PATH)
+        self._ready = False
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            with conn:  # commits on success
+                yield conn
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " convex_url TEXT NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " storage_id TEXT NOT NULL,"
+                " url TEXT,"
+                " bytes INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " PRIMARY KEY (convex_url, sha256))"
+            )
+            self._ready = True
+        return conn
+
+    def lookup(
+        self, convex_url: str, sha256: str, max_age_sec: float = MAX_AGE_SEC,
+    ) -> tuple[str, str | None] | None:
+        """(storageId, url) of an identical blob stored within max_age_sec, or None."""
+        with self._db() as conn:
+            row = conn.execute(
+                "SELECT storage_id, url FROM artifacts"
+                " WHERE convex_url = ? AND sha256 = ? AND stored_at >= ?",
+                (convex_url, sha256, time.time() - max_age_sec),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def evict(self, convex_url: str, sha256: str) -> None:
+        """Forget a blob that is no longer in storage."""
+        with self._db() as conn:
+            conn.execute("DELETE FROM artifacts WHERE convex_url = ? AND sha256 = ?", (convex_url, sha256))
+
+    def record(self, convex_url: str, sha256: str, storage_id: str, url: str | None, size: int) -> None:
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?)",
+                (convex_url, sha256, storage_id, url, size, time.time()),
+            )
+
+
+ARTIFACT_INDEX = ArtifactIndex()
@@ -0,0 +1,250 @@
+"""
+direct.py — runs tasks written in the task grammar without the LLM.
+
+The README asks for tasks like
+
+    Navigate to /login. Type admin into id=username. Click id=submit.
+    Confirm id=success-banner is visible.
+
+Every sentence of such a task maps to one browser action or assertion:
+
+    Navigate to <path or URL>           Page.navigate, then wait for the load
+    Type <text> into id=<id>            focus + select the element, insert text
+    Click id=<id>                       a real mouse click at the element's centre
+    Confirm id=<id> is visible          the element has a box and is not hidden
+    Confirm id=<id> contains <text>     the element's text (or value) includes it
+
+Text may be quoted ("...") when it contains a full stop. compile_task
+turns a description into DirectSteps, or None when any sentence is
+outside the grammar; run_tasks then hands that task to the agent.
+
+DirectDriver executes the steps over CDP on the browser-use session —
+the same browser the agent and the recording use — and reports a verdict
+without a judge call. An element that never shows up within
+selector_timeout raises DirectStepError, and the agent takes the task
+over from the page it is on. A Confirm whose element is there but does
+not satisfy it fails the task.
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+# A sentence ends at a full stop / semicolon followed by a space, the end of
+# the description or (missing space) the next sentence's keyword
+_NEXT = r"(?=(?:Navigate to|Type|Click|Confirm) )"
+_END = r"(?:[.;,]?(?:\s+|$)|[.;]" + _NEXT + ")"
+_SENTENCE_END = r"(?:[.;](?:\s+|$|" + _NEXT + ")|$)"   # free text runs on to the end of the sentence
+_ID = r"id=(?P<id>[A-Za-z_][\w:-]*)"
+_TEXT = r'(?:"(?P<quoted>[^"]*)"|(?P<text>.+?))'
+
+STEP_PATTERNS = {
+    "navigate": re.compile(r"Navigate to (?P<url>\S+?)" + _END),
+    "type": re.compile(r"Type " + _TEXT + r" into " + _ID + _END),
+    "click": re.compile(r"Click " + _ID + _END),
+    "visible": re.compile(r"Confirm " + _ID + r" is visible" + _END),
+    "contains": re.compile(r"Confirm " + _ID + r" contains " + _TEXT + _SENTENCE_END),
+}
+
+# Where an id'd element is, whether it can be seen and what it says
+_FIND_JS = """(() => {
+  const el = document.getElementById(%s);
+  if (!el) return null;
+  el.scrollIntoView({block: "center", inline: "center"});
+  const r = el.getBoundingClientRect();
+  const s = getComputedStyle(el);
+  const value = typeof el.value === "string" ? el.value + " " : "";
+  return {
+    x: r.left + r.width / 2,
+    y: r.top + r.height / 2,
+    visible: r.width > 0 && r.height > 0 && s.visibility !== "hidden" && s.display !== "none",
+    text: value + (el.innerText || el.textContent || ""),
+  };
+})()"""
+
+_FOCUS_JS = """(() => {
+  const el = document.getElementById(%s);
+  el.focus();
+  if (typeof el.select === "function") el.select();
+})()"""
+
+
+@dataclass
+class DirectStep:
+    kind: str             # a key of STEP_PATTERNS
+    target: str           # URL / path for navigate, element id otherwise
+    text: str | None = None
+
+    def describe(self) -> str:
+        return {
+            "navigate": f"Navigate to {self.target}",
+            "type": f"Type {self.text!r} into id={self.target}",
+            "click": f"Click id={self.target}",
+            "visible": f"Confirm id={self.target} is visible",
+            "contains": f"Confirm id={self.target} contains {self.text!r}",
+        }[self.kind]
+
+
+def compile_task(description: str) -> list[DirectStep] | None:
+    """The task's steps, or None if any part of it is outside the grammar."""
+    description = description.strip()
+    steps: list[DirectStep] = []
+    position = 0
+    while position < len(description):
+        for kind, pattern in STEP_PATTERNS.items():
+            match = pattern.match(description, position)
+            if match:
+                break
+        else:
+            return None
+        groups = match.groupdict()
+        if kind == "navigate":
+            steps.append(DirectStep(kind, groups["url"]))
+        else:
+            text = groups.get("quoted")
+            steps.append(DirectStep(kind, groups["id"], groups.get("text") if text is None else text))
+        position = match.end()
+    return steps or None
+
+
+class DirectStepError(Exception):
+    """A step that cannot run directly (element missing, navigation error); the agent takes over."""
+
+
+@dataclass
+class DirectResult:
+    passed: bool
+    reasoning: str
+    # (time.monotonic(), event without atMs) for every click / type
+    events: list[tuple[float, dict]] = field(default_factory=list)
+    fallback: str | None = None   # set when the agent has to take the task over
+
+
+class DirectDriver:
+    def __init__(
+        self,
+        browser_session,
+        base_url: str,
+        selector_timeout: float = 5.0,
+        load_timeout: float = 15.0,
+        action_delay: float = 1.0,
+    ):
+        self.browser_session = browser_session
+        self.base_url = base_url.rstrip("/")
+        self.selector_timeout = selector_timeout
+        self.load_timeout = load_timeout
+        self.action_delay = action_delay   # keeps each action on screen, like wait_between_actions
+
+    async def _evaluate(self, expression: str):
+        tab = await self.browser_session.get_or_create_cdp_session(focus=True)
+        reply = await tab.cdp_client.send.Runtime.evaluate(
+            params={"expression": expression, "returnByValue": True}, session_id=tab.session_id,
+        )
+        if "exceptionDetails" in reply:
+            raise RuntimeError(reply["exceptionDetails"].get("text", "script error"))
+        return reply["result"].get("value")
+
+    async def _send_mouse(self, kind: str, x: float, y: float) -> None:
+        tab = await self.browser_session.get_or_create_cdp_session(focus=True)
+        params = {"type": kind, "x": x, "y": y}
+        if kind != "mouseMoved":
+            params.update(button="left", clickCount=1)
+        await tab.cdp_client.send.Input.dispatchMouseEvent(params=params, session_id=tab.session_id)
+
+    async def find(self, element_id: str, until: Callable[[dict], bool]) -> dict | None:
+        """
+        Poll the element until `until(info)` holds or selector_timeout runs
+        out. Returns the last info seen (None if the element never existed).
+        """
+        deadline = time.monotonic() + self.selector_timeout
+        info = None
+        while True:
+            try:
+                info = await self._evaluate(_FIND_JS % json.dumps(element_id)) or info
+            except Exception:  # noqa: BLE001 — page navigating, context destroyed
+                pass
+            if info is not None and until(info):
+                return info
+            if time.monotonic() >= deadline:
+                return info
+            await asyncio.sleep(0.2)
+
+    async def _visible(self, element_id: str) -> dict:
+        info = await self.find(element_id, lambda i: i["visible"])
+        if info is None or not info["visible"]:
+            state = "is not visible" if info else "was not found"
+            raise DirectStepError(f"id={element_id} {state} after {self.selector_timeout:g}s")
+        return info
+
+    async def navigate(self, target: str) -> None:
+        url = self.base_url + target if target.startswith("/") else target
+        tab = await self.browser_session.get_or_create_cdp_session(focus=True)
+        reply = await tab.cdp_client.send.Page.navigate(params={"url": url}, session_id=tab.session_id)
+        if reply.get("errorText"):
+            raise DirectStepError(f"navigating to {url} failed: {reply['errorText']}")
+        deadline = time.monotonic() + self.load_timeout
+        while time.monotonic() < deadline:
+            try:
+                if await self._evaluate("document.readyState") == "complete":
+                    return
+            except Exception:  # noqa: BLE001 — the new document is not there yet
+                pass
+            await asyncio.sleep(0.2)
+        raise DirectStepError(f"{url} did not finish loading within {self.load_timeout:g}s")
+
+    async def click(self, element_id: str) -> dict:
+        info = await self._visible(element_id)
+        for kind in ("mouseMoved", "mousePressed", "mouseReleased"):
+            await self._send_mouse(kind, info["x"], info["y"])
+        return {"type": "click", "x": int(info["x"]), "y": int(info["y"]), "note": f"click id={element_id}"}
+
+    async def type_text(self, element_id: str, text: str) -> dict:
+        info = await self._visible(element_id)
+        await self._evaluate(_FOCUS_JS % json.dumps(element_id))
+        tab = await self.browser_session.get_or_create_cdp_session(focus=True)
+        await tab.cdp_client.send.Input.insertText(params={"text": text}, session_id=tab.session_id)
+        return {"type": "click", "x": int(info["x"]), "y": int(info["y"]), "note": f"type: {text[:50]}"}
+
+    async def run(
+        self,
+        steps: list[DirectStep],
+        before_action: Callable[[], Awaitable[None]],
+        after_action: Callable[[], None],
+    ) -> DirectResult:
+        """Run one task's steps; before_action / after_action bracket each step."""
+        events: list[tuple[float, dict]] = []
+        for step in steps:
+            await before_action()
+            started = time.monotonic()
+            try:
+                if step.kind == "navigate":
+                    await self.navigate(step.target)
+                elif step.kind == "click":
+                    events.append((started, await self.click(step.target)))
+                elif step.kind == "type":
+                    events.append((started, await self.type_text(step.target, step.text)))
+                else:
+                    # A missing element goes to the agent; one that is there
+                    # but hidden or saying something else fails the check
+                    if step.kind == "visible":
+                        info = await self.find(step.target, lambda i: i["visible"])
+                    else:
+                        info = await self.find(step.target, lambda i, text=step.text: text in i["text"])
+                    if info is None:
+                        raise DirectStepError(f"id={step.target} was not found after {self.selector_timeout:g}s")
+                    if step.kind == "visible" and not info["visible"]:
+                        return DirectResult(False, f"{step.describe()} failed: it is hidden", events)
+                    if step.kind == "contains" and step.text not in info["text"]:
+                        found = " ".join(info["text"].split())[:80]
+                        return DirectResult(False, f"{step.describe()} failed: it reads {found!r}", events)
+                await asyncio.sleep(self.action_delay)
+            except DirectStepError as exc:
+                return DirectResult(False, "", events, fallback=f"{step.describe()}: {exc}")
+            except Exception as exc:  # noqa: BLE001 — CDP errors: let the agent try
+                return DirectResult(False, "", events, fallback=f"{step.describe()}: {type(exc).__name__}: {exc}")
+            finally:
+                after_action()
+        return DirectResult(True, f"{len(steps)} step(s) ran directly: " + "; ".join(s.describe() for s in steps), events)
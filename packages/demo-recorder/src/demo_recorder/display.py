@@ -0,0 +1,198 @@
+"""
+display.py — virtual X display allocation for concurrent recording sessions.
+
+Every headless run_tasks session leases its own Xvfb display from a
+process-wide pool instead of sharing :99, so several sessions can record on
+one host at the same time. The display is handed to child processes
+(Chromium, ffmpeg, xdotool) through their environment — os.environ is never
+mutated.
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import time
+from asyncio.subprocess import Process
+from dataclasses import dataclass
+from pathlib import Path
+
+from .process import kill, terminate
+
+X11_SOCKET_DIR = Path("/tmp/.X11-unix")
+X_LOCK_DIR = Path("/tmp")
+
+
+# ── Conflict detection ─────────────────────────────────────────────────
+
+def _lock_path(number: int) -> Path:
+    return X_LOCK_DIR / f".X{number}-lock"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # owned by another user, but alive
+    return True
+
+
+def display_in_use(number: int) -> bool:
+    """
+    Return True if display :number is owned by some X server.
+
+    A lock file whose pid is dead, or a socket nobody is listening on, is
+    stale — Xvfb cleans those up itself, so they don't count as conflicts.
+    """
+    lock_path = _lock_path(number)
+    if lock_path.exists():
+        try:
+            pid = int(lock_path.read_text().strip())
+        except (OSError, ValueError):
+            return True  # unreadable lock: assume someone owns it
+        if _pid_alive(pid):
+            return True
+
+    socket_path = X11_SOCKET_DIR / f"X{number}"
+    if socket_path.exists():
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(socket_path))
+            return True
+        except OSError:
+            return False
+        finally:
+            sock.close()
+
+    return False
+
+
+# ── Display pool ───────────────────────────────────────────────────────
+
+class DisplayPool:
+    """Hands out free X display numbers in [first, first + size)."""
+
+    def __init__(self, first: int = 99, size: int = 64):
+        self.first = first
+        self.size = size
+        self._leased: set[int] = set()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int:
+        with self._lock:
+            for number in range(self.first, self.first + self.size):
+                if number in self._leased or display_in_use(number):
+                    continue
+                self._leased.add(number)
+                return number
+        raise RuntimeError(
+            f"No free X display in :{self.first}-:{self.first + self.size - 1}"
+        )
+
+    def release(self, number: int) -> None:
+        with self._lock:
+            self._leased.discard(number)
+
+
+DISPLAY_POOL = DisplayPool()
+
+
+@dataclass
+class VirtualDisplay:
+    number: int
+    resolution: str
+    proc: Process
+    pool: DisplayPool
+    ready_sec: float = 0.0  # how long the X socket took to accept connections
+
+    @property
+    def name(self) -> str:
+        return f":{self.number}"
+
+    def env(self) -> dict[str, str]:
+        """Environment for a child process that should draw on this display."""
+        return {**os.environ, "DISPLAY": self.name}
+
+
+# ── Xvfb lifecycle ─────────────────────────────────────────────────────
+
+async def wait_for_x_socket(number: int, proc: Process, timeout: float = 10.0) -> float:
+    """
+    Wait until display :number accepts connections on its unix socket.
+
+    Returns the time actually waited. Raises RuntimeError if the X server
+    exits first — or if the socket that answered belongs to another X
+    server (its lock file names a different pid) — and TimeoutError if it
+    never comes up.
+    """
+    socket_path = str(X11_SOCKET_DIR / f"X{number}")
+    started = time.monotonic()
+    while True:
+        if proc.returncode is not None:
+            raise RuntimeError(f"Xvfb :{number} exited with code {proc.returncode}")
+        try:
+            _, writer = await asyncio.open_unix_connection(socket_path)
+        except OSError:
+            pass
+        else:
+            writer.close()
+            try:
+                owner = int(_lock_path(number).read_text().strip())
+            except (OSError, ValueError):
+                owner = None  # no readable lock: the socket is all we have
+            if proc.returncode is not None or (owner is not None and owner != proc.pid):
+                raise RuntimeError(f"X display :{number} answered, but it is not our Xvfb (lock pid {owner})")
+            return time.monotonic() - started
+        if time.monotonic() - started > timeout:
+            raise TimeoutError(f"Xvfb :{number} not ready after {timeout:.1f}s")
+        await asyncio.sleep(0.01)
+
+
+async def start_xvfb(
+    resolution: str = "1920x1080x24",
+    pool: DisplayPool | None = None,
+    attempts: int = 5,
+) -> VirtualDisplay:
+    """Start a virtual X display on the next free display number."""
+    pool = pool or DISPLAY_POOL
+    for _ in range(attempts):
+        number = pool.acquire()
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "Xvfb", f":{number}", "-screen", "0", resolution, "-ac", "-nolisten", "tcp",
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError:
+            pool.release(number)
+            raise
+        try:
+            ready_sec = await wait_for_x_socket(number, proc)
+        except RuntimeError:
+            # Another process grabbed this display between our check and
+            # Xvfb's own lock — its lock file now marks it as in use.
+            await kill(proc)
+            pool.release(number)
+            continue
+        except (TimeoutError, asyncio.CancelledError):
+            await asyncio.shield(kill(proc))
+            pool.release(number)
+            raise
+        print(f"  Xvfb started on :{number} ({resolution}), ready in {ready_sec:.2f}s")
+        return VirtualDisplay(
+            number=number, resolution=resolution, proc=proc, pool=pool, ready_sec=ready_sec,
+        )
+    raise RuntimeError(f"Xvfb failed to start after {attempts} attempts")
+
+
+async def stop_xvfb(display: VirtualDisplay | None) -> None:
+    """Terminate the Xvfb process and return its display number to the pool."""
+    if display is None:
+        return
+    try:
+        await terminate(display.proc, timeout=5)
+    finally:
+        display.pool.release(display.number)
@@ -0,0 +1,390 @@
+"""
+jobqueue.py — persistent local queue of recording jobs, and its workers.
+
+Callers enqueue a recording (the same flags `record-demo` takes) with a
+priority, and `record-demo worker` processes take jobs one at a time, most
+urgent first. This gives a host real backpressure instead of everybody
+launching browsers at once: the number of workers is the number of
+concurrent recordings.
+
+    record-demo enqueue --priority pr --tasks '[...]' --headless
+    record-demo worker                # as many as the host can record at once
+    record-demo queue-stats
+
+The queue is one sqlite file (WAL mode, so several worker processes share
+it). A dequeued job is leased to its worker for lease_sec; the worker
+heartbeats while the job runs, and a lease that expires (worker killed,
+host rebooted) puts the job back in the queue. Failed jobs are retried
+with exponential backoff up to max_attempts.
+
+Dequeue walks the (state, priority, available_at, id) index, so claiming a
+job stays O(log n) however large the backlog is.
+
+Each job runs in its own `record-demo --no-daemon` child process, so a
+crash, a leak or a hung browser only ever takes one job down. The job
+carries the enqueuer's forwarded environment (API keys, CONVEX_*, its
+.env; see daemon.forwarded_env), which the worker lays over its own for
+the child, so a job runs with the keys it was queued with. DEMO_RECORDER_*
+settings stay the worker's.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import sqlite3
+import statistics
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from .daemon import job_overlay
+from .process import terminate
+
+DEFAULT_QUEUE_PATH = Path(
+    os.environ.get(
+        "DEMO_RECORDER_QUEUE",
+        Path.home() / ".cache" / "demo-recorder" / "jobs.db",
+    )
+)
+
+# Lower runs first
+PRIORITIES = {"pr": 0, "default": 50, "nightly": 100}
+
+# Lines of `record-demo` output kept as the job's result
+RESULT_KEYS = ("VERDICT", "REASONING", "VIDEO", "VIDEO_META", "OUTPUT_DIR", "VIDEO_URL", "UPLOAD_SPOOLED")
+
+
+def parse_priority(value: str | int) -> int:
+    if isinstance(value, int):
+        return value
+    if value in PRIORITIES:
+        return PRIORITIES[value]
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Unknown priority {value!r} (a number, or one of {', '.join(PRIORITIES)})") from None
+
+
+@dataclass
+class Job:
+    id: int
+    priority: int
+    payload: dict       # {"argv": [...record-demo flags], "cwd": "..."}
+    attempts: int       # including the current one
+    max_attempts: int
+    enqueued_at: float
+
+
+class JobQueue:
+    """
+    sqlite-backed priority queue with leases.
+
+    Like ArtifactIndex, every call opens its own connection, so one queue
+    file is shared safely by threads and worker processes.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        lease_sec: float = 60.0,
+        retry_base_sec: float = 30.0,
+        retry_max_sec: float = 600.0,
+    ):
+        self.path = Path(path or DEFAULT_QUEUE_PATH)
+        self.lease_sec = lease_sec
+        self.retry_base_sec = retry_base_sec
+        self.retry_max_sec = retry_max_sec
+        self._ready = False
+
+    @contextmanager
+    def _db(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            if immediate:
+                # Take the write lock up front: read-then-claim must not race
+                conn.execute("BEGIN IMMEDIATE")
+            with conn:  # commits on success
+                yield conn
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " state TEXT NOT NULL,"              # queued / leased / done / failed
+                " priority INTEGER NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " max_attempts INTEGER NOT NULL,"
+                " enqueued_at REAL NOT NULL,"
+                " available_at REAL NOT NULL,"       # retry backoff: not before this
+                " leased_by TEXT,"
+                " lease_expires REAL,"
+                " started_at REAL,"                  # first lease
+                " finished_at REAL,"
+                " result TEXT,"
+                " last_error TEXT);"
+                "CREATE INDEX IF NOT EXISTS jobs_dequeue ON jobs (state, priority, available_at, id);"
+                "CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (state, lease_expires);"
+                "CREATE INDEX IF NOT EXISTS jobs_started ON jobs (started_at);"
+            )
+            self._ready = True
+        return conn
+
+    # ── Producer ───────────────────────────────────────────────────────
+
+    def enqueue(self, payload: dict, priority: str | int = "default", max_attempts: int = 3) -> int:
+        now = time.time()
+        with self._db() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (state, priority, payload, max_attempts, enqueued_at, available_at)"
+                " VALUES ('queued', ?, ?, ?, ?, ?)",
+                (parse_priority(priority), json.dumps(payload), max_attempts, now, now),
+            )
+            return cursor.lastrowid
+
+    # ── Worker side ────────────────────────────────────────────────────
+
+    def _reclaim_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            "UPDATE jobs SET state = 'failed', finished_at = ?, last_error = 'lease expired', leased_by = NULL"
+            " WHERE state = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+            (now, now),
+        )
+        conn.execute(
+            "UPDATE jobs SET state = 'queued', available_at = ?, last_error = 'lease expired', leased_by = NULL"
+            " WHERE state = 'leased' AND lease_expires < ?",
+            (now, now),
+        )
+
+    def dequeue(self, worker: str) -> Job | None:
+        """Lease the most urgent runnable job to `worker`, or None if there is none."""
+        now = time.time()
+        with self._db(immediate=True) as conn:
+            self._reclaim_expired(conn, now)
+            row = conn.execute(
+                "SELECT id, priority, payload, attempts, max_attempts, enqueued_at FROM jobs"
+                " WHERE state = 'queued' AND available_at <= ?"
+                " ORDER BY priority, available_at, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = 'leased', leased_by = ?, lease_expires = ?,"
+                " attempts = attempts + 1, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (worker, now + self.lease_sec, now, row[0]),
+            )
+        return Job(
+            id=row[0], priority=row[1], payload=json.loads(row[2]),
+            attempts=row[3] + 1, max_attempts=row[4], enqueued_at=row[5],
+        )
+
+    def heartbeat(self, job: Job, worker: str) -> bool:
+        """Extend the lease; False means it was lost and the job may run elsewhere."""
+        with self._db() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND state = 'leased' AND leased_by = ?",
+                (time.time() + self.lease_sec, job.id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job: Job, worker: str, result: dict) -> None:
+        with self._db() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = 'done', finished_at = ?, result = ?, leased_by = NULL"
+                " WHERE id = ? AND state = 'leased' AND leased_by = ?",
+                (time.time(), json.dumps(result), job.id, worker),
+            )
+
+    def fail(self, job: Job, worker: str, error: str, result: dict | None = None) -> bool:
+        """
+        Record a failed attempt. Returns True if the job will be retried;
+        False also when the lease was lost and nothing was recorded.
+        """
+        now = time.time()
+        retry = job.attempts < job.max_attempts
+        delay = min(self.retry_max_sec, self.retry_base_sec * 2 ** (job.attempts - 1))
+        with self._db() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, available_at = ?, finished_at = ?, last_error = ?,"
+                " result = ?, leased_by = NULL WHERE id = ? AND state = 'leased' AND leased_by = ?",
+                (
+                    "queued" if retry else "failed",
+                    now + delay if retry else now,
+                    None if retry else now,
+                    error,
+                    json.dumps(result) if result is not None else None,
+                    job.id,
+                    worker,
+                ),
+            )
+        return retry and cursor.rowcount == 1
+
+    # ── Inspection ─────────────────────────────────────────────────────
+
+    def get(self, job_id: int) -> dict | None:
+        with self._db() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("payload", "result"):
+            if job[key] is not None:
+                job[key] = json.loads(job[key])
+        return job
+
+    def metrics(self, window: int = 1000) -> dict:
+        """
+        Queue depth per state and priority, how long the oldest queued job
+        has waited, and the enqueue → first-lease wait of the last `window`
+        started jobs.
+        """
+        now = time.time()
+        with self._db() as conn:
+            states = dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            by_priority = dict(conn.execute(
+                "SELECT priority, COUNT(*) FROM jobs WHERE state = 'queued' GROUP BY priority"
+            ).fetchall())
+            oldest = conn.execute(
+                "SELECT MIN(enqueued_at) FROM jobs WHERE state = 'queued'"
+            ).fetchone()[0]
+            waits = sorted(w for (w,) in conn.execute(
+                "SELECT started_at - enqueued_at FROM jobs WHERE started_at IS NOT NULL"
+                " ORDER BY started_at DESC LIMIT ?",
+                (window,),
+            ))
+        names = {v: k for k, v in PRIORITIES.items()}
+        return {
+            "depth": {state: states.get(state, 0) for state in ("queued", "leased", "done", "failed")},
+            "queued_by_priority": {names.get(p, str(p)): n for p, n in sorted(by_priority.items())},
+            "oldest_queued_sec": round(now - oldest, 3) if oldest else 0.0,
+            "wait_sec": {
+                "samples": len(waits),
+                "p50": round(statistics.median(waits), 3) if waits else None,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                "max": round(waits[-1], 3) if waits else None,
+            },
+        }
+
+
+# ── Worker ─────────────────────────────────────────────────────────────
+
+def job_env(base: dict[str, str], env: dict[str, str] | None) -> dict[str, str]:
+    """The worker's environment with a job's enqueued variables laid over it."""
+    if env is None:
+        return base  # queued before jobs carried an environment
+    merged = dict(base)
+    for key, value in job_overlay(base, env).items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    return merged
+
+
+class Worker:
+    """Runs queued jobs one at a time, each in its own record-demo process."""
+
+    def __init__(self, queue: JobQueue, poll_sec: float = 2.0, name: str | None = None):
+        self.queue = queue
+        self.poll_sec = poll_sec
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.jobs_run = 0
+        self._stop = asyncio.Event()
+
+    def stop(self) -> None:
+        """Finish the current job, then exit."""
+        self._stop.set()
+
+    async def _heartbeat(self, job: Job, proc: asyncio.subprocess.Process) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_sec / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job, self.name):
+                print(f"  ⚠️ Lost the lease on job {job.id}; stopping it")
+                await terminate(proc)
+                return
+
+    async def run_job(self, job: Job) -> None:
+        argv = [*job.payload["argv"], "--no-daemon"]
+        print(f"▶ Job {job.id} (priority {job.priority}, attempt {job.attempts}/{job.max_attempts})")
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "demo_recorder.cli", *argv,
+                cwd=job.payload.get("cwd"),
+                env=job_env(dict(os.environ), job.payload.get("env")),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=16 * 1024 * 1024,  # EVENTS_JSON is one long line
+            )
+        except OSError as exc:  # e.g. the job's cwd is gone
+            await asyncio.to_thread(self.queue.fail, job, self.name, f"could not start: {exc}")
+            print(f"✗ Job {job.id} could not start: {exc}")
+            return
+        heartbeat = asyncio.create_task(self._heartbeat(job, proc))
+        result: dict = {}
+        try:
+            async for raw in proc.stdout:
+                line = raw.decode(errors="replace").rstrip("\n")
+                print(f"  [job {job.id}] {line}")
+                key, sep, value = line.partition(": ")
+                if sep and key in RESULT_KEYS:
+                    result[key.lower()] = value
+                    if key == "VIDEO_META":
+                        try:
+                            result["video_meta"] = json.loads(value)
+                        except ValueError:
+                            pass  # keep the raw line
+            returncode = await proc.wait()
+        except asyncio.CancelledError:
+            await asyncio.shield(terminate(proc))
+            raise
+        finally:
+            heartbeat.cancel()
+        result["exit_code"] = returncode
+        if returncode == 0:
+            await asyncio.to_thread(self.queue.complete, job, self.name, result)
+            print(f"✓ Job {job.id} done: {result.get('verdict', 'unknown')}")
+        else:
+            retry = await asyncio.to_thread(
+                self.queue.fail, job, self.name, f"record-demo exited with {returncode}", result,
+            )
+            print(f"✗ Job {job.id} failed (rc={returncode}){'; will retry' if retry else ''}")
+        self.jobs_run += 1
+
+    async def run(self, once: bool = False) -> None:
+        """Take jobs until stop() (or, with once, until the queue is empty)."""
+        print(f"Worker {self.name} polling {self.queue.path}")
+        while not self._stop.is_set():
+            job = await asyncio.to_thread(self.queue.dequeue, self.name)
+            if job is not None:
+                await self.run_job(job)
+                continue
+            if once:
+                break
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.poll_sec)
+            except TimeoutError:
+                pass
+        print(f"Worker {self.name} stopped after {self.jobs_run} job(s)")
+
+
+async def run_worker(queue: JobQueue, poll_sec: float = 2.0, once: bool = False) -> None:
+    worker = Worker(queue, poll_sec)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+    await worker.run(once)
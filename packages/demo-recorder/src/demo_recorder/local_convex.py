@@ -0,0 +1,294 @@
+"""
+local_convex.py — a local stand-in for the slice of Convex the uploader uses.
+
+Implements just enough of the Convex HTTP API to exercise uploader.py with
+no network access:
+
+    POST /api/mutation  {"path": "runs:generateUploadUrl"}  → signed upload URL
+    POST /api/upload/<token>   (body)                        → {"storageId": ...}
+    POST /api/query     {"path": "runs:getStorageUrl"}      → blob URL
+    GET  /api/storage/<storageId>                            → the blob (with --store)
+    HEAD /api/storage/<storageId>                            → 200 while it is stored
+
+Upload URLs are single-use, like the real ones. Latency, upload bandwidth
+and failures can be injected to see how the upload path behaves on a slow
+or flaky link:
+
+    python -m demo_recorder.local_convex --port 3210 --latency-ms 80 \\
+        --bandwidth-mbps 50 --fail-rate 0.1
+
+then point the recorder at it with --convex-url http://127.0.0.1:3210.
+"""
+
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+READ_CHUNK = 64 * 1024
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 0.0          # added before every response
+    bandwidth_mbps: float = 0.0      # upload body read rate per request; 0 = unlimited
+    fail_rate: float = 0.0           # probability that a call answers 503
+    fail_first: int = 0              # the first N calls answer 503
+    fail_status: int = 503
+
+
+@dataclass
+class ServerStats:
+    calls: dict[str, int] = field(default_factory=dict)
+    failures_injected: int = 0
+    blobs: int = 0
+    bytes_received: int = 0
+
+
+class LocalConvex:
+    """
+    The stand-in server. start() serves it on a background thread;
+    usable as a context manager.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        faults: Faults | None = None,
+        store_dir: Path | None = None,
+    ):
+        self.faults = faults or Faults()
+        self.store_dir = store_dir
+        self.stats = ServerStats()
+        self._tokens: set[str] = set()
+        self._sizes: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LocalConvex":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "LocalConvex":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ── Fault injection ────────────────────────────────────────────────
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            if self.faults.fail_first > 0:
+                self.faults.fail_first -= 1
+                self.stats.failures_injected += 1
+                return True
+            if self.faults.fail_rate and random.random() < self.faults.fail_rate:
+                self.stats.failures_injected += 1
+                return True
+        return False
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats.calls[name] = self.stats.calls.get(name, 0) + 1
+
+    # ── Storage ────────────────────────────────────────────────────────
+
+    def new_upload_token(self) -> str:
+        token = secrets.token_hex(8)
+        with self._lock:
+            self._tokens.add(token)
+        return token
+
+    def redeem_token(self, token: str) -> bool:
+        with self._lock:
+            if token not in self._tokens:
+                return False
+            self._tokens.discard(token)
+            return True
+
+    def store(self, storage_id: str, size: int) -> None:
+        with self._lock:
+            self._sizes[storage_id] = size
+            self.stats.blobs += 1
+            self.stats.bytes_received += size
+
+    def has_blob(self, storage_id: str) -> bool:
+        with self._lock:
+            return storage_id in self._sizes
+
+    def delete(self, storage_id: str) -> None:
+        """Drop a blob, like ctx.storage.delete."""
+        with self._lock:
+            self._sizes.pop(storage_id, None)
+        if self.store_dir is not None:
+            (self.store_dir / storage_id).unlink(missing_ok=True)
+
+
+def _handler_for(convex: LocalConvex) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real deployment
+
+        def log_message(self, format, *args) -> None:  # noqa: A002
+            pass
+
+        def _reply(self, status: int, payload: dict | None = None) -> None:
+            body = json.dumps(payload or {}).encode()
+            if convex.faults.latency_ms:
+                time.sleep(convex.faults.latency_ms / 1000)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _drain_body(self, sink=None) -> int:
+            length = int(self.headers.get("Content-Length") or 0)
+            bytes_per_sec = convex.faults.bandwidth_mbps * 1_000_000 / 8
+            started = time.monotonic()
+            received = 0
+            while received < length:
+                chunk = self.rfile.read(min(READ_CHUNK, length - received))
+                if not chunk:
+                    break
+                received += len(chunk)
+                if sink is not None:
+                    sink.write(chunk)
+                if bytes_per_sec:
+                    ahead = received / bytes_per_sec - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+            return received
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                return json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return {}
+
+        def do_POST(self) -> None:
+            if self.path.startswith("/api/upload/"):
+                self._upload(self.path[len("/api/upload/"):])
+                return
+            if self.path not in ("/api/mutation", "/api/query"):
+                self._drain_body()
+                self._reply(404, {"status": "error", "errorMessage": "not found"})
+                return
+
+            request = self._read_json()
+            name = request.get("path", "")
+            convex._count(name)
+            if convex._should_fail():
+                self._reply(convex.faults.fail_status, {"status": "error", "errorMessage": "injected"})
+            elif self.path == "/api/mutation" and name == "runs:generateUploadUrl":
+                token = convex.new_upload_token()
+                self._reply(200, {"status": "success", "value": f"{convex.url}/api/upload/{token}"})
+            elif self.path == "/api/query" and name == "runs:getStorageUrl":
+                storage_id = request.get("args", {}).get("storageId", "")
+                url = f"{convex.url}/api/storage/{storage_id}" if convex.has_blob(storage_id) else None
+                self._reply(200, {"status": "success", "value": url})
+            else:
+                self._reply(400, {"status": "error", "errorMessage": f"unknown function {name}"})
+
+        def _upload(self, token: str) -> None:
+            convex._count("upload")
+            if "Content-Length" not in self.headers:
+                self._reply(411, {"status": "error", "errorMessage": "Content-Length required"})
+                return
+            if convex._should_fail():
+                self._drain_body()
+                self._reply(convex.faults.fail_status, {"status": "error", "errorMessage": "injected"})
+                return
+            if not convex.redeem_token(token):
+                self._drain_body()
+                self._reply(400, {"status": "error", "errorMessage": "invalid or used upload URL"})
+                return
+
+            storage_id = f"kg{secrets.token_hex(12)}"
+            if convex.store_dir is not None:
+                convex.store_dir.mkdir(parents=True, exist_ok=True)
+                with (convex.store_dir / storage_id).open("wb") as sink:
+                    size = self._drain_body(sink)
+            else:
+                size = self._drain_body()
+            convex.store(storage_id, size)
+            self._reply(200, {"storageId": storage_id})
+
+        def do_GET(self) -> None:
+            storage_id = self.path.rsplit("/", 1)[-1]
+            blob = convex.store_dir / storage_id if convex.store_dir is not None else None
+            if not self.path.startswith("/api/storage/") or blob is None or not blob.is_file():
+                self._reply(404, {"status": "error", "errorMessage": "not found"})
+                return
+            data = blob.read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_HEAD(self) -> None:
+            convex._count("head")
+            stored = self.path.startswith("/api/storage/") and convex.has_blob(self.path.rsplit("/", 1)[-1])
+            self.send_response(200 if stored else 404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Convex upload API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3210)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before every response")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="Upload read rate per request (0 = unlimited)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Probability that a call answers 503")
+    parser.add_argument("--fail-first", type=int, default=0, help="The first N calls answer 503")
+    parser.add_argument("--store", type=str, default=None, help="Keep uploaded blobs in this directory (servable via GET)")
+    args = parser.parse_args()
+
+    faults = Faults(
+        latency_ms=args.latency_ms,
+        bandwidth_mbps=args.bandwidth_mbps,
+        fail_rate=args.fail_rate,
+        fail_first=args.fail_first,
+    )
+    server = LocalConvex(args.host, args.port, faults, Path(args.store) if args.store else None)
+    print(f"Local Convex listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"  {server.stats.blobs} blob(s), {server.stats.bytes_received / 1024 / 1024:.1f} MB received")
+
+
+if __name__ == "__main__":
+    main()
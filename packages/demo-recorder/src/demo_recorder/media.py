@@ -0,0 +1,124 @@
+"""
+media.py — one-shot ffprobe inspection of the recorded video.
+
+run_tasks probes the chosen artifact exactly once (JSON output, format and
+first video stream) and stores the result on TasksResult and in
+manifest.json, so the CLI and later stages read metadata instead of
+globbing and probing again. extract_thumbnail grabs one poster frame
+into memory, so it can be written and uploaded (and hashed for dedup)
+without reading it back from disk.
+"""
+
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from .process import run_process
+
+
+@dataclass
+class MediaInfo:
+    path: Path
+    size_bytes: int
+    duration: float          # seconds
+    format: str              # ffprobe format_name, e.g. "mov,mp4,m4a,3gp,3g2,mj2"
+    codec: str | None        # video codec, e.g. "h264"
+    width: int | None
+    height: int | None
+    frames: int | None       # video packets actually in the file (exact for vfr)
+    bitrate: int | None      # bits per second, whole file
+    avg_fps: float | None
+
+    def to_dict(self) -> dict:
+        info = asdict(self)
+        info["path"] = str(self.path)
+        return info
+
+
+def _rate(value: str | None) -> float | None:
+    # ffprobe rates are fractions like "25/1"; "0/0" means unknown
+    if not value:
+        return None
+    num, _, den = value.partition("/")
+    try:
+        return float(num) / float(den or 1) if float(den or 1) else None
+    except ValueError:
+        return None
+
+
+def _int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_probe(path: Path, probe: dict) -> MediaInfo | None:
+    """MediaInfo from ffprobe's JSON output, or None if it has no duration."""
+    fmt = probe.get("format") or {}
+    try:
+        duration = float(fmt["duration"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    stream = next(iter(probe.get("streams") or []), {})
+    return MediaInfo(
+        path=path,
+        size_bytes=_int(fmt.get("size")) or path.stat().st_size,
+        duration=duration,
+        format=fmt.get("format_name", ""),
+        codec=stream.get("codec_name"),
+        width=_int(stream.get("width")),
+        height=_int(stream.get("height")),
+        # nb_frames is missing for webm/mkv; the packet count always exists
+        frames=_int(stream.get("nb_frames")) or _int(stream.get("nb_read_packets")),
+        bitrate=_int(fmt.get("bit_rate")),
+        avg_fps=_rate(stream.get("avg_frame_rate")),
+    )
+
+
+async def probe_media(path: Path, timeout: float = 10.0) -> MediaInfo | None:
+    """
+    Inspect a video with a single ffprobe call.
+
+    Returns None if the file is not a readable video. Raises
+    FileNotFoundError if ffprobe is not installed and
+    subprocess.TimeoutExpired if it hangs.
+    """
+    result = await run_process(
+        [
+            "ffprobe", "-v", "error",
+            "-print_format", "json",
+            "-show_format", "-show_streams",
+            "-select_streams", "v:0",
+            "-count_packets",  # demux only: cheap exact frame count
+            str(path),
+        ],
+        timeout=timeout,
+    )
+    if result.returncode != 0:
+        return None
+    try:
+        probe = json.loads(result.stdout)
+    except ValueError:
+        return None
+    return parse_probe(path, probe)
+
+
+async def extract_thumbnail(path: Path, at_sec: float, width: int = 640, timeout: float = 10.0) -> bytes | None:
+    """
+    One JPEG frame of the video at at_sec, scaled to width, or None if
+    ffmpeg produced nothing. Raises like probe_media.
+    """
+    result = await run_process(
+        [
+            "ffmpeg", "-v", "error",
+            "-ss", f"{at_sec:.3f}",
+            "-i", str(path),
+            "-frames:v", "1",
+            "-vf", f"scale={width}:-2",
+            "-f", "image2pipe", "-c:v", "mjpeg",
+            "pipe:1",
+        ],
+        timeout=timeout,
+    )
+    return result.stdout if result.returncode == 0 and result.stdout else None
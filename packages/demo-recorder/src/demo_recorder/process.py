@@ -0,0 +1,63 @@
+"""
+process.py — asyncio subprocess helpers.
+
+run_tasks drives Xvfb, ffmpeg, ffprobe and xdotool as asyncio subprocesses
+so waiting on them never blocks the event loop: several recordings and
+uploads can share one Python process. Timeouts kill the child, and
+cancelling the awaiting task does too.
+"""
+
+import asyncio
+import subprocess
+from asyncio.subprocess import Process
+
+
+async def run_process(
+    command: list[str],
+    timeout: float,
+    env: dict[str, str] | None = None,
+    capture: bool = True,
+) -> subprocess.CompletedProcess:
+    """
+    Run a command to completion, like subprocess.run(..., timeout=...).
+
+    Raises subprocess.TimeoutExpired (after killing the child) when it
+    takes longer than `timeout`, and FileNotFoundError if it isn't
+    installed.
+    """
+    stream = asyncio.subprocess.PIPE if capture else asyncio.subprocess.DEVNULL
+    proc = await asyncio.create_subprocess_exec(
+        *command, stdin=asyncio.subprocess.DEVNULL, stdout=stream, stderr=stream, env=env,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except TimeoutError:
+        await kill(proc)
+        raise subprocess.TimeoutExpired(command, timeout) from None
+    except asyncio.CancelledError:
+        await asyncio.shield(kill(proc))
+        raise
+    return subprocess.CompletedProcess(command, proc.returncode, stdout, stderr)
+
+
+async def kill(proc: Process) -> None:
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+    await proc.wait()
+
+
+async def terminate(proc: Process, timeout: float = 5.0) -> None:
+    """SIGTERM, then SIGKILL if the process hasn't exited within `timeout`."""
+    if proc.returncode is not None:
+        return
+    try:
+        proc.terminate()
+    except ProcessLookupError:
+        pass
+    try:
+        await asyncio.wait_for(proc.wait(), timeout)
+    except TimeoutError:
+        await kill(proc)
@@ -0,0 +1,52 @@
+"""
+prompt.py — builds the single browser-agent instruction from tasks[].
+
+Kept free of browser_use / httpx imports so analysis-only callers (and
+`from demo_recorder import build_prompt`) load in milliseconds.
+"""
+
+import re
+
+# The target of a "Navigate to /path" (or full URL) step, without trailing punctuation
+NAVIGATE_RE = re.compile(r"Navigate to (\S+?)[.,;]?(?=\s|$)")
+
+
+def build_prompt(tasks: list[dict], base_url: str, first_step: int = 1) -> str:
+    """
+    Merge all task descriptions into one numbered browser-agent instruction string.
+    Expands relative paths (e.g. /banana) to full URLs (e.g. http://localhost:3000/banana).
+
+    first_step > 1 builds the prompt for a later chunk of a longer list:
+    steps keep their numbers and the agent continues in the open browser.
+    """
+    # Expand relative paths like "Navigate to /path" → "Navigate to http://localhost:3000/path"
+    expanded_tasks = []
+    for task in tasks:
+        desc = task['description'].strip()
+        desc = re.sub(
+            r'Navigate to (/\S+)',
+            lambda m: f'Navigate to {base_url}{m.group(1)}',
+            desc,
+        )
+        expanded_tasks.append(desc)
+
+    steps = "\n".join(
+        f"  Step {first_step + i} [{tasks[i]['id']}]: {desc}"
+        for i, desc in enumerate(expanded_tasks)
+    )
+    continuing = (
+        f"Steps 1-{first_step - 1} are already done; the browser is still open on the page they left. "
+        f"Continue from there.\n\n"
+        if first_step > 1 else ""
+    )
+
+    return (
+        f"The app is running at {base_url}\n\n"
+        f"{continuing}"
+        f"Complete the following verification steps in order:\n\n"
+        f"{steps}\n\n"
+        f"Recording instructions (important):\n"
+        f"- Complete ALL steps in sequence — do not skip any.\n"
+        f"- If a step cannot be completed (element not found, page error, etc.), stop immediately and report failure. Do not retry endlessly.\n"
+        f"- Do not close the browser when done."
+    )
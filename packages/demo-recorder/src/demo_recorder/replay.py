@@ -0,0 +1,209 @@
+"""
+replay.py — cache of passing agent runs, replayed without the LLM.
+
+Re-verifying an unchanged task list after a small fix makes the agent take
+the same actions again, one LLM round trip per step. With replay=True,
+run_tasks saves the browser-use history of every chunk that passes — each
+step's actions with their params and the DOM element each one resolved to
+(xpath, attributes, element hash) — and the next run with the same key
+re-executes those actions directly.
+
+The key covers the normalized tasks up to and including the chunk,
+base_url and a fingerprint of the app's markup (the tag/id skeleton of
+every route the tasks navigate to), so edited tasks or changed pages miss
+the cache. While replaying, each step first has to find its recorded
+element in the live DOM (browser-use's rerun_history); the first step that
+cannot, or whose action errors, diverges and the agent takes over — told
+by takeover_note which steps already ran and where the browser is, so it
+does not repeat them.
+
+The fingerprint sees neither text nor client-rendered content, and no
+judge looks at a replayed run, so a fully replayed chunk is reported as
+"unverified" rather than "pass".
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import httpx
+from browser_use.agent.views import AgentHistoryList
+
+from .prompt import NAVIGATE_RE
+
+DEFAULT_REPLAY_DIR = Path(
+    os.environ.get("DEMO_RECORDER_REPLAY_CACHE", Path.home() / ".cache" / "demo-recorder" / "replay")
+)
+
+FINGERPRINT_TIMEOUT = 5.0
+
+_NOISE_RE = re.compile(r"<(script|style|template)\b.*?</\1\s*>|<!--.*?-->", re.S | re.I)
+_TAG_RE = re.compile(r"<([a-zA-Z][\w-]*)([^>]*)>")
+_ID_RE = re.compile(r"""\sid\s*=\s*["']([^"']*)["']""")
+
+
+# ── Cache key ──────────────────────────────────────────────────────────
+
+def normalize_tasks(tasks: list[dict]) -> list[dict]:
+    """Task ids and descriptions with whitespace differences removed."""
+    return [{"id": str(t["id"]), "description": " ".join(t["description"].split())} for t in tasks]
+
+
+def dom_skeleton(html: str) -> str:
+    """Tag names and ids of a page in document order; text, classes and scripts dropped."""
+    parts = []
+    for tag, attrs in _TAG_RE.findall(_NOISE_RE.sub("", html)):
+        match = _ID_RE.search(attrs)
+        parts.append(f"{tag.lower()}#{match.group(1)}" if match else tag.lower())
+    return " ".join(parts)
+
+
+def task_routes(tasks: list[dict], base_url: str) -> list[str]:
+    """base_url plus every page the tasks navigate to, as absolute URLs."""
+    urls = {base_url}
+    for task in tasks:
+        for target in NAVIGATE_RE.findall(task["description"]):
+            if target.startswith("/"):
+                urls.add(base_url.rstrip("/") + target)
+            elif "://" in target:
+                urls.add(target)
+    return sorted(urls)
+
+
+async def dom_fingerprint(tasks: list[dict], base_url: str) -> str:
+    """
+    Hash of the status and DOM skeleton of every route in task_routes.
+    Pages that cannot be fetched count as "unreachable" rather than
+    failing the run.
+    """
+    async def page(client: httpx.AsyncClient, url: str) -> str:
+        try:
+            response = await client.get(url)
+        except httpx.HTTPError:
+            return f"{url} unreachable"
+        skeleton = hashlib.sha256(dom_skeleton(response.text).encode()).hexdigest()
+        return f"{url} {response.status_code} {skeleton}"
+
+    async with httpx.AsyncClient(timeout=FINGERPRINT_TIMEOUT, follow_redirects=True) as client:
+        lines = await asyncio.gather(*(page(client, url) for url in task_routes(tasks, base_url)))
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def replay_key(tasks: list[dict], first: int, base_url: str, fingerprint: str) -> str:
+    """Key of the chunk tasks[first:], which runs after tasks[:first] left the browser."""
+    payload = {
+        "tasks": normalize_tasks(tasks),
+        "first": first,
+        "base_url": base_url.rstrip("/"),
+        "dom": fingerprint,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+# ── Cache ──────────────────────────────────────────────────────────────
+
+class ReplayCache:
+    """A directory of browser-use histories (AgentHistoryList JSON), one per key."""
+
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root or DEFAULT_REPLAY_DIR)
+
+    def path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def load(self, key: str, output_model) -> AgentHistoryList | None:
+        """The history stored under key, or None. Unreadable entries are dropped."""
+        path = self.path(key)
+        if not path.exists():
+            return None
+        try:
+            return AgentHistoryList.load_from_file(path, output_model)
+        except Exception as exc:  # noqa: BLE001 — written by another browser-use version
+            print(f"  ⚠️ Dropping unreadable replay entry {path.name}: {exc}")
+            self.discard(key)
+            return None
+
+    def store(self, key: str, history: AgentHistoryList) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        tmp = path.with_suffix(".tmp")
+        history.save_to_file(tmp)
+        os.replace(tmp, path)  # a concurrent reader never sees half an entry
+        return path
+
+    def discard(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+
+# ── Replay ─────────────────────────────────────────────────────────────
+
+def replayable_steps(history: AgentHistoryList) -> list:
+    """Steps that took actions and all of whose actions succeeded."""
+    return [
+        step for step in history.history
+        if step.model_output and step.model_output.action
+        and not any(result.error for result in step.result or [])
+    ]
+
+
+async def replay_steps(
+    agent,
+    history: AgentHistoryList,
+    before_step: Callable[[int | None], Awaitable[None]],
+    after_step: Callable[[], None],
+    delay_sec: float = 1.0,
+) -> tuple[list, str | None]:
+    """
+    Re-execute history's steps in agent's browser, one step at a time, so
+    a divergence is caught at the step it happens. before_step(step_number)
+    and after_step() bracket each step.
+
+    Returns (the steps that replayed, None) when every step did, or
+    (the steps before the divergence, why it diverged).
+    """
+    replayed: list = []
+    for step in replayable_steps(history):
+        number = step.metadata.step_number if step.metadata else None
+        await before_step(number)
+        try:
+            results = await agent.rerun_history(
+                AgentHistoryList(history=[step]),
+                max_retries=1,
+                skip_failures=False,
+                delay_between_actions=delay_sec,
+            )
+        except Exception as exc:  # noqa: BLE001 — element gone, navigation failed, ...
+            return replayed, f"step {number}: {exc}"
+        finally:
+            after_step()
+        errors = [result.error for result in results or [] if result.error]
+        if errors:
+            return replayed, f"step {number}: {errors[0]}"
+        replayed.append(step)
+    return replayed, None
+
+
+def takeover_note(replayed: list, current_url: str | None) -> str:
+    """Prompt addendum for the agent taking over after a divergence."""
+    if not replayed:
+        return ""
+    lines = []
+    for step in replayed:
+        number = step.metadata.step_number if step.metadata else "?"
+        goal = getattr(step.model_output, "next_goal", None) or ""
+        actions = ", ".join(
+            name for action in step.model_output.action
+            for name in action.model_dump(exclude_unset=True)
+        )
+        lines.append(f"- step {number}: {goal} ({actions})" if goal else f"- step {number}: {actions}")
+    where = f" The browser is now on {current_url}." if current_url else ""
+    return (
+        "ALREADY DONE: these steps of the tasks above were replayed from an "
+        "earlier run in this browser:\n" + "\n".join(lines) + "\n"
+        f"Do not repeat them.{where} Continue from the current page with the "
+        "first step that is not done yet."
+    )
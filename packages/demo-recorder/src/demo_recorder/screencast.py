@@ -0,0 +1,276 @@
+"""
+screencast.py — Chrome DevTools screencast capture, no X server needed.
+
+Page.startScreencast makes Chromium push a JPEG of the page every time it
+repaints. ScreencastRecorder pipes those frames into ffmpeg (image2pipe
+on stdin) as a constant-rate fps stream whose clock is Chromium's own:
+each frame carries metadata.timestamp, the wall-clock time it was
+painted, and goes into the slot round((timestamp - span origin) * fps).
+Slots the page did not repaint in are filled with the previous frame,
+and a frame whose slot is already written (two repaints in one slot, or
+one delivered late) is not written; it shows from the next slot on. So a
+frame's PTS is its paint time, not when it happened to reach ffmpeg, and
+delivery lag or a slow ack never shifts the video against the events.
+There is no framebuffer grab, no Xvfb and no xdotool: the browser runs
+truly headless. In vfr mode mpdecimate drops the filler again, as it
+does for x11grab's repeated grabs.
+
+It is a ScreenRecorder, so pausable spans, containers, IdleGate, the media
+timeline and the sync report all work the same way. The differences:
+    - frames only exist when the page repaints, so a ticker keeps
+      filling slots with the last frame up to HOLDBACK_SEC before "now"
+      (later slots are left for frames still on their way), and a span
+      starts on the last frame and pauses after filling up to "now";
+    - frame 0 of a span is at a known wall-clock time, so the timeline
+      is anchored on it (source "cdp_timestamp" in the sync report);
+    - attach() a browser-use BrowserSession before start(); capture
+      follows the agent's focused tab via follow_focus().
+"""
+
+import asyncio
+import base64
+import statistics
+import time
+from pathlib import Path
+
+from .capture import ScreenRecorder, _FfmpegCapture
+
+CAPTURE_BACKENDS = ("x11grab", "screencast")
+
+# Slots younger than this are only filled once a newer frame arrives; it
+# must exceed the usual delivery lag, or repaints land in written slots
+HOLDBACK_SEC = 0.25
+
+
+class ScreencastRecorder(ScreenRecorder):
+    """Records the focused page of a browser-use session via CDP screencast."""
+
+    frames_on_stdin = True
+
+    def __init__(
+        self,
+        output_path: Path,
+        resolution: str = "1920x1080",
+        fps: int = 25,
+        mode: str = "vfr",
+        pausable: bool = False,
+        container: str = "fmp4",
+        segment_sec: float = 4.0,
+        quality: int = 80,
+    ):
+        super().__init__(output_path, "screencast", resolution, fps, mode, pausable, container, segment_sec)
+        self.quality = quality
+        self.browser_session = None
+        self.frames_received = 0
+        self.frames_dropped = 0  # arrived while no span was running
+        self.frames_merged = 0   # their slot was already written
+        self._cdp = None          # CDPSession currently screencasting
+        self._registered = False
+        self._last_frame: bytes | None = None
+        self._lag: list[float] = []  # arrival - Chromium's frame timestamp, seconds
+        self._acks: set[asyncio.Task] = set()
+        self._span_origin: float | None = None  # wall-clock time of slot 0
+        self._span_slots = 0                    # slots written so far
+        self._ticker: asyncio.Task | None = None
+
+    def attach(self, browser_session) -> None:
+        self.browser_session = browser_session
+
+    # ── ffmpeg ─────────────────────────────────────────────────────────
+
+    def _input_args(self) -> list[str]:
+        # Frame n is at n / fps: the slots are the timestamps
+        return [
+            "-f", "image2pipe",
+            "-framerate", str(self.fps),
+            "-c:v", "mjpeg",
+            "-i", "pipe:0",
+        ]
+
+    def _encode_args(self) -> list[str]:
+        width, height = self.resolution.split("x")
+        # Frames can be smaller than the viewport (device scale, resizes);
+        # the encoder needs one fixed size.
+        fit = (
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+        )
+        if self.mode == "vfr":
+            # Drop the slots that only repeat the last repaint
+            return ["-vf", f"{fit},mpdecimate=max={max(1, self.fps // 2)}", "-fps_mode", "vfr"]
+        return ["-vf", fit, "-fps_mode", "cfr", "-r", str(self.fps)]
+
+    async def _launch(self) -> _FfmpegCapture:
+        part = await super()._launch()
+        self._span_origin, self._span_slots = None, 0
+        # A static page sends nothing, so start the span on the current screen
+        if self._last_frame is not None:
+            self._write_at(part, self._last_frame, time.time())
+        self._ticker = asyncio.create_task(self._tick(part))
+        return part
+
+    def _write_at(self, part: _FfmpegCapture, frame: bytes, stamp: float) -> bool:
+        """Write frame into the slot for stamp, filling the gap before it; False if merged."""
+        if self._span_origin is None:
+            self._span_origin = stamp
+            part.first_frame_wall = stamp
+        slot = round((stamp - self._span_origin) * self.fps)
+        if slot < self._span_slots:
+            return False
+        filler = self._last_frame if self._span_slots else frame
+        for _ in range(slot - self._span_slots):
+            part.write(filler)
+        part.write(frame)
+        self._span_slots = slot + 1
+        return True
+
+    def _fill_to(self, part: _FfmpegCapture, stamp: float) -> None:
+        """Repeat the last frame in every slot before stamp."""
+        if self._span_origin is None or not part.running:
+            return
+        slot = round((stamp - self._span_origin) * self.fps) - 1
+        if slot >= self._span_slots:
+            self._write_at(part, self._last_frame, self._span_origin + slot / self.fps)
+
+    async def _tick(self, part: _FfmpegCapture) -> None:
+        # Keeps the stream moving through static stretches, like x11grab's
+        # grabs; the holdback leaves recent slots to frames still in flight
+        while part.running:
+            self._fill_to(part, time.time() - HOLDBACK_SEC)
+            await asyncio.sleep(HOLDBACK_SEC / 2)
+
+    def _stop_ticker(self) -> None:
+        ticker, self._ticker = self._ticker, None
+        if ticker is not None:
+            ticker.cancel()
+
+    # ── CDP ────────────────────────────────────────────────────────────
+
+    async def _start_screencast(self) -> None:
+        cdp = await self.browser_session.get_or_create_cdp_session()
+        if not self._registered:
+            cdp.cdp_client.register.Page.screencastFrame(self._on_frame)
+            self._registered = True
+        width, height = (int(v) for v in self.resolution.split("x"))
+        self._cdp = cdp
+        await cdp.cdp_client.send.Page.startScreencast(
+            params={
+                "format": "jpeg",
+                "quality": self.quality,
+                "maxWidth": width,
+                "maxHeight": height,
+                "everyNthFrame": 1,
+            },
+            session_id=cdp.session_id,
+        )
+
+    async def _stop_screencast(self) -> None:
+        cdp, self._cdp = self._cdp, None
+        if cdp is None:
+            return
+        try:
+            await cdp.cdp_client.send.Page.stopScreencast(session_id=cdp.session_id)
+        except Exception:  # noqa: BLE001 — the tab may already be gone
+            pass
+
+    def _on_frame(self, event, session_id: str | None) -> None:
+        cdp = self._cdp
+        if cdp is None or session_id != cdp.session_id:
+            return
+        frame = base64.b64decode(event["data"])
+        self.frames_received += 1
+        arrived = time.time()
+        stamp = (event.get("metadata") or {}).get("timestamp")
+        if stamp:
+            self._lag.append(arrived - stamp)
+        part = self._current
+        if part is None or not part.running:
+            self.frames_dropped += 1
+            part = None
+        elif not self._write_at(part, frame, stamp or arrived):
+            self.frames_merged += 1
+        self._last_frame = frame
+        # Chromium sends the next frame only after this one is acked; acking
+        # once ffmpeg has taken it gives natural backpressure.
+        task = asyncio.create_task(self._ack(cdp, event["sessionId"], part))
+        self._acks.add(task)
+        task.add_done_callback(self._acks.discard)
+
+    async def _ack(self, cdp, frame_session: int, part: _FfmpegCapture | None) -> None:
+        try:
+            if part is not None and part.running:
+                await part.proc.stdin.drain()
+            await cdp.cdp_client.send.Page.screencastFrameAck(
+                params={"sessionId": frame_session}, session_id=cdp.session_id,
+            )
+        except Exception:  # noqa: BLE001 — span or tab closed meanwhile
+            pass
+
+    async def follow_focus(self) -> None:
+        """Move the screencast to the agent's focused tab if it changed."""
+        if self._cdp is None or self.browser_session is None:
+            return
+        cdp = await self.browser_session.get_or_create_cdp_session()
+        if cdp.session_id != self._cdp.session_id:
+            await self._stop_screencast()
+            await self._start_screencast()
+
+    # ── Lifecycle ──────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        """Start ffmpeg and the screencast; await wait_until_ready() for frame 1."""
+        if self.browser_session is None:
+            raise RuntimeError("attach() a browser session before starting a screencast")
+        await self._launch()
+        await self._start_screencast()
+        print(
+            f"  Screencast recording started ({self.mode}, {self.container}) "
+            f"→ {self.output_path.name}"
+        )
+
+    async def pause(self) -> None:
+        self._stop_ticker()
+        part = self._current
+        if part is not None:
+            self._fill_to(part, time.time())  # hold the final screen until now
+        await self._stop_screencast()
+        await super().pause()
+
+    async def resume(self, timeout: float = 10.0) -> float:
+        if not self.paused:
+            return 0.0
+        started = time.monotonic()
+        await self._launch()
+        await self._start_screencast()
+        await self.wait_until_ready(timeout)
+        return time.monotonic() - started
+
+    async def abort(self) -> None:
+        self._stop_ticker()
+        await self._stop_screencast()
+        await super().abort()
+
+    async def wait_for_tail(self, margin_sec: float = 0.5, timeout: float = 5.0) -> float:
+        """
+        Keep the final screen on for margin_sec. The ticker carries the
+        media timeline on through a static page, HOLDBACK_SEC behind.
+        """
+        part = self._current
+        if part is None or self._span_origin is None:
+            return 0.0
+        target = time.time() - self._span_origin + margin_sec
+        return await part.wait_for(
+            lambda: part.out_time >= target, f"t={target:.2f}s", timeout + HOLDBACK_SEC,
+        )
+
+    def sync_report(self) -> dict:
+        report = super().sync_report()
+        report["backend"] = "screencast"
+        if report.get("source") == "x11grab_start":
+            report["source"] = "cdp_timestamp"
+        report["frames_received"] = self.frames_received
+        report["frames_dropped"] = self.frames_dropped
+        report["frames_merged"] = self.frames_merged
+        if self._lag:
+            report["delivery_lag_ms"] = round(statistics.median(self._lag) * 1000, 1)
+        return report
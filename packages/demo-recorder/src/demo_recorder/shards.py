@@ -0,0 +1,249 @@
+"""
+shards.py — run one task list as N concurrent agent sessions, stitched.
+
+run_tasks drives every task through one agent session, so wall time grows
+with the number of tasks. run_sharded splits the tasks into independent
+groups, runs the groups as up to N concurrent run_tasks sessions (each with
+its own Xvfb display / browser, or its own lease from a BrowserPool) and
+merges them back into one TasksResult:
+
+    - the shard clips are stream-copied into one recording in shard order
+      (shards are ordered by their first task, so with interleaved groups
+      the video does not follow the task list exactly);
+    - each shard's interaction events move by the length of the clips
+      before it;
+    - the verdict is pass only if every shard passes.
+
+Groups must not depend on each other. With group_by="route" a task that
+navigates somewhere starts (or rejoins) that route's group, and a task
+without a "Navigate to" continues the group of the task before it. With
+group_by="id", ids like auth-1 / auth-2 form the group "auth".
+"""
+
+import asyncio
+import json
+import math
+import subprocess
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .capture import FRAGMENTED_MOVFLAGS
+from .media import probe_media
+from .process import run_process
+from .prompt import NAVIGATE_RE
+from .spool import upload_or_spool
+from .task_runner import TasksResult, default_output_dir, run_tasks
+from .uploader import UploadUrlPrefetch
+
+GROUP_BY = ("route", "id")
+
+
+def _group_key(task: dict, group_by: str) -> str | None:
+    if group_by == "id":
+        prefix, _, suffix = str(task["id"]).rpartition("-")
+        return prefix if prefix and suffix.isdigit() else str(task["id"])
+    match = NAVIGATE_RE.search(task["description"])
+    if match is None:
+        return None
+    target = match.group(1)
+    if "://" in target:
+        return urlsplit(target).path or "/"
+    return target
+
+
+def shard_tasks(tasks: list[dict], shards: int, group_by: str = "route") -> list[list[dict]]:
+    """
+    Split tasks into at most `shards` lists of whole groups, balanced by
+    task count. Each list keeps the original task order, and the lists
+    are ordered by their first task.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"Unknown grouping {group_by!r} (expected one of {GROUP_BY})")
+    groups: dict[str, list[int]] = {}
+    current = ""
+    for index, task in enumerate(tasks):
+        key = _group_key(task, group_by)
+        current = current if key is None else key
+        groups.setdefault(current, []).append(index)
+
+    # Largest group first onto the least-loaded shard
+    bins: list[list[int]] = [[] for _ in range(max(1, min(shards, len(groups))))]
+    for members in sorted(groups.values(), key=len, reverse=True):
+        min(bins, key=len).extend(members)
+    ordered = sorted((sorted(b) for b in bins if b), key=lambda b: b[0])
+    return [[tasks[i] for i in indices] for indices in ordered]
+
+
+async def concat_clips(clips: list[tuple[Path, float]], output_path: Path) -> bool:
+    """Stream-copy clips (path, duration) into output_path with the concat demuxer."""
+    list_path = output_path.with_suffix(".ffconcat")
+    list_path.write_text("ffconcat version 1.0\n" + "".join(
+        f"file '{path.resolve()}'\nduration {duration:.6f}\n" for path, duration in clips
+    ))
+    command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path), "-c", "copy"]
+    if output_path.suffix == ".mp4":
+        command += ["-movflags", FRAGMENTED_MOVFLAGS]
+    try:
+        returncode = (await run_process([*command, str(output_path)], timeout=120)).returncode
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        returncode = -1
+    finally:
+        list_path.unlink()
+    if returncode != 0:
+        print(f"  Warning: joining {len(clips)} shard clips failed (rc={returncode})")
+        return False
+    return True
+
+
+def _merge_verdicts(results: list[TasksResult]) -> tuple[str | None, str]:
+    verdicts = [r.verdict for r in results]
+    if any(v == "fail" for v in verdicts) or not all(r.success for r in results):
+        verdict = "fail"
+    elif all(v == "pass" for v in verdicts):
+        verdict = "pass"
+    elif all(v in ("pass", "unverified") for v in verdicts):
+        verdict = "unverified"   # some shard replayed from the cache, unjudged
+    else:
+        verdict = None
+    reasoning = " | ".join(  # one line: callers parse REASONING line by line
+        f"[{', '.join(t['id'] for t in r.tasks)}] {r.verdict or 'error'}: "
+        f"{r.verdict_reasoning or r.error or ''}"
+        for r in results
+    )
+    return verdict, reasoning
+
+
+async def run_sharded(
+    tasks: list[dict],
+    shards: int = 2,
+    group_by: str = "route",
+    output_dir: str | Path | None = None,
+    max_steps: int | None = None,
+    convex_url: str | None = None,
+    container: str = "fmp4",
+    **run_options,
+) -> TasksResult:
+    """
+    Run tasks as up to `shards` concurrent sessions and merge the results.
+
+    Takes run_tasks' keyword arguments. max_steps is split across shards
+    by task count. Shard output goes to output_dir/shard-<n>/; the stitched
+    recording, events.json and manifest.json go to output_dir itself.
+    Convex gets the stitched recording only.
+    """
+    if container == "hls":
+        raise ValueError("Sharded runs stitch one file; use the fmp4 or mp4 container")
+    output_dir = Path(output_dir) if output_dir is not None else default_output_dir()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    groups = shard_tasks(tasks, shards, group_by)
+    print(f"Running {len(tasks)} task(s) as {len(groups)} concurrent shard(s) → {output_dir}")
+
+    upload_prefetch = UploadUrlPrefetch(convex_url) if convex_url else None
+    started = time.monotonic()
+    try:
+        results: list[TasksResult] = await asyncio.gather(*(
+            run_tasks(
+                group,
+                output_dir=output_dir / f"shard-{n}",
+                max_steps=math.ceil(max_steps * len(group) / len(tasks)) if max_steps else None,
+                container=container,
+                report=False,   # only the merged result lines below
+                **run_options,
+            )
+            for n, group in enumerate(groups, 1)
+        ))
+        timings = {"shards_wall": time.monotonic() - started}
+        for n, result in enumerate(results, 1):
+            for key, value in result.timings.items():
+                timings[f"shard{n}_{key}"] = value
+
+        # ── Stitch the clips and shift each shard's events onto the result ──
+        clips: list[tuple[Path, float]] = []
+        events: list[dict] = []
+        offset_ms = 0
+        for result in results:
+            if result.video_path is None or not result.media:
+                continue  # nothing recorded: its events have no timeline
+            clips.append((result.video_path, result.media["duration"]))
+            events += [{**e, "atMs": e["atMs"] + offset_ms} for e in result.interaction_events]
+            offset_ms += round(result.media["duration"] * 1000)
+
+        video_path: Path | None = None
+        media: dict = {}
+        if clips:
+            suffixes = {path.suffix for path, _ in clips}
+            if len(suffixes) > 1:
+                print(f"  Warning: shard clips have mixed formats {sorted(suffixes)}; not stitching")
+            else:
+                stitched = output_dir / f"recording{suffixes.pop()}"
+                joined_at = time.monotonic()
+                if await concat_clips(clips, stitched):
+                    timings["stitch"] = time.monotonic() - joined_at
+                    video_path = stitched
+                    try:
+                        info = await probe_media(stitched)
+                    except (subprocess.TimeoutExpired, FileNotFoundError):
+                        info = None
+                    media = info.to_dict() if info is not None else {}
+                    print(f"  ✅ Stitched {len(clips)} shard clip(s) → {stitched.name}")
+
+        verdict, reasoning = _merge_verdicts(results)
+        video_url: str | None = None
+        upload_stats: dict = {}
+        if convex_url and video_path is not None:
+            video_url, upload_stats = await upload_or_spool(
+                convex_url, video_path, output_dir, prefetch=upload_prefetch,
+            )
+    finally:
+        if upload_prefetch is not None:
+            upload_prefetch.cancel()
+
+    events_path = output_dir / "events.json"
+    events_path.write_text(json.dumps(events, indent=2))
+    (output_dir / "manifest.json").write_text(json.dumps({
+        "video": video_path.name if video_path else None,
+        "media": media,
+        "video_url": video_url,
+        "verdict": verdict,
+        "events": events_path.name,
+        "shards": [
+            {
+                "output_dir": str(r.output_path),
+                "tasks": [t["id"] for t in r.tasks],
+                "verdict": r.verdict,
+                "duration": r.media.get("duration"),
+            }
+            for r in results
+        ],
+        "upload": upload_stats,
+        "timings": timings,
+    }, indent=2))
+    skews = [r.capture_sync["skew_ms"] for r in results if "skew_ms" in r.capture_sync]
+    if skews:
+        print(f"CAPTURE_SKEW_MS: {max(skews, key=abs)}")
+    idle_removed = sum(r.capture_sync.get("idle_removed_sec") or 0 for r in results)
+    if idle_removed:
+        print(f"IDLE_REMOVED_SEC: {idle_removed:.2f}")
+    print(f"EVENTS_JSON: {json.dumps(events)}")
+    print(f"✓ Sharded recording complete → {output_dir} ({timings['shards_wall']:.1f}s for {len(groups)} shard(s))")
+    if video_url:
+        print(f"VIDEO_URL: {video_url}")
+
+    failed = [r for r in results if not r.success]
+    return TasksResult(
+        tasks=tasks,
+        prompt="\n\n".join(r.prompt for r in results),
+        output_path=output_dir,
+        success=not failed and video_path is not None,
+        verdict=verdict,
+        verdict_reasoning=reasoning,
+        error="; ".join(r.error or "" for r in failed) or (None if video_path else "no stitched recording"),
+        video_url=video_url,
+        interaction_events=events,
+        timings=timings,
+        capture_sync={"source": "shards", "shards": [r.capture_sync for r in results]},
+        upload_stats=upload_stats,
+        video_path=video_path,
+        media=media,
+    )
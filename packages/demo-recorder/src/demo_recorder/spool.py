@@ -0,0 +1,170 @@
+"""
+spool.py — on-disk queue of uploads that failed after every retry.
+
+When a recording finishes but Convex stays unreachable, run_tasks spools
+the artifact instead of dropping its VIDEO_URL. Each entry is one JSON file
+pointing at the artifact in its output directory (nothing is copied). The
+spool is drained by `record-demo drain-uploads`, or in the background by
+the next run_tasks that has a Convex URL.
+
+HLS entries remember which segments are already stored, so a drain only
+sends the missing ones before committing the playlist.
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .capture import read_segments
+from .dedup import sha256_file
+from .uploader import SegmentUploader, UploadUrlPrefetch, print_progress, upload_video
+
+DEFAULT_SPOOL_DIR = Path(
+    os.environ.get("DEMO_RECORDER_SPOOL", Path.home() / ".cache" / "demo-recorder" / "spool")
+)
+
+
+@dataclass
+class SpoolEntry:
+    convex_url: str
+    kind: str            # "file" (one video) or "hls" (segments/ directory)
+    path: str            # the video file, or the segments/ directory
+    output_dir: str
+    uploaded: dict[str, str] = field(default_factory=dict)  # hls: segment name → stored URL
+    sha256: str | None = None  # file: content hash, for upload dedup
+    attempts: int = 0
+    last_error: str = ""
+    created_at: float = field(default_factory=time.time)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+
+
+class UploadSpool:
+    """A directory of SpoolEntry JSON files."""
+
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root or DEFAULT_SPOOL_DIR)
+
+    def _entry_path(self, entry: SpoolEntry) -> Path:
+        return self.root / f"{entry.id}.json"
+
+    def add(self, entry: SpoolEntry) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(entry)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(entry), indent=2))
+        os.replace(tmp, path)  # a reader never sees a half-written entry
+        return path
+
+    def entries(self) -> list[SpoolEntry]:
+        if not self.root.is_dir():
+            return []
+        found: list[SpoolEntry] = []
+        for path in sorted(self.root.glob("*.json")):
+            try:
+                found.append(SpoolEntry(**json.loads(path.read_text())))
+            except (OSError, ValueError, TypeError) as exc:
+                print(f"  ⚠️ Skipping unreadable spool entry {path.name}: {exc}")
+        return sorted(found, key=lambda e: e.created_at)
+
+    def remove(self, entry: SpoolEntry) -> None:
+        self._entry_path(entry).unlink(missing_ok=True)
+
+    async def _drain_entry(self, entry: SpoolEntry) -> str | None:
+        path = Path(entry.path)
+        if not path.exists():
+            print(f"  ⚠️ Spooled artifact is gone, dropping entry: {path}")
+            self.remove(entry)
+            return None
+
+        if entry.kind == "hls":
+            uploader = SegmentUploader(
+                entry.convex_url,
+                lambda: read_segments(path),
+                uploaded={path / name: url for name, url in entry.uploaded.items()},
+            )
+            try:
+                url = await uploader.finish()
+            finally:
+                # Keep whatever made it up, so the next drain resumes from here
+                entry.uploaded = {p.name: u for p, u in uploader.uploaded.items()}
+        else:
+            uploaded = await upload_video(entry.convex_url, path, sha256=entry.sha256)
+            if uploaded is None:
+                return None
+            url = uploaded.url or f"convex:storage:{uploaded.storage_id}"
+        return url
+
+    async def drain(self) -> list[tuple[SpoolEntry, str | None]]:
+        """
+        Retry every spooled upload once (each with its own retry policy).
+
+        Returns (entry, url) pairs; url is None for entries that are still
+        spooled. A drain already running in another process makes this a
+        no-op rather than uploading everything twice.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / "drain.lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print("  Another drain-uploads is already running")
+                return []
+
+            results: list[tuple[SpoolEntry, str | None]] = []
+            for entry in self.entries():
+                print(f"  Draining spooled upload {entry.id} ({entry.kind}, attempt {entry.attempts + 1})")
+                try:
+                    url = await self._drain_entry(entry)
+                    error = "" if url else "upload failed"
+                except Exception as exc:  # noqa: BLE001
+                    url, error = None, str(exc)
+
+                if url:
+                    self.remove(entry)
+                    record = Path(entry.output_dir) / "upload.json"
+                    if record.parent.is_dir():
+                        record.write_text(json.dumps({"video_url": url, "drained_at": time.time()}, indent=2))
+                    print(f"  ✅ Drained {entry.id} → {url[:80]}")
+                elif Path(entry.path).exists():
+                    entry.attempts += 1
+                    entry.last_error = error
+                    self.add(entry)
+                results.append((entry, url))
+            return results
+
+
+async def upload_or_spool(
+    convex_url: str,
+    video_path: Path,
+    output_dir: Path,
+    sha256: str | None = None,
+    prefetch: UploadUrlPrefetch | None = None,
+    spool: UploadSpool | None = None,
+) -> tuple[str | None, dict]:
+    """
+    Upload one finished video, spooling it if every retry fails.
+
+    Returns (video URL or None, upload stats). Prints UPLOAD_DEDUP on
+    success and UPLOAD_SPOOLED when the video was spooled.
+    """
+    print("  Uploading to Convex...")
+    if sha256 is None:
+        sha256 = await asyncio.to_thread(sha256_file, video_path)
+    uploaded = await upload_video(
+        convex_url, video_path, print_progress(), prefetch=prefetch, sha256=sha256,
+    )
+    if uploaded is not None:
+        stats = uploaded.stats()
+        print(f"UPLOAD_DEDUP: {stats['dedup']}")
+        return uploaded.url or f"convex:storage:{uploaded.storage_id}", stats
+    spooled_path = (spool or UploadSpool()).add(SpoolEntry(
+        convex_url=convex_url, kind="file", path=str(video_path),
+        output_dir=str(output_dir), sha256=sha256,
+    ))
+    print(f"UPLOAD_SPOOLED: {spooled_path}")
+    return None, {"spooled": str(spooled_path)}
@@ -13,108 +13,62 @@ Input shape (from upstream agent like Claude Code):
     ]
 """
 
+import asyncio
 import json
-import os
-import re
-import signal
+import math
 import subprocess
 import time
 from dataclasses import dataclass, field
 from pathlib import Path
 from datetime import datetime
 
-import httpx
-from browser_use import Agent, BrowserProfile
-
+from browser_use import Agent, BrowserProfile, BrowserSession
+from browser_use.agent.views import AgentHistoryList
+
+from .browser_pool import BrowserPool, WarmBrowser, headless_profile
+from .capture import IdleGate, MediaTimeline, ScreenRecorder
+from .media import MediaInfo, extract_thumbnail, probe_media
+from .direct import DirectDriver, compile_task
+from .display import VirtualDisplay, start_xvfb, stop_xvfb
+from .process import run_process
+from .prompt import build_prompt
+from .screencast import CAPTURE_BACKENDS, ScreencastRecorder
 from .recorder import get_llm
-
-
-# ── Xvfb + ffmpeg screen recording ────────────────────────────────────
-
-def start_xvfb(display: str = ":99", resolution: str = "1920x1080x24") -> subprocess.Popen:
-    """Start a virtual X display."""
-    proc = subprocess.Popen(
-        ["Xvfb", display, "-screen", "0", resolution, "-ac", "-nolisten", "tcp"],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
-    os.environ["DISPLAY"] = display
-    time.sleep(1)  # give Xvfb time to initialize
-    print(f"  Xvfb started on {display} ({resolution})")
-    return proc
-
-
-def start_screen_recording(
-    output_path: Path,
-    display: str = ":99",
-    resolution: str = "1920x1080",
-    fps: int = 25,
-) -> subprocess.Popen:
-    """Start ffmpeg screen capture of the virtual display."""
-    proc = subprocess.Popen(
-        [
-            "ffmpeg",
-            "-f", "x11grab",
-            "-video_size", resolution,
-            "-framerate", str(fps),
-            "-i", display,
-            "-c:v", "libx264",
-            "-preset", "ultrafast",
-            "-pix_fmt", "yuv420p",
-            "-y",
-            str(output_path),
-        ],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
-    print(f"  Screen recording started → {output_path.name}")
-    return proc
-
-
-def stop_screen_recording(proc: subprocess.Popen | None) -> None:
-    """Stop ffmpeg gracefully by sending 'q' to flush the file."""
-    if proc is None or proc.poll() is not None:
-        return
-    try:
-        proc.stdin.write(b"q")
-        proc.stdin.flush()
-        proc.wait(timeout=10)
-        print("  Screen recording stopped")
-    except Exception:
-        proc.kill()
-        proc.wait(timeout=5)
-
-
-def stop_xvfb(proc: subprocess.Popen | None) -> None:
-    """Terminate the Xvfb process."""
-    if proc is None or proc.poll() is not None:
-        return
-    proc.terminate()
-    try:
-        proc.wait(timeout=5)
-    except subprocess.TimeoutExpired:
-        proc.kill()
+from .replay import ReplayCache, dom_fingerprint, replay_key, replay_steps, takeover_note
+from .spool import SpoolEntry, UploadSpool, upload_or_spool
+from .uploader import MIME_TYPES, SegmentUploader, UploadUrlPrefetch, upload_artifacts
 
 
 # ── Interaction event extraction from browser-use history ─────────────
 
-def extract_interaction_events(history, recording_start_time: float) -> list[dict]:
+def extract_interaction_events(
+    history,
+    timeline: MediaTimeline,
+    step_starts: dict[int, float] | None = None,
+) -> list[dict]:
     """
     Walk the browser-use AgentHistoryList and pull out interaction events
-    with coordinates and timestamps relative to the recording start.
+    with coordinates and timestamps on the video's media timeline.
+
+    step_starts maps step_number → time.monotonic() captured by our own
+    on_step_start hook; steps missing from it fall back to browser-use's
+    wall-clock step_start_time.
 
     Returns a list of dicts like:
         {"type": "click", "atMs": 4500, "x": 320, "y": 180, "note": "clicked button"}
     """
     events: list[dict] = []
+    step_starts = step_starts or {}
 
     for step in history.history:
-        # Get the step's timestamp relative to recording start
+        # Get the step's position on the media timeline
         step_time_ms = 0
-        if step.metadata and hasattr(step.metadata, 'step_start_time'):
-            step_time_ms = int((step.metadata.step_start_time - recording_start_time) * 1000)
-            step_time_ms = max(0, step_time_ms)
+        if step.metadata:
+            step_number = getattr(step.metadata, 'step_number', None)
+            if step_number in step_starts:
+                step_time_ms = timeline.media_ms(step_starts[step_number])
+            elif hasattr(step.metadata, 'step_start_time'):
+                step_time_ms = timeline.media_ms_from_wall(step.metadata.step_start_time)
 
         # Extract action types and coordinates from model_output + results
         if not step.model_output:
@@ -182,70 +136,52 @@ def extract_interaction_events(history, recording_start_time: float) -> list[dic
     return events
 
 
-# ── Convex upload ──────────────────────────────────────────────────────
+# ── Judge verdicts ─────────────────────────────────────────────────────
+
+def judge(history) -> tuple[str, str]:
+    """(verdict, reasoning) of one agent run, from browser-use's judge if it ran."""
+    judgement = history.judgement() if hasattr(history, 'judgement') else None
+    if judgement:
+        raw = judgement.get('verdict')
+        if isinstance(raw, bool):
+            verdict = 'pass' if raw else 'fail'
+        elif isinstance(raw, str):
+            verdict = raw.lower()
+        else:
+            verdict = 'pass' if history.is_done() else 'fail'
+        reasoning = (
+            judgement.get('reasoning') or judgement.get('failure_reason') or history.final_result() or ''
+        )
+    else:
+        verdict = 'pass' if history.is_done() else 'fail'
+        reasoning = history.final_result() or ''
+    return verdict, reasoning
 
-async def upload_to_convex(convex_url: str, video_path: Path) -> str | None:
-    """
-    Upload video to Convex blob storage and return the viewable URL.
 
-    1. Call runs:generateUploadUrl to get a signed upload URL
-    2. POST the video file to that URL
-    3. Get back storageId
-    4. Call runs:getVideoUrl to get the viewable URL
+def roll_up_verdicts(
+    chunks: list[tuple[list[dict], str, str]],
+    skipped: list[dict] | None = None,
+) -> tuple[str, str]:
     """
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        # Step 1: Get upload URL
-        gen_res = await client.post(
-            f"{convex_url}/api/mutation",
-            json={"path": "runs:generateUploadUrl", "args": {}, "format": "json"},
-        )
-        if gen_res.status_code != 200:
-            print(f"  ⚠️ Failed to get upload URL: {gen_res.status_code}")
-            return None
-
-        upload_url = gen_res.json().get("value")
-        if not upload_url:
-            print("  ⚠️ No upload URL returned")
-            return None
-
-        # Step 2: Upload the video file
-        video_bytes = video_path.read_bytes()
-        ext = video_path.suffix.lower()
-        mime_types = {".mp4": "video/mp4", ".webm": "video/webm"}
-        content_type = mime_types.get(ext, "application/octet-stream")
-
-        upload_res = await client.post(
-            upload_url,
-            content=video_bytes,
-            headers={"Content-Type": content_type},
-        )
-        if upload_res.status_code != 200:
-            print(f"  ⚠️ Failed to upload video: {upload_res.status_code}")
-            return None
-
-        storage_id = upload_res.json().get("storageId")
-        if not storage_id:
-            print("  ⚠️ No storageId returned")
-            return None
-
-        # Step 3: Get the viewable URL via a query
-        url_res = await client.post(
-            f"{convex_url}/api/query",
-            json={
-                "path": "runs:getStorageUrl",
-                "args": {"storageId": storage_id},
-                "format": "json",
-            },
-        )
-        if url_res.status_code == 200:
-            video_url = url_res.json().get("value")
-            if video_url:
-                print(f"  ✅ Uploaded to Convex: {video_url[:80]}...")
-                return video_url
+    One verdict for chunks of (tasks, verdict, reasoning): pass only if every
+    chunk passed and none was skipped, unverified if the only chunks that
+    did not pass were replayed unjudged, fail otherwise. Reasoning stays on
+    one line.
+    """
+    if len(chunks) == 1 and not skipped:
+        return chunks[0][1], chunks[0][2]
+    verdicts = {v for _, v, _ in chunks}
+    if skipped or not verdicts <= {'pass', 'unverified'}:
+        verdict = 'fail'
+    else:
+        verdict = 'unverified' if 'unverified' in verdicts else 'pass'
+    def span(group: list[dict]) -> str:
+        return group[0]['id'] if len(group) == 1 else f"{group[0]['id']}..{group[-1]['id']}"
 
-        # Fallback: return storage ID if we can't get URL
-        print(f"  ✅ Uploaded to Convex (storageId: {storage_id})")
-        return f"convex:storage:{storage_id}"
+    parts = [f"[{span(chunk)}] {v}: {str(reasoning).strip()}" for chunk, v, reasoning in chunks]
+    if skipped:
+        parts.append(f"[{span(skipped)}] not run after an earlier failure")
+    return verdict, " | ".join(parts)
 
 
 # ── Data types ─────────────────────────────────────────────────────────
@@ -261,44 +197,27 @@ class TasksResult:
     error: str | None = None
     video_url: str | None = None     # Convex signed URL if uploaded
     interaction_events: list[dict] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)  # seconds spent in each readiness wait
+    capture_sync: dict = field(default_factory=dict)  # how events were aligned to the video
+    upload_stats: dict = field(default_factory=dict)   # bytes / seconds / throughput / dedup hit of the upload
+    video_path: Path | None = None                     # the validated recording
+    media: dict = field(default_factory=dict)          # MediaInfo of video_path (codec, size, frames, ...)
 
 
-# ── Prompt builder ─────────────────────────────────────────────────────
-
-def build_prompt(tasks: list[dict], base_url: str) -> str:
-    """
-    Merge all task descriptions into one numbered browser-agent instruction string.
-    Expands relative paths (e.g. /banana) to full URLs (e.g. http://localhost:3000/banana).
-    """
-    # Expand relative paths like "Navigate to /path" → "Navigate to http://localhost:3000/path"
-    expanded_tasks = []
-    for task in tasks:
-        desc = task['description'].strip()
-        desc = re.sub(
-            r'Navigate to (/\S+)',
-            lambda m: f'Navigate to {base_url}{m.group(1)}',
-            desc,
-        )
-        expanded_tasks.append(desc)
-
-    steps = "\n".join(
-        f"  Step {i + 1} [{tasks[i]['id']}]: {desc}"
-        for i, desc in enumerate(expanded_tasks)
-    )
+# ── Main runner ────────────────────────────────────────────────────────
 
-    return (
-        f"The app is running at {base_url}\n\n"
-        f"Complete the following verification steps in order:\n\n"
-        f"{steps}\n\n"
-        f"Recording instructions (important):\n"
-        f"- Complete ALL steps in sequence — do not skip any.\n"
-        f"- If a step cannot be completed (element not found, page error, etc.), stop immediately and report failure. Do not retry endlessly.\n"
-        f"- Do not close the browser when done."
-    )
+def default_output_dir(cwd: Path | None = None) -> Path:
+    """demos/<timestamp> at the root of the repo containing cwd."""
+    timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
+    cwd = cwd or Path.cwd()
+    repo_root = cwd
+    for parent in [cwd, *cwd.parents]:
+        if (parent / "turbo.json").exists() or (parent / ".git").exists():
+            repo_root = parent
+            break
+    return repo_root / "demos" / timestamp
 
 
-# ── Main runner ────────────────────────────────────────────────────────
-
 async def run_tasks(
     tasks: list[dict],
     base_url: str = "http://localhost:3000",
@@ -307,29 +226,73 @@ async def run_tasks(
     max_steps: int | None = None,
     convex_url: str | None = None,
     headless: bool = False,
+    capture_mode: str = "vfr",
+    pause_idle: bool = True,
+    idle_hold_sec: float = 1.0,
+    container: str = "fmp4",
+    capture_backend: str = "x11grab",
+    browser_pool: BrowserPool | None = None,
+    llm=None,
+    chunk_size: int | None = 10,
+    replay: bool = False,
+    direct: bool = True,
+    report: bool = True,
 ) -> TasksResult:
     """
     Run all tasks as one browser agent session, recording a single video.
 
-    When headless=True (container/CI mode):
-      - Starts Xvfb virtual display at :99 (1920x1080)
+    When headless=True (container/CI mode) with capture_backend="x11grab":
+      - Leases a free Xvfb virtual display from the display pool (1920x1080)
       - Runs browser NON-headless on the virtual display
-      - Uses ffmpeg x11grab to screen-record the display
+      - Uses ffmpeg x11grab to screen-record the display; capture_mode="vfr"
+        only encodes frames that differ from the previous one, "cfr" encodes
+        a constant 25 fps
+      - With pause_idle=True, capture pauses while the agent waits on the
+        LLM (keeping idle_hold_sec after each action for context), so idle
+        time never reaches the video
+      - container="fmp4" writes a fragmented MP4 that stays playable if the
+        run is killed; "hls" writes rolling segments + a playlist under
+        segments/; "mp4" is a classic MP4
       - Produces a clean MP4 from real rendered pixels
 
+    With capture_backend="screencast" the browser runs truly headless and
+    the page is recorded from Chrome's DevTools screencast instead — no
+    Xvfb or xdotool. Capture mode, idle pausing and containers apply the
+    same way.
+
+    Lists longer than chunk_size run as consecutive chunks: each chunk is a
+    fresh agent (so the LLM context, and with it step latency, stays
+    small) in the same browser, display and recording. max_steps is split
+    across chunks by task count, a failing chunk ends the run, and the
+    chunk verdicts roll up into one. chunk_size=None runs one agent.
+
+    With replay=True, every chunk that passes is saved to the ReplayCache
+    and a later run of the same tasks against unchanged pages re-executes
+    the saved actions without the LLM (see replay.py). No judge sees a
+    replayed chunk, so its verdict is "unverified". A replayed step whose
+    element is no longer in the DOM hands the rest of the chunk to the agent.
+
+    With direct=True, tasks written entirely in the task grammar
+    (Navigate / Type X into id= / Click id= / Confirm id= ..., see
+    direct.py) run as direct browser actions and assertions, with their
+    verdict decided by the assertions. Other tasks — and a direct task
+    whose element never shows up — go to the agent.
+
+    report=False leaves the machine-read result lines (EVENTS_JSON,
+    CAPTURE_SKEW_MS, IDLE_REMOVED_SEC, VIDEO_URL) to the caller — run_sharded
+    prints merged ones, and callers take the first line of each kind.
+
+    llm overrides the client get_llm(model) would build, so a long-lived
+    caller can reuse one. With a browser_pool (headless only), the run leases a warm browser —
+    and its Xvfb display for x11grab — instead of launching one, and hands
+    it back reset when it is done.
+
     When headless=False (local dev with real display):
       - Uses Playwright's built-in record_video_dir
     """
     # Resolve output directory
     if output_dir is None:
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
-        cwd = Path.cwd()
-        repo_root = cwd
-        for parent in [cwd, *cwd.parents]:
-            if (parent / "turbo.json").exists() or (parent / ".git").exists():
-                repo_root = parent
-                break
-        output_dir = repo_root / "demos" / timestamp
+        output_dir = default_output_dir()
     else:
         output_dir = Path(output_dir)
 
@@ -339,35 +302,85 @@ async def run_tasks(
     if max_steps is None:
         max_steps = len(tasks) * 8
 
-    # Build one combined prompt from all tasks
-    prompt = build_prompt(tasks, base_url)
-
-    print(f"Running {len(tasks)} task(s) in one session → {output_dir}")
+    # Tasks in the task grammar run directly, one per chunk. The others
+    # form agent chunks of up to chunk_size consecutive tasks, each with
+    # one combined prompt; long lists get a fresh agent per chunk.
+    compiled = [compile_task(t["description"]) if direct else None for t in tasks]
+    size = chunk_size or len(tasks)
+    starts: list[int] = []   # index of each chunk's first task
+    chunks: list[list[dict]] = []
+    for index, (task, steps) in enumerate(zip(tasks, compiled)):
+        if steps is None and chunks and compiled[starts[-1]] is None and len(chunks[-1]) < size:
+            chunks[-1].append(task)
+        else:
+            starts.append(index)
+            chunks.append([task])
+    prompts = [build_prompt(chunk, base_url, first_step=1 + first) for first, chunk in zip(starts, chunks)]
+    prompt = "\n\n".join(prompts)
+    shared_browser = len(chunks) > 1 or replay or any(compiled)
+
+    chunked = f" ({len(chunks)} chunks)" if len(chunks) > 1 else ""
+    print(f"Running {len(tasks)} task(s) in one session{chunked} → {output_dir}")
     print(f"\nPrompt preview:\n{'-' * 60}")
     print(prompt)
     print("-" * 60 + "\n")
-
-    xvfb_proc = None
-    ffmpeg_proc = None
-    use_xvfb = headless  # use virtual display in container mode
+    if any(compiled):
+        direct_ids = [t["id"] for t, steps in zip(tasks, compiled) if steps is not None]
+        print(f"  Direct (no LLM): {', '.join(direct_ids)}")
+
+    virtual_display: VirtualDisplay | None = None
+    recorder: ScreenRecorder | None = None
+    timings: dict[str, float] = {}
+    if capture_backend not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend {capture_backend!r} (expected one of {CAPTURE_BACKENDS})")
+    use_xvfb = headless and capture_backend == "x11grab"  # virtual display in container mode
+    use_screencast = headless and capture_backend == "screencast"
+    if browser_pool is not None and (not headless or browser_pool.backend != capture_backend):
+        raise ValueError(
+            f"browser_pool serves headless {browser_pool.backend!r} capture, "
+            f"not {capture_backend if headless else 'local'!r} runs"
+        )
+    leased: WarmBrowser | None = None
+    own_session: BrowserSession | None = None  # shared by chunks when not leased
+    run_ok = False
+    spool = UploadSpool()
+    drain_task: asyncio.Task | None = None
+    upload_prefetch: UploadUrlPrefetch | None = None
 
     try:
-        # ── Set up virtual display if in container mode ──
+        if convex_url:
+            # The final upload's signed URL arrives while the agent runs,
+            # so the end of the run starts straight with the body POST
+            upload_prefetch = UploadUrlPrefetch(convex_url)
+            # Retry uploads spooled by earlier runs while this one records
+            if spool.entries():
+                drain_task = asyncio.create_task(spool.drain())
+
+        # ── Lease a warm browser, or set up a virtual display ──
+        if browser_pool is not None:
+            leased = await browser_pool.lease()
+            timings["browser_lease"] = browser_pool.lease_waits[-1]
+            virtual_display = leased.display
+            print(f"  Leased a warm browser (use {leased.uses}/{browser_pool.max_uses})")
+        elif use_xvfb:
+            virtual_display = await start_xvfb("1920x1080x24")
+            timings["xvfb_ready"] = virtual_display.ready_sec
         if use_xvfb:
-            xvfb_proc = start_xvfb(":99", "1920x1080x24")
             # Move cursor to top-left corner so it doesn't sit in center of frame
-            subprocess.run(["xdotool", "mousemove", "0", "0"], timeout=5, check=False)
+            try:
+                await run_process(
+                    ["xdotool", "mousemove", "0", "0"], timeout=5, env=virtual_display.env(),
+                )
+            except (subprocess.TimeoutExpired, FileNotFoundError):
+                pass
 
         # ── Configure browser ──
-        if use_xvfb:
-            # Non-headless on virtual display, kiosk mode hides toolbar
-            # so viewport = full 1920x1080 display = accurate click coordinates
-            browser_profile = BrowserProfile(
-                headless=False,
-                args=["--kiosk"],
-                wait_between_actions=1.5,
-                minimum_wait_page_load_time=1.0,
-            )
+        browser_profile: BrowserProfile | None = None
+        if leased is not None:
+            pass  # the leased session brings its own profile
+        elif use_xvfb or use_screencast:
+            # keep_alive: later chunks must find the browser running
+            browser_profile = headless_profile(virtual_display, keep_alive=shared_browser)
         else:
             # Local dev: use Playwright's built-in recording
             browser_profile = BrowserProfile(
@@ -376,119 +389,311 @@ async def run_tasks(
                 record_video_size={"width": 1920, "height": 1080},
                 wait_between_actions=1.5,
                 minimum_wait_page_load_time=1.0,
+                keep_alive=shared_browser,
             )
-
-        llm = get_llm(model)
-
-        ground_truth = "\n".join(
-            f"[{t['id']}]: {t['description'].strip()}" for t in tasks
-        )
-
-        agent = Agent(
-            task=prompt,
-            llm=llm,
-            browser_profile=browser_profile,
-            ground_truth=ground_truth,
-        )
-
-        # ── Start screen recording right before the agent runs ──
+        if leased is not None:
+            browser_args = {"browser_session": leased.session}
+        elif shared_browser:
+            own_session = BrowserSession(browser_profile=browser_profile)
+            browser_args = {"browser_session": own_session}
+        else:
+            browser_args = {"browser_profile": browser_profile}
+
+        # ── Screen recording, driven by the agent's step hooks ──
+        # Browser launch (and the browser-use splash) happens inside
+        # agent.run() before step 1, so starting capture from the first
+        # on_step_start hook keeps the splash out of the video without a
+        # trim pass. The hook is awaited, so step 1 only runs once ffmpeg
+        # has its first frame.
+        #
+        # With pause_idle, capture also pauses idle_hold_sec after each
+        # step's actions finish and resumes once the LLM has answered and
+        # the next actions are about to run, so think time is never encoded.
         video_path = output_dir / "recording.mp4"
-        if use_xvfb:
-            ffmpeg_proc = start_screen_recording(video_path, ":99", "1920x1080", 25)
-            time.sleep(0.5)  # let ffmpeg initialize
-
-        # ── Run the agent ──
-        recording_start_time = time.time()
-        history = await agent.run(max_steps=max_steps)
-
-        # ── Extract interaction events from history (before trim adjustment) ──
-        interaction_events = extract_interaction_events(history, recording_start_time)
-        print(f"  Extracted {len(interaction_events)} interaction events")
+        idle_gate: IdleGate | None = None
+        segment_uploader: SegmentUploader | None = None
+        if use_xvfb or use_screencast:
+            if use_xvfb:
+                recorder = ScreenRecorder(
+                    video_path, virtual_display.name, "1920x1080", 25, capture_mode,
+                    pausable=pause_idle, container=container,
+                )
+            else:
+                recorder = ScreencastRecorder(
+                    video_path, "1920x1080", 25, capture_mode,
+                    pausable=pause_idle, container=container,
+                )
+            if pause_idle:
+                idle_gate = IdleGate(recorder, hold_sec=idle_hold_sec)
+            if convex_url and container == "hls":
+                # Push finished segments to storage while the agent runs
+                segment_uploader = SegmentUploader(convex_url, recorder.completed_segments)
+                segment_uploader.start()
+        agent_started = time.monotonic()
+        step_starts: dict[int, float] = {}
+        action_starts: dict[int, float] = {}
+
+        async def ensure_capture(browser_session) -> None:
+            if isinstance(recorder, ScreencastRecorder):
+                if recorder.started:
+                    await recorder.follow_focus()  # the agent may have switched tabs
+                else:
+                    recorder.attach(browser_session)
+            if recorder is not None and not recorder.started:
+                timings["browser_startup"] = time.monotonic() - agent_started
+                await recorder.start()
+                timings["capture_first_frame"] = await recorder.wait_until_ready()
+                print(
+                    f"  Capture started at first agent step "
+                    f"(browser startup {timings['browser_startup']:.2f}s not recorded, "
+                    f"first frame in {timings['capture_first_frame']:.2f}s)"
+                )
 
-        # ── Small delay so the final frame is captured ──
-        import asyncio
-        await asyncio.sleep(2)
-
-        # ── Stop screen recording ──
-        if ffmpeg_proc:
-            stop_screen_recording(ffmpeg_proc)
-            ffmpeg_proc = None
-
-        # ── Trim loading screen from start of video ──
-        # Hardcoded 6.5s delay for browser-use splash screen
-        trim_offset_sec = 7.0 if use_xvfb else 0.0
-        print(f"  Trim offset: {trim_offset_sec:.2f}s")
-
-        if use_xvfb and trim_offset_sec > 1.0:
-            trimmed_path = output_dir / "trimmed.mp4"
-            trim_result = subprocess.run(
-                [
-                    "ffmpeg", "-y",
-                    "-ss", f"{trim_offset_sec:.2f}",
-                    "-i", str(video_path),
-                    "-c", "copy",
-                    str(trimmed_path),
-                ],
-                capture_output=True, text=True, timeout=30,
+        async def on_step_start(agent_ref) -> None:
+            await ensure_capture(agent_ref.browser_session)
+            step_starts[agent_ref.state.n_steps] = time.monotonic()
+
+        async def on_actions_start(_state, _model_output, step_number: int) -> None:
+            # The LLM has answered; this step's actions run right after us
+            if idle_gate is not None:
+                await idle_gate.action_starting()
+            action_starts[step_number] = time.monotonic()
+
+        async def on_step_end(_agent) -> None:
+            if idle_gate is not None:
+                idle_gate.action_finished()
+
+        # Replayed and direct actions bracket themselves like the agent's
+        async def before_action() -> None:
+            if idle_gate is not None:
+                await idle_gate.action_starting()
+
+        def after_action() -> None:
+            if idle_gate is not None:
+                idle_gate.action_finished()
+
+        async def on_replay_step(step_number: int | None) -> None:
+            await before_action()
+            step_starts[step_number] = time.monotonic()
+
+        def new_agent(chunk: list[dict], chunk_prompt: str) -> Agent:
+            nonlocal llm
+            llm = llm or get_llm(model)  # only built once a chunk needs the agent
+            return Agent(
+                task=chunk_prompt,
+                llm=llm,
+                **browser_args,
+                ground_truth="\n".join(f"[{t['id']}]: {t['description'].strip()}" for t in chunk),
+                register_new_step_callback=on_actions_start,
             )
-            if trim_result.returncode == 0 and trimmed_path.exists() and trimmed_path.stat().st_size > 0:
-                trimmed_path.rename(video_path)
-                print(f"TRIM_OFFSET: {trim_offset_sec:.2f}")
-                # Adjust interaction event timestamps by the trim offset
-                trim_offset_ms = int(trim_offset_sec * 1000)
-                for event in interaction_events:
-                    event["atMs"] = max(0, event["atMs"] - trim_offset_ms)
-            else:
-                print(f"  Warning: trim failed (rc={trim_result.returncode}), keeping original video")
-                if trimmed_path.exists():
-                    trimmed_path.unlink()
-
-        # ── Extract judge verdict ──
-        judgement = history.judgement() if hasattr(history, 'judgement') else None
-        if judgement:
-            raw = judgement.get('verdict')
-            if isinstance(raw, bool):
-                verdict = 'pass' if raw else 'fail'
-            elif isinstance(raw, str):
-                verdict = raw.lower()
-            else:
-                verdict = 'pass' if history.is_done() else 'fail'
-            verdict_reasoning = (
-                judgement.get('reasoning') or judgement.get('failure_reason') or history.final_result() or ''
+
+        replay_cache: ReplayCache | None = None
+        fingerprint = ""
+        if replay:
+            replay_cache = ReplayCache()
+            fingerprinted_at = time.monotonic()
+            fingerprint = await dom_fingerprint(tasks, base_url)
+            timings["replay_fingerprint"] = time.monotonic() - fingerprinted_at
+
+        # ── Run direct chunks, replay cached ones, a fresh agent for the rest ──
+        # chunk_runs and direct_events feed the events, chunk_verdicts the
+        # rolled-up verdict
+        chunk_runs: list[tuple[list[dict], object, dict[int, float]]] = []
+        direct_events: list[tuple[float, dict]] = []
+        chunk_verdicts: list[tuple[list[dict], str, str]] = []
+        for n, (first, chunk, chunk_prompt) in enumerate(zip(starts, chunks, prompts), 1):
+            step_starts, action_starts = {}, {}  # step numbers restart with each agent
+            steps = compiled[first]
+            if len(chunks) > 1:
+                kind = "Direct" if steps is not None else "Agent"
+                print(f"  {kind} chunk {n}/{len(chunks)}: {', '.join(t['id'] for t in chunk)}")
+            if steps is not None:
+                session = leased.session if leased is not None else own_session
+                await session.start()  # normally agent.run()'s job
+                await ensure_capture(session)
+                outcome = await DirectDriver(session, base_url).run(steps, before_action, after_action)
+                direct_events += outcome.events
+                if leased is not None:
+                    leased.visited(base_url, *(s.target for s in steps if s.kind == "navigate" and "://" in s.target))
+                if outcome.fallback is None:
+                    chunk_verdicts.append((chunk, "pass" if outcome.passed else "fail", outcome.reasoning))
+                    if n < len(chunks) and not outcome.passed:
+                        print(f"  Chunk {n} did not pass; skipping the remaining {len(chunks) - n} chunk(s)")
+                        break
+                    continue
+                print(f"  ⚠️ {outcome.fallback}; the agent takes over {chunk[0]['id']}")
+            key = replay_key(tasks[:first + len(chunk)], first, base_url, fingerprint) if replay_cache else ""
+            agent = new_agent(chunk, chunk_prompt)
+            cached = replay_cache.load(key, agent.AgentOutput) if replay_cache else None
+            replayed: list = []
+            if cached is not None:
+                replayed_at = time.monotonic()
+                await agent.browser_session.start()  # normally agent.run()'s job
+                await ensure_capture(agent.browser_session)
+                replayed, diverged = await replay_steps(agent, cached, on_replay_step, after_action)
+                timings[f"replay_chunk{n}"] = time.monotonic() - replayed_at
+                if leased is not None:
+                    leased.visited(base_url, *(u for u in cached.urls() if u))
+                chunk_runs.append((chunk, AgentHistoryList(history=replayed), dict(step_starts)))
+                if diverged is None:
+                    # Nothing judged the replayed state, so it does not count as a pass
+                    print(f"  ⏩ Replayed {len(replayed)} cached step(s) without the LLM")
+                    chunk_verdicts.append((
+                        chunk, "unverified", f"replayed {len(replayed)} cached step(s), not judged",
+                    ))
+                    continue
+                print(f"  ⚠️ Replay diverged at {diverged}; the agent takes over")
+                current_url = None
+                if replayed:
+                    replay_cache.discard(key)  # re-learned by the next run from the start
+                    try:
+                        current_url = await agent.browser_session.get_current_page_url()
+                    except Exception:  # noqa: BLE001 — fall back to the last replayed page
+                        current_url = replayed[-1].state.url
+                step_starts = {}
+                # A fresh agent (rerun_history may have closed the first one)
+                # that skips the steps already replayed
+                note = takeover_note(replayed, current_url)
+                agent = new_agent(chunk, f"{chunk_prompt}\n\n{note}" if note else chunk_prompt)
+            history = await agent.run(
+                max_steps=math.ceil(max_steps * len(chunk) / len(tasks)),
+                on_step_start=on_step_start, on_step_end=on_step_end,
             )
+            chunk_runs.append((chunk, history, {**step_starts, **action_starts}))
+            chunk_verdicts.append((chunk, *judge(history)))
+            if leased is not None:
+                leased.visited(base_url, *(u for u in history.urls() if u))
+            if replay_cache is not None and chunk_verdicts[-1][1] == "pass" and not replayed:
+                replay_cache.store(key, history)
+            if n < len(chunks) and chunk_verdicts[-1][1] != "pass":
+                print(f"  Chunk {n} did not pass; skipping the remaining {len(chunks) - n} chunk(s)")
+                break
+
+        # ── Wait until the final action is on screen, then stop ──
+        if idle_gate is not None:
+            await idle_gate.close()
+            if idle_gate.resume_waits:
+                timings["capture_resume_total"] = sum(idle_gate.resume_waits)
+        if recorder and recorder.started:
+            try:
+                timings["capture_tail"] = await recorder.wait_for_tail()
+            except (TimeoutError, RuntimeError) as exc:
+                print(f"  Warning: {exc}")
+        if recorder:
+            await recorder.stop()
+        elif own_session is not None:
+            # Local mode: browser-use only saves the record_video_dir video
+            # when the browser stops, and a keep_alive session outlives the
+            # agents, so stop it here rather than in the cleanup below
+            await own_session.kill()
+            own_session = None
+
+        # ── Map interaction events onto the video timeline ──
+        # Actions run right after the LLM answers, so the action mark is
+        # the most precise anchor; the step start is the fallback.
+        video_sha256: str | None = None
+        if recorder and recorder.started:
+            timeline = recorder.timeline()
+            capture_sync = recorder.sync_report()
+            video_sha256 = recorder.output_sha256  # hashed while it was written
         else:
-            verdict = 'pass' if history.is_done() else 'fail'
-            verdict_reasoning = history.final_result() or ''
-        verdict_icon = "✅" if verdict == "pass" else "❌"
+            # Playwright recording starts with the browser, roughly at agent start
+            timeline = MediaTimeline.starting_at(agent_started, time.time() - time.monotonic())
+            capture_sync = {"fps": timeline.fps, "source": "agent_start"}
+        recorder = None
+        interaction_events = sorted(
+            [
+                *(
+                    event
+                    for _, history, marks in chunk_runs
+                    for event in extract_interaction_events(history, timeline, marks)
+                ),
+                *({"type": e["type"], "atMs": timeline.media_ms(at), **e} for at, e in direct_events),
+            ],
+            key=lambda e: e["atMs"],
+        )
+        print(f"  Extracted {len(interaction_events)} interaction events")
+        if report and "skew_ms" in capture_sync:
+            print(f"CAPTURE_SKEW_MS: {capture_sync['skew_ms']}")
+        if report and capture_sync.get("idle_removed_sec"):
+            print(f"IDLE_REMOVED_SEC: {capture_sync['idle_removed_sec']:.2f}")
+
+        # ── Extract judge verdict, rolled up over chunks ──
+        verdict, verdict_reasoning = roll_up_verdicts(
+            chunk_verdicts, skipped=tasks[sum(len(chunk) for chunk, _, _ in chunk_verdicts):],
+        )
+        verdict_icon = {"pass": "✅", "unverified": "⚠️"}.get(verdict, "❌")
         print(f"{verdict_icon} Judge verdict: {verdict.upper()} — {str(verdict_reasoning)[:120]}")
 
-        # ── Find and validate video ──
-        video_files = list(output_dir.glob("*.mp4")) + list(output_dir.glob("*.webm"))
+        # ── Pick the video and probe it once ──
+        # Headless capture writes recording.mp4; Playwright names its webm
+        # itself, so local mode takes the newest video in the directory.
+        if use_xvfb or use_screencast:
+            candidate = video_path if video_path.exists() else None
+        else:
+            videos = [*output_dir.glob("*.webm"), *output_dir.glob("*.mp4")]
+            candidate = max(videos, key=lambda p: p.stat().st_mtime, default=None)
         final_video_path: Path | None = None
-        for video_file in video_files:
+        media: MediaInfo | None = None
+        if candidate is not None:
             try:
-                probe_result = subprocess.run(
-                    ["ffprobe", "-v", "error", "-show_entries", "format=duration", str(video_file)],
-                    capture_output=True,
-                    text=True,
-                    timeout=10,
-                )
-                if probe_result.returncode == 0 and "duration" in probe_result.stdout:
-                    final_video_path = video_file
-                    file_size = video_file.stat().st_size
-                    duration_match = re.search(r"duration=(\d+\.?\d*)", probe_result.stdout)
-                    duration = float(duration_match.group(1)) if duration_match else 0
-                    print(f"  ✅ Valid video: {video_file.name} ({file_size / 1024:.1f} KB, {duration:.1f}s)")
+                media = await probe_media(candidate)
+                if media is not None:
+                    final_video_path = candidate
+                    print(
+                        f"  ✅ Valid video: {candidate.name} ({media.size_bytes / 1024:.1f} KB, "
+                        f"{media.duration:.1f}s, {media.codec} {media.width}x{media.height}, "
+                        f"{media.frames} frames)"
+                    )
                 else:
-                    print(f"  ⚠️ Corrupt video: {video_file.name}")
+                    print(f"  ⚠️ Corrupt video: {candidate.name}")
             except (subprocess.TimeoutExpired, FileNotFoundError):
-                final_video_path = video_file
+                final_video_path = candidate  # can't probe; assume it's fine
 
         # ── Upload to Convex ──
+        # Anything that still fails after retries is spooled for
+        # `record-demo drain-uploads` instead of being lost.
         video_url: str | None = None
-        if convex_url and final_video_path and final_video_path.exists():
-            print(f"  Uploading to Convex...")
-            video_url = await upload_to_convex(convex_url, final_video_path)
+        upload_stats: dict = {}
+        spool_entry: SpoolEntry | None = None
+        if segment_uploader is not None:
+            # Segments went up during the run; only the tail + playlist remain
+            print("  Committing streamed segments to Convex...")
+            video_url = await segment_uploader.finish(upload_prefetch)
+            upload_stats = segment_uploader.stats()
+            if video_url is None and (output_dir / "segments").is_dir():
+                spool_entry = SpoolEntry(
+                    convex_url=convex_url, kind="hls", path=str(output_dir / "segments"),
+                    output_dir=str(output_dir),
+                    uploaded={p.name: u for p, u in segment_uploader.uploaded.items()},
+                )
+            segment_uploader = None
+        elif convex_url and final_video_path and final_video_path.exists():
+            if final_video_path != video_path:
+                video_sha256 = None  # only recording.mp4 was hashed
+            video_url, upload_stats = await upload_or_spool(
+                convex_url, final_video_path, output_dir, video_sha256, upload_prefetch, spool,
+            )
+        if spool_entry is not None:
+            spooled_path = spool.add(spool_entry)
+            upload_stats["spooled"] = str(spooled_path)
+            print(f"UPLOAD_SPOOLED: {spooled_path}")
+
+        # ── Thumbnail and events file, kept in memory for the dedup hash ──
+        events_body = json.dumps(interaction_events, indent=2).encode()
+        thumbnail: bytes | None = None
+        if final_video_path is not None and media is not None:
+            try:
+                thumbnail = await extract_thumbnail(final_video_path, min(1.0, media.duration / 2))
+            except (subprocess.TimeoutExpired, FileNotFoundError):
+                pass
+            if thumbnail is not None:
+                (output_dir / "thumbnail.jpg").write_bytes(thumbnail)
+        if convex_url:
+            artifacts = {"events": (events_body, MIME_TYPES[".json"])}
+            if thumbnail is not None:
+                artifacts["thumbnail"] = (thumbnail, MIME_TYPES[".jpg"])
+            upload_stats["artifacts"] = await upload_artifacts(convex_url, artifacts)
 
         # ── Write summary ──
         summary_path = output_dir / "summary.md"
@@ -505,14 +710,32 @@ async def run_tasks(
             f"---\n*Recorded with demo-recorder task_runner*\n"
         )
 
-        # ── Write events JSON ──
+        # ── Write events JSON + capture sync report ──
         events_path = output_dir / "events.json"
-        events_path.write_text(json.dumps(interaction_events, indent=2))
-        print(f"EVENTS_JSON: {json.dumps(interaction_events)}")
-
+        events_path.write_bytes(events_body)
+        (output_dir / "sync.json").write_text(json.dumps(capture_sync, indent=2))
+        media_dict = media.to_dict() if media is not None else {}
+        manifest = {
+            "video": final_video_path.name if final_video_path else None,
+            "media": media_dict,
+            "video_url": video_url,
+            "verdict": verdict,
+            "events": events_path.name,
+            "thumbnail": "thumbnail.jpg" if thumbnail is not None else None,
+            "sync": "sync.json",
+            "upload": upload_stats,
+            "timings": timings,
+        }
+        (output_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        if report:
+            print(f"EVENTS_JSON: {json.dumps(interaction_events)}")
+
+        if timings:
+            print("  Readiness waits: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
         print(f"✓ Recording complete → {output_dir}")
-        if video_url:
+        if report and video_url:
             print(f"VIDEO_URL: {video_url}")
+        run_ok = True
         return TasksResult(
             tasks=tasks,
             prompt=prompt,
@@ -522,6 +745,11 @@ async def run_tasks(
             verdict_reasoning=verdict_reasoning,
             video_url=video_url,
             interaction_events=interaction_events,
+            timings=timings,
+            capture_sync=capture_sync,
+            upload_stats=upload_stats,
+            video_path=final_video_path,
+            media=media_dict,
         )
 
     except Exception as exc:  # noqa: BLE001
@@ -532,11 +760,27 @@ async def run_tasks(
             output_path=output_dir,
             success=False,
             error=str(exc),
+            timings=timings,
         )
 
     finally:
         # Always clean up processes
-        if ffmpeg_proc:
-            stop_screen_recording(ffmpeg_proc)
-        if xvfb_proc:
-            stop_xvfb(xvfb_proc)
+        if upload_prefetch is not None:
+            upload_prefetch.cancel()
+        if drain_task is not None and not drain_task.done():
+            # Unfinished entries stay spooled for the next drain
+            drain_task.cancel()
+        if segment_uploader is not None:
+            await segment_uploader.close()
+        if recorder:
+            await recorder.stop()
+        if own_session is not None:
+            try:
+                await own_session.kill()
+            except Exception:  # noqa: BLE001 — already gone
+                pass
+        if leased is not None:
+            # A run that blew up may have left the browser in any state
+            await browser_pool.release(leased, healthy=run_ok)
+        elif virtual_display:
+            await stop_xvfb(virtual_display)
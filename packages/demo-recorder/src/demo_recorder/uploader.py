@@ -0,0 +1,540 @@
+"""
+uploader.py — pushes recordings to Convex blob storage.
+
+Uses the Convex HTTP API directly:
+    runs:generateUploadUrl (mutation) → POST body → runs:getStorageUrl (query)
+
+upload_video uploads one finished file. SegmentUploader uploads HLS
+segments while the recording is still running, so the end of the run only
+has to push the last segment and the playlist that ties them together.
+
+File bodies are streamed from disk in CHUNK_SIZE pieces with a known
+Content-Length, so memory stays flat no matter how large the video is.
+
+Transient failures (connection errors, 408/429/5xx) are retried with
+exponential backoff and full jitter. Convex storage takes each blob in one
+POST, so a retry restarts that blob — which is why HLS uploads resume at
+segment granularity: segments already stored are never sent again.
+
+All calls share one pooled client per event loop (convex_client()), which
+speaks HTTP/2 when the optional h2 package is installed. Signed upload URLs
+can be fetched ahead of time with UploadUrlPrefetch, so the end of a run
+only pays for the body transfer and the URL lookup.
+
+There is no metadata mutation to batch: the recorder stores blobs and
+reads back their URLs, nothing else. The run record is written by
+processing-queue from the CLI's result lines, and the URL lookup has to
+follow the POST because it needs the storageId the POST returns.
+
+Given a content hash, upload_blob first consults the ArtifactIndex and
+skips the transfer entirely if an identical blob is already stored and its
+URL still answers.
+"""
+
+import asyncio
+import hashlib
+import random
+import time
+import weakref
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+from .capture import Segment, build_playlist
+from .dedup import ARTIFACT_INDEX, ArtifactIndex
+
+MIME_TYPES = {
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".ts": "video/mp2t",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".json": "application/json",
+    ".jpg": "image/jpeg",
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+# on_progress(bytes_sent, bytes_total)
+ProgressCallback = Callable[[int, int], None]
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class UploadError(Exception):
+    """A Convex call answered with something other than 200."""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status in RETRYABLE_STATUS
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 5
+    base_sec: float = 0.5
+    max_sec: float = 10.0
+
+    def delay(self, attempt: int) -> float:
+        """Full-jitter backoff before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_sec, self.base_sec * 2 ** (attempt - 1)))
+
+
+DEFAULT_RETRY = RetryPolicy()
+
+
+# ── Pooled client ──────────────────────────────────────────────────────
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+HTTP2 = _http2_available()
+
+# httpx clients are bound to the loop that opened their connections
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def convex_client() -> httpx.AsyncClient:
+    """The long-lived, connection-pooled client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=60.0),
+            http2=HTTP2,
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_convex_client() -> None:
+    """Close this loop's pooled client; call before the loop shuts down."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+@dataclass
+class UploadResult:
+    storage_id: str
+    url: str | None       # viewable URL, if getStorageUrl returned one
+    bytes: int            # bytes sent (0 when deduplicated)
+    seconds: float        # body transfer time only
+    sha256: str | None = None
+    deduplicated: bool = False  # already stored; nothing was sent
+
+    @property
+    def throughput_mbps(self) -> float:
+        return self.bytes * 8 / 1_000_000 / self.seconds if self.seconds > 0 else 0.0
+
+    def stats(self) -> dict:
+        stats = {
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 3),
+            "throughput_mbps": round(self.throughput_mbps, 2),
+        }
+        if self.sha256:
+            stats["sha256"] = self.sha256
+            stats["dedup"] = "hit" if self.deduplicated else "miss"
+        return stats
+
+
+async def _read_chunks(path: Path, on_progress: ProgressCallback | None) -> AsyncIterator[bytes]:
+    total = path.stat().st_size
+    sent = 0
+    with path.open("rb") as f:
+        while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+            sent += len(chunk)
+            yield chunk
+            if on_progress is not None:
+                on_progress(sent, total)
+
+
+async def _still_stored(client: httpx.AsyncClient, url: str | None) -> bool:
+    """Whether a dedup hit's URL still serves the blob. Unknown (no URL, network error) counts as yes."""
+    if not url:
+        return True  # nothing to check; MAX_AGE_SEC bounds how long it is trusted
+    try:
+        response = await client.head(url, follow_redirects=True)
+    except httpx.TransportError:
+        return True  # the upload would not get through either
+    if response.status_code in (405, 501):
+        return True  # the store does not answer HEAD
+    return response.status_code < 400
+
+
+# ── Convex HTTP API ────────────────────────────────────────────────────
+
+def _check(res: httpx.Response, what: str) -> None:
+    if res.status_code != 200:
+        raise UploadError(f"{what} failed: HTTP {res.status_code}", res.status_code)
+
+
+async def generate_upload_url(client: httpx.AsyncClient, convex_url: str) -> str:
+    res = await client.post(
+        f"{convex_url}/api/mutation",
+        json={"path": "runs:generateUploadUrl", "args": {}, "format": "json"},
+    )
+    _check(res, "generateUploadUrl")
+    upload_url = res.json().get("value")
+    if not upload_url:
+        raise UploadError("No upload URL returned")
+    return upload_url
+
+
+async def post_blob(
+    client: httpx.AsyncClient,
+    upload_url: str,
+    body: bytes | Path,
+    content_type: str,
+    on_progress: ProgressCallback | None = None,
+) -> str:
+    """
+    POST a body to a signed upload URL and return its storageId.
+
+    A Path body is streamed from disk rather than read into memory.
+    """
+    headers = {"Content-Type": content_type}
+    if isinstance(body, Path):
+        headers["Content-Length"] = str(body.stat().st_size)
+        content = _read_chunks(body, on_progress)
+    else:
+        content = body
+    res = await client.post(upload_url, content=content, headers=headers)
+    _check(res, "Upload")
+    storage_id = res.json().get("storageId")
+    if not storage_id:
+        raise UploadError("No storageId returned")
+    return storage_id
+
+
+async def get_storage_url(client: httpx.AsyncClient, convex_url: str, storage_id: str) -> str | None:
+    res = await client.post(
+        f"{convex_url}/api/query",
+        json={
+            "path": "runs:getStorageUrl",
+            "args": {"storageId": storage_id},
+            "format": "json",
+        },
+    )
+    _check(res, "getStorageUrl")
+    return res.json().get("value")
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()  # take() still sees it; this only marks it as retrieved
+
+
+class UploadUrlPrefetch:
+    """
+    Fetches a signed upload URL in the background, ahead of the upload.
+
+    Start it when a run begins; by the time the video is ready, the URL is
+    already there and the upload starts directly with the POST. A URL that
+    failed to arrive or has aged past max_age_sec is simply not used.
+    """
+
+    max_age_sec = 30 * 60  # well inside Convex's one-hour URL lifetime
+
+    def __init__(self, convex_url: str):
+        self.convex_url = convex_url
+        self._fetched_at = 0.0
+        self._task = asyncio.create_task(self._fetch())
+        # A run that ends without take() must not log "exception never retrieved"
+        self._task.add_done_callback(_retrieve_exception)
+
+    async def _fetch(self) -> str:
+        url = await generate_upload_url(convex_client(), self.convex_url)
+        self._fetched_at = time.monotonic()
+        return url
+
+    async def take(self) -> str | None:
+        """The prefetched URL (at most once), or None to fetch a fresh one."""
+        task, self._task = self._task, None
+        if task is None:
+            return None
+        try:
+            url = await task
+        except (UploadError, httpx.HTTPError) as exc:
+            print(f"  ⚠️ Upload URL prefetch failed: {exc}")
+            return None
+        if time.monotonic() - self._fetched_at > self.max_age_sec:
+            return None
+        return url
+
+    def cancel(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+
+
+async def _upload_once(
+    client: httpx.AsyncClient,
+    convex_url: str,
+    body: bytes | Path,
+    content_type: str,
+    on_progress: ProgressCallback | None,
+    upload_url: str | None = None,
+) -> UploadResult:
+    # Signed upload URLs are single-use, so every attempt needs its own
+    if upload_url is None:
+        upload_url = await generate_upload_url(client, convex_url)
+    size = body.stat().st_size if isinstance(body, Path) else len(body)
+    started = time.monotonic()
+    storage_id = await post_blob(client, upload_url, body, content_type, on_progress)
+    seconds = time.monotonic() - started
+    try:
+        url = await get_storage_url(client, convex_url, storage_id)
+    except (UploadError, httpx.TransportError):
+        url = None  # the blob is stored; callers fall back to its storageId
+    return UploadResult(storage_id=storage_id, url=url, bytes=size, seconds=seconds)
+
+
+async def upload_blob(
+    client: httpx.AsyncClient,
+    convex_url: str,
+    body: bytes | Path,
+    content_type: str,
+    on_progress: ProgressCallback | None = None,
+    retry: RetryPolicy = DEFAULT_RETRY,
+    upload_url: str | None = None,
+    sha256: str | None = None,
+    index: ArtifactIndex | None = ARTIFACT_INDEX,
+) -> UploadResult | None:
+    """
+    Upload one blob (bytes, or a file streamed from disk), retrying
+    transient failures. Returns None once the retries are used up.
+
+    upload_url, if given (e.g. from UploadUrlPrefetch), is used for the
+    first attempt; retries ask for fresh ones.
+
+    With a content hash (computed here for bytes bodies; files are never
+    re-read for it), a blob already in `index` is not uploaded again — as
+    long as its URL still answers a HEAD. One that is gone is evicted.
+    """
+    if sha256 is None and isinstance(body, bytes):
+        sha256 = hashlib.sha256(body).hexdigest()
+    if sha256 is not None and index is not None:
+        hit = await asyncio.to_thread(index.lookup, convex_url, sha256)
+        if hit is not None:
+            storage_id, url = hit
+            if await _still_stored(client, url):
+                return UploadResult(storage_id, url, bytes=0, seconds=0.0, sha256=sha256, deduplicated=True)
+            print(f"  ⚠️ Indexed blob {storage_id} is gone from storage; uploading again")
+            await asyncio.to_thread(index.evict, convex_url, sha256)
+
+    for attempt in range(1, retry.attempts + 1):
+        try:
+            url, upload_url = upload_url, None
+            uploaded = await _upload_once(client, convex_url, body, content_type, on_progress, url)
+            uploaded.sha256 = sha256
+            if sha256 is not None and index is not None:
+                await asyncio.to_thread(
+                    index.record, convex_url, sha256, uploaded.storage_id, uploaded.url, uploaded.bytes,
+                )
+            return uploaded
+        except (UploadError, httpx.TransportError) as exc:
+            # A prefetched URL may have expired; a fresh one deserves a try
+            retryable = not isinstance(exc, UploadError) or exc.retryable or url is not None
+            if not retryable or attempt == retry.attempts:
+                print(f"  ⚠️ Upload failed after {attempt} attempt(s): {exc}")
+                return None
+            delay = retry.delay(attempt)
+            print(f"  ⚠️ {exc or type(exc).__name__} — retrying in {delay:.1f}s ({attempt}/{retry.attempts})")
+            await asyncio.sleep(delay)
+    return None
+
+
+# ── Whole-file upload ──────────────────────────────────────────────────
+
+def print_progress(step: float = 0.25) -> ProgressCallback:
+    """Progress callback that prints every `step` fraction of the upload."""
+    next_mark = step
+
+    def report(sent: int, total: int) -> None:
+        nonlocal next_mark
+        if total and sent / total >= next_mark:
+            print(f"  ↑ {sent / total:.0%} ({sent / 1024 / 1024:.1f}/{total / 1024 / 1024:.1f} MB)")
+            while next_mark <= sent / total:
+                next_mark += step
+
+    return report
+
+
+async def upload_video(
+    convex_url: str,
+    video_path: Path,
+    on_progress: ProgressCallback | None = None,
+    retry: RetryPolicy = DEFAULT_RETRY,
+    prefetch: UploadUrlPrefetch | None = None,
+    sha256: str | None = None,
+) -> UploadResult | None:
+    """
+    Upload video to Convex blob storage, streaming it from disk.
+
+    1. Call runs:generateUploadUrl to get a signed upload URL
+       (skipped when `prefetch` already has one)
+    2. POST the video file to that URL
+    3. Get back storageId
+    4. Call runs:getStorageUrl to get the viewable URL
+
+    Pass the file's sha256 to skip the upload when it is already stored.
+    """
+    content_type = MIME_TYPES.get(video_path.suffix.lower(), "application/octet-stream")
+    upload_url = await prefetch.take() if prefetch is not None else None
+    uploaded = await upload_blob(
+        convex_client(), convex_url, video_path, content_type, on_progress, retry, upload_url,
+        sha256=sha256,
+    )
+    if uploaded is not None and uploaded.deduplicated:
+        print(f"  ✅ Already in Convex storage (sha256 {uploaded.sha256[:12]}), upload skipped")
+    elif uploaded is not None:
+        print(
+            f"  ✅ Uploaded to Convex: {uploaded.bytes / 1024:.1f} KB in "
+            f"{uploaded.seconds:.2f}s ({uploaded.throughput_mbps:.1f} Mbit/s)"
+        )
+    return uploaded
+
+
+async def upload_artifacts(convex_url: str, artifacts: dict[str, tuple[bytes, str]]) -> dict[str, dict]:
+    """
+    Upload small in-memory artifacts, name → (body, content type), e.g. the
+    events file and the thumbnail. Each is hashed from memory and skipped
+    when already stored. Returns name → upload stats plus "url" for the
+    ones that made it; a failed artifact is reported and left out.
+    """
+    stats: dict[str, dict] = {}
+    for name, (body, content_type) in artifacts.items():
+        uploaded = await upload_blob(convex_client(), convex_url, body, content_type)
+        if uploaded is not None:
+            stats[name] = {**uploaded.stats(), "url": uploaded.url or f"convex:storage:{uploaded.storage_id}"}
+    if stats:
+        print("  ✅ Artifacts in Convex: " + ", ".join(f"{name} ({s['dedup']})" for name, s in stats.items()))
+    return stats
+
+
+# ── Streaming segment upload ───────────────────────────────────────────
+
+class SegmentUploader:
+    """
+    Uploads finished HLS segments while the recording is still running.
+
+    list_segments is ScreenRecorder.completed_segments during a run, or
+    read_segments() over a segments/ directory when draining the spool.
+    start() polls it in the background and uploads each new segment once.
+    finish() (after the recorder has stopped) uploads whatever is left,
+    then commits an m3u8 playlist pointing at the stored segments and
+    returns the playlist's URL. Pass `uploaded` to resume a previous
+    attempt without re-sending its segments.
+    """
+
+    max_parallel = 4  # segments in flight at once when catching up
+
+    def __init__(
+        self,
+        convex_url: str,
+        list_segments: Callable[[], list[Segment]],
+        poll_sec: float = 1.0,
+        uploaded: dict[Path, str] | None = None,
+    ):
+        self.convex_url = convex_url
+        self.list_segments = list_segments
+        self.poll_sec = poll_sec
+        self.uploaded: dict[Path, str] = dict(uploaded or {})  # segment path → viewable URL
+        self.bytes_uploaded = 0
+        self.upload_seconds = 0.0
+        self.uploaded_during_run = 0
+        self._client = convex_client()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self._upload_pending()
+            except httpx.HTTPError as exc:
+                # Left for the next poll (or finish) to pick up again
+                print(f"  ⚠️ Segment upload error: {exc}")
+            self.uploaded_during_run = len(self.uploaded)
+            await asyncio.sleep(self.poll_sec)
+
+    async def _upload_segment(self, seg: Segment, limit: asyncio.Semaphore) -> None:
+        async with limit:
+            uploaded = await upload_blob(self._client, self.convex_url, seg.path, MIME_TYPES[".ts"])
+        if uploaded is None or uploaded.url is None:
+            # Other segments still go up; the playlist waits for this one
+            print(f"  ⚠️ Segment upload failed: {seg.path.name}")
+            return
+        self.uploaded[seg.path] = uploaded.url
+        self.bytes_uploaded += uploaded.bytes
+        self.upload_seconds += uploaded.seconds
+
+    async def _upload_pending(self) -> list[Segment]:
+        segments = self.list_segments()
+        limit = asyncio.Semaphore(self.max_parallel)
+        await asyncio.gather(*(
+            self._upload_segment(seg, limit) for seg in segments if seg.path not in self.uploaded
+        ))
+        return segments
+
+    async def _stop_polling(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def close(self) -> None:
+        """Abandon the upload (e.g. the run failed) without committing a playlist."""
+        await self._stop_polling()
+
+    async def finish(self, prefetch: UploadUrlPrefetch | None = None) -> str | None:
+        """Upload the remaining segments and the playlist; returns its URL."""
+        await self._stop_polling()
+        segments = await self._upload_pending()
+        if not segments or any(seg.path not in self.uploaded for seg in segments):
+            print("  ⚠️ Not every segment was uploaded, skipping playlist")
+            return None
+        playlist = build_playlist([
+            (self.uploaded[seg.path], seg.duration, seg.span) for seg in segments
+        ])
+        upload_url = await prefetch.take() if prefetch is not None else None
+        uploaded = await upload_blob(
+            self._client, self.convex_url, playlist.encode(), MIME_TYPES[".m3u8"],
+            upload_url=upload_url,
+        )
+        if uploaded is None:
+            return None
+        print(
+            f"  ✅ Uploaded {len(segments)} segment(s) to Convex "
+            f"({self.uploaded_during_run} during the run, {self.bytes_uploaded / 1024:.1f} KB)"
+        )
+        return uploaded.url or f"convex:storage:{uploaded.storage_id}"
+
+    def stats(self) -> dict:
+        seconds = self.upload_seconds
+        return {
+            "bytes": self.bytes_uploaded,
+            "seconds": round(seconds, 3),
+            "throughput_mbps": round(self.bytes_uploaded * 8 / 1_000_000 / seconds, 2) if seconds else 0.0,
+            "segments": len(self.uploaded),
+            "segments_during_run": self.uploaded_during_run,
+        }
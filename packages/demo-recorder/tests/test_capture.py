@@ -0,0 +1,83 @@
+"""MediaTimeline (monotonic instants onto media time) and HLS playlists."""
+
+import pytest
+
+from demo_recorder.capture import CaptureSpan, MediaTimeline, build_playlist
+
+# 2 s recorded from t=100, paused until t=110, then recording again
+PAUSED = MediaTimeline(
+    spans=[CaptureSpan(100.0, 0.0, 2.0), CaptureSpan(110.0, 2.0)],
+    wall_offset=1000.0,
+    fps=25,
+)
+
+
+@pytest.mark.parametrize(
+    ("mono", "media_ms"),
+    [
+        (99.0, 0),          # before the first frame
+        (100.0, 0),
+        (100.013, 0),       # snapped to the nearest frame (40 ms)
+        (100.021, 40),
+        (100.52, 520),
+        (101.99, 2000),
+        (103.0, 2000),      # paused: the first frame after the gap
+        (109.99, 2000),
+        (110.0, 2000),
+        (111.0, 3000),
+        (170.0, 62000),     # the running span has no end
+    ],
+)
+def test_media_ms_maps_pauses_to_the_next_span(mono, media_ms):
+    assert PAUSED.media_ms(mono) == media_ms
+
+
+@pytest.mark.parametrize(("wall", "media_ms"), [(1100.52, 520), (1105.0, 2000), (1111.0, 3000)])
+def test_media_ms_from_wall(wall, media_ms):
+    assert PAUSED.media_ms_from_wall(wall) == media_ms
+
+
+def test_one_uninterrupted_span():
+    timeline = MediaTimeline.starting_at(50.0, wall_offset=0.0, fps=30)
+    assert timeline.origin_mono == 50.0
+    assert [timeline.media_ms(t) for t in (49.0, 50.0, 51.0, 60.0)] == [0, 0, 1000, 10000]
+
+
+# ── HLS playlist ───────────────────────────────────────────────────────
+
+HEADER = ["#EXTM3U", "#EXT-X-VERSION:3"]
+
+
+@pytest.mark.parametrize(
+    ("entries", "ended", "body"),
+    [
+        (
+            [("a.ts", 4.0, 0), ("b.ts", 2.5, 0)],
+            True,
+            ["#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD",
+             "#EXTINF:4.000000,", "a.ts", "#EXTINF:2.500000,", "b.ts", "#EXT-X-ENDLIST"],
+        ),
+        (
+            # A new span after a pause is a discontinuity; 4.2 s rounds the target up
+            [("a.ts", 4.0, 0), ("b.ts", 4.2, 1), ("c.ts", 1.0, 1)],
+            True,
+            ["#EXT-X-TARGETDURATION:5", "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD",
+             "#EXTINF:4.000000,", "a.ts", "#EXT-X-DISCONTINUITY",
+             "#EXTINF:4.200000,", "b.ts", "#EXTINF:1.000000,", "c.ts", "#EXT-X-ENDLIST"],
+        ),
+        (
+            # Still recording: no VOD type and no end
+            [("a.ts", 2.0, 0)],
+            False,
+            ["#EXT-X-TARGETDURATION:2", "#EXT-X-MEDIA-SEQUENCE:0", "#EXTINF:2.000000,", "a.ts"],
+        ),
+        (
+            [],
+            True,
+            ["#EXT-X-TARGETDURATION:1", "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD",
+             "#EXT-X-ENDLIST"],
+        ),
+    ],
+)
+def test_build_playlist(entries, ended, body):
+    assert build_playlist(entries, ended=ended) == "\n".join(HEADER + body) + "\n"
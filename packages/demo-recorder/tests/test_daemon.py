@@ -0,0 +1,51 @@
+"""forwarded_env / job_overlay: which of the caller's variables a daemon job runs with."""
+
+import pytest
+
+from demo_recorder.daemon import forwarded_env, job_overlay
+
+
+@pytest.mark.parametrize(
+    ("environ", "dotenv", "expected"),
+    [
+        # Only our settings, Convex and API keys leave the caller
+        (
+            {"PATH": "/bin", "HOME": "/root", "OPENAI_API_KEY": "k", "CONVEX_URL": "c",
+             "DEMO_RECORDER_SPOOL": "s"},
+            None,
+            {"OPENAI_API_KEY": "k", "CONVEX_URL": "c", "DEMO_RECORDER_SPOOL": "s"},
+        ),
+        # Every .env value goes, whatever its name; os.environ wins over it
+        (
+            {"PATH": "/bin", "MODEL": "from-env"},
+            {"MODEL": "from-dotenv", "BASE_URL": "http://x"},
+            {"MODEL": "from-env", "BASE_URL": "http://x"},
+        ),
+        # The socket only matters to the client
+        ({"DEMO_RECORDER_SOCKET": "/tmp/d.sock"}, {"DEMO_RECORDER_SOCKET": "/tmp/e.sock"}, {}),
+        ({}, None, {}),
+    ],
+)
+def test_forwarded_env(environ, dotenv, expected):
+    assert forwarded_env(environ, dotenv) == expected
+
+
+@pytest.mark.parametrize(
+    ("env", "expected"),
+    [
+        # The caller's value replaces the daemon's
+        ({"OPENAI_API_KEY": "caller"}, {"OPENAI_API_KEY": "caller"}),
+        # A key the caller does not have is unset, not inherited
+        ({}, {"OPENAI_API_KEY": None}),
+        # .env variables outside the forwarded set are added
+        ({"MODEL": "m"}, {"OPENAI_API_KEY": None, "MODEL": "m"}),
+        # DEMO_RECORDER_* is fixed at daemon start and the socket is client-only
+        (
+            {"DEMO_RECORDER_SPOOL": "other", "DEMO_RECORDER_SOCKET": "/tmp/d.sock"},
+            {"OPENAI_API_KEY": None},
+        ),
+    ],
+)
+def test_job_overlay(env, expected):
+    base = {"PATH": "/bin", "OPENAI_API_KEY": "daemon", "DEMO_RECORDER_SPOOL": "s"}
+    assert job_overlay(base, env) == expected
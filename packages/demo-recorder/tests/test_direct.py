@@ -0,0 +1,159 @@
+"""Task grammar compilation and the direct runner, against a fake CDP session."""
+
+import asyncio
+from types import SimpleNamespace
+
+from demo_recorder.direct import DirectDriver, DirectStep, compile_task
+
+
+def steps(description: str) -> list[tuple[str, str, str | None]] | None:
+    compiled = compile_task(description)
+    return None if compiled is None else [(s.kind, s.target, s.text) for s in compiled]
+
+
+# ── compile_task ───────────────────────────────────────────────────────
+
+def test_readme_example():
+    assert steps(
+        "Navigate to /login. Type admin into id=username. Type secret into id=password. "
+        "Click id=submit. Confirm id=success-banner is visible."
+    ) == [
+        ("navigate", "/login", None),
+        ("type", "username", "admin"),
+        ("type", "password", "secret"),
+        ("click", "submit", None),
+        ("visible", "success-banner", None),
+    ]
+
+
+def test_full_url_keeps_its_dots():
+    assert steps("Navigate to https://example.com/a.html. Click id=go") == [
+        ("navigate", "https://example.com/a.html", None),
+        ("click", "go", None),
+    ]
+
+
+def test_quoted_text_may_contain_full_stops():
+    assert steps('Type "a. b@example.com" into id=email. Confirm id=msg contains "Saved. Done."') == [
+        ("type", "email", "a. b@example.com"),
+        ("contains", "msg", "Saved. Done."),
+    ]
+
+
+def test_free_text_with_commas_runs_to_the_end_of_the_sentence():
+    assert steps("Confirm id=msg contains Hello, world, again. Click id=next.") == [
+        ("contains", "msg", "Hello, world, again"),
+        ("click", "next", None),
+    ]
+
+
+def test_free_text_without_trailing_full_stop():
+    assert steps("Confirm id=msg contains Welcome back") == [("contains", "msg", "Welcome back")]
+
+
+def test_missing_space_after_full_stop_still_splits_sentences():
+    assert steps("Confirm id=status contains Saved.Click id=x") == [
+        ("contains", "status", "Saved"),
+        ("click", "x", None),
+    ]
+    assert steps("Click id=a.Confirm id=b is visible.") == [
+        ("click", "a", None),
+        ("visible", "b", None),
+    ]
+
+
+def test_sentence_outside_the_grammar_rejects_the_task():
+    assert steps("Navigate to https://example.com. Confirm page loads.") is None
+    assert steps("Type Anthropic Claude AI into the search box.") is None
+    assert steps("Click id=submit and wait for the dashboard.") is None
+
+
+def test_empty_description():
+    assert steps("") is None
+    assert steps("   ") is None
+
+
+# ── DirectDriver.run ───────────────────────────────────────────────────
+
+class FakePage:
+    """Answers the CDP calls DirectDriver makes from a dict of elements by id."""
+
+    def __init__(self, elements: dict[str, dict]):
+        self.elements = elements
+        self.calls: list[tuple[str, dict]] = []
+        self.send = SimpleNamespace(
+            Runtime=SimpleNamespace(evaluate=self._evaluate),
+            Page=SimpleNamespace(navigate=self._record("navigate", {})),
+            Input=SimpleNamespace(
+                dispatchMouseEvent=self._record("mouse", None),
+                insertText=self._record("insertText", None),
+            ),
+        )
+
+    def _record(self, name: str, reply):
+        async def call(params: dict, session_id: str):
+            self.calls.append((name, params))
+            return reply
+        return call
+
+    async def _evaluate(self, params: dict, session_id: str) -> dict:
+        expression = params["expression"]
+        if expression == "document.readyState":
+            return {"result": {"value": "complete"}}
+        for element_id, info in self.elements.items():
+            if f'getElementById("{element_id}")' in expression:
+                return {"result": {"value": info}}
+        return {"result": {"value": None}}
+
+    async def get_or_create_cdp_session(self, focus: bool = True):
+        return SimpleNamespace(cdp_client=self, session_id="tab")
+
+
+def run(page: FakePage, description: str):
+    driver = DirectDriver(page, "http://localhost:3000/", selector_timeout=0.05, action_delay=0)
+    actions: list[str] = []
+
+    async def before() -> None:
+        actions.append("start")
+
+    return asyncio.run(driver.run(compile_task(description), before, lambda: actions.append("end"))), actions
+
+
+def element(text: str = "", visible: bool = True) -> dict:
+    return {"x": 100.0, "y": 40.0, "visible": visible, "text": text}
+
+
+def test_run_passes_and_records_events():
+    page = FakePage({"username": element(), "submit": element(), "banner": element("Welcome back")})
+    result, actions = run(
+        page, "Navigate to /login. Type admin into id=username. Click id=submit. Confirm id=banner contains Welcome."
+    )
+    assert result.passed and result.fallback is None
+    assert actions == ["start", "end"] * 4
+    assert ("navigate", {"url": "http://localhost:3000/login"}) in page.calls
+    assert ("insertText", {"text": "admin"}) in page.calls
+    assert [e["note"] for _, e in result.events] == ["type: admin", "click id=submit"]
+    assert all((e["x"], e["y"]) == (100, 40) for _, e in result.events)
+
+
+def test_failed_confirm_is_a_verdict_not_a_fallback():
+    result, _ = run(FakePage({"banner": element("Error")}), "Confirm id=banner contains Saved.")
+    assert not result.passed and result.fallback is None
+    assert "it reads 'Error'" in result.reasoning
+
+    result, _ = run(FakePage({"banner": element(visible=False)}), "Confirm id=banner is visible.")
+    assert not result.passed and result.fallback is None
+
+
+def test_missing_element_falls_back_to_the_agent():
+    page = FakePage({})
+    result, actions = run(page, "Click id=missing. Click id=other.")
+    assert not result.passed
+    assert result.fallback.startswith("Click id=missing: id=missing was not found")
+    assert actions == ["start", "end"]   # stopped at the first missing element
+    assert not [c for c in page.calls if c[0] == "mouse"]
+
+
+def test_describe_round_trips_through_the_grammar():
+    step = DirectStep("contains", "msg", "Hello, world")
+    assert step.describe() == "Confirm id=msg contains 'Hello, world'"
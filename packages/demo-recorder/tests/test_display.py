@@ -0,0 +1,59 @@
+"""wait_for_x_socket against a fake X socket and lock file."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from demo_recorder import display
+from demo_recorder.display import wait_for_x_socket
+
+NUMBER = 42
+
+
+@pytest.fixture(autouse=True)
+def x_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(display, "X11_SOCKET_DIR", tmp_path / ".X11-unix")
+    monkeypatch.setattr(display, "X_LOCK_DIR", tmp_path)
+    (tmp_path / ".X11-unix").mkdir()
+    return tmp_path
+
+
+def wait(proc, lock_pid: int | None, timeout: float = 1.0) -> float:
+    """Serve a socket for :NUMBER (and a lock naming lock_pid) while waiting."""
+    async def main():
+        if lock_pid is not None:
+            display._lock_path(NUMBER).write_text(f"{lock_pid:>10}\n")
+        server = await asyncio.start_unix_server(
+            lambda reader, writer: writer.close(), str(display.X11_SOCKET_DIR / f"X{NUMBER}"),
+        )
+        async with server:
+            return await wait_for_x_socket(NUMBER, proc, timeout)
+
+    return asyncio.run(main())
+
+
+def test_our_server_is_ready():
+    assert wait(SimpleNamespace(pid=1234, returncode=None), lock_pid=1234) < 1.0
+
+
+def test_no_lock_file_trusts_the_socket():
+    assert wait(SimpleNamespace(pid=1234, returncode=None), lock_pid=None) < 1.0
+
+
+def test_another_servers_socket_is_not_ours():
+    with pytest.raises(RuntimeError, match="not our Xvfb"):
+        wait(SimpleNamespace(pid=1234, returncode=None), lock_pid=999)
+
+
+def test_our_server_exited():
+    with pytest.raises(RuntimeError, match="exited with code 1"):
+        wait(SimpleNamespace(pid=1234, returncode=1), lock_pid=1234)
+
+
+def test_nothing_listening_times_out():
+    async def main():
+        return await wait_for_x_socket(NUMBER, SimpleNamespace(pid=1234, returncode=None), timeout=0.1)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(main())
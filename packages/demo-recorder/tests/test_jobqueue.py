@@ -0,0 +1,185 @@
+"""JobQueue lease / retry / priority state machine on a throwaway sqlite file."""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from demo_recorder import jobqueue
+from demo_recorder.jobqueue import JobQueue, Worker, job_env
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, sec: float) -> None:
+        self.now += sec
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(jobqueue, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock) -> JobQueue:
+    return JobQueue(tmp_path / "jobs.db", lease_sec=60, retry_base_sec=30, retry_max_sec=100)
+
+
+def payload(name: str) -> dict:
+    return {"argv": ["--tasks", "[]", name], "cwd": "/tmp"}
+
+
+def test_dequeue_takes_the_most_urgent_job_first(queue, clock):
+    nightly = queue.enqueue(payload("nightly"), "nightly")
+    default = queue.enqueue(payload("default"))
+    pr_first = queue.enqueue(payload("pr-1"), "pr")
+    pr_second = queue.enqueue(payload("pr-2"), "pr")
+    order = [queue.dequeue("w").id for _ in range(4)]
+    assert order == [pr_first, pr_second, default, nightly]
+    assert queue.dequeue("w") is None
+
+
+def test_dequeue_leases_the_job(queue, clock):
+    job_id = queue.enqueue(payload("a"), max_attempts=2)
+    job = queue.dequeue("w1")
+    assert (job.id, job.attempts, job.max_attempts, job.payload) == (job_id, 1, 2, payload("a"))
+    row = queue.get(job_id)
+    assert row["state"] == "leased" and row["leased_by"] == "w1"
+    assert row["lease_expires"] == clock.now + 60
+    assert queue.dequeue("w2") is None   # leased jobs are not handed out twice
+
+
+def test_fail_backs_off_exponentially_then_gives_up(queue, clock):
+    job_id = queue.enqueue(payload("a"), max_attempts=4)
+
+    delays = []
+    for attempt in range(1, 4):
+        job = queue.dequeue("w")
+        assert job.attempts == attempt
+        assert queue.fail(job, "w", f"boom {attempt}") is True
+        delay = queue.get(job_id)["available_at"] - clock.now
+        delays.append(delay)
+        clock.advance(delay - 1)
+        assert queue.dequeue("w") is None   # still backing off
+        clock.advance(1)
+    assert delays == [30, 60, 100]          # 30 * 2^n, capped at retry_max_sec
+
+    job = queue.dequeue("w")
+    assert queue.fail(job, "w", "final", {"VERDICT": "fail"}) is False
+    row = queue.get(job_id)
+    assert (row["state"], row["attempts"], row["last_error"]) == ("failed", 4, "final")
+    assert row["result"] == {"VERDICT": "fail"}
+    assert row["finished_at"] == clock.now
+
+
+def test_expired_lease_goes_back_to_the_queue(queue, clock):
+    job_id = queue.enqueue(payload("a"))
+    queue.dequeue("w1")
+    clock.advance(61)
+    second = queue.dequeue("w2")
+    assert second.id == job_id and second.attempts == 2
+    assert queue.get(job_id)["last_error"] == "lease expired"
+
+
+def test_lost_heartbeat_cannot_touch_the_job(queue, clock):
+    job_id = queue.enqueue(payload("a"))
+    stale = queue.dequeue("w1")
+    clock.advance(61)
+    queue.dequeue("w2")
+
+    assert queue.heartbeat(stale, "w1") is False
+    queue.complete(stale, "w1", {"VERDICT": "pass"})
+    assert queue.fail(stale, "w1", "late") is False
+    row = queue.get(job_id)
+    assert (row["state"], row["leased_by"], row["result"]) == ("leased", "w2", None)
+
+
+def test_heartbeat_extends_the_lease(queue, clock):
+    queue.enqueue(payload("a"))
+    job = queue.dequeue("w1")
+    clock.advance(50)
+    assert queue.heartbeat(job, "w1") is True
+    clock.advance(50)                         # past the original lease
+    assert queue.dequeue("w2") is None
+    clock.advance(11)
+    assert queue.dequeue("w2").id == job.id
+
+
+def test_expired_lease_at_max_attempts_fails_the_job(queue, clock):
+    job_id = queue.enqueue(payload("a"), max_attempts=1)
+    queue.dequeue("w1")
+    clock.advance(61)
+    assert queue.dequeue("w2") is None
+    row = queue.get(job_id)
+    assert (row["state"], row["last_error"], row["leased_by"]) == ("failed", "lease expired", None)
+    assert row["finished_at"] == clock.now
+
+
+def test_complete_and_metrics(queue, clock):
+    done_id = queue.enqueue(payload("a"), "pr")
+    queue.enqueue(payload("b"), "nightly")
+    queue.enqueue(payload("c"), 7)
+    clock.advance(5)
+    job = queue.dequeue("w")
+    queue.complete(job, "w", {"VERDICT": "pass"})
+    assert queue.get(done_id)["state"] == "done"
+    assert queue.get(done_id)["result"] == {"VERDICT": "pass"}
+
+    metrics = queue.metrics()
+    assert metrics["depth"] == {"queued": 2, "leased": 0, "done": 1, "failed": 0}
+    assert metrics["queued_by_priority"] == {"7": 1, "nightly": 1}
+    assert metrics["oldest_queued_sec"] == 5.0
+    assert metrics["wait_sec"]["samples"] == 1 and metrics["wait_sec"]["p50"] == 5.0
+
+
+def test_unknown_priority_is_rejected(queue):
+    with pytest.raises(ValueError, match="Unknown priority 'urgent'"):
+        queue.enqueue(payload("a"), "urgent")
+
+
+# ── Worker ─────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize(
+    ("job", "expected"),
+    [
+        (None, {"PATH": "/bin", "OPENAI_API_KEY": "worker", "DEMO_RECORDER_QUEUE": "w.db"}),
+        ({"OPENAI_API_KEY": "job"}, {"PATH": "/bin", "OPENAI_API_KEY": "job", "DEMO_RECORDER_QUEUE": "w.db"}),
+        ({}, {"PATH": "/bin", "DEMO_RECORDER_QUEUE": "w.db"}),    # the enqueuer had no key
+        ({"CONVEX_URL": "c", "DEMO_RECORDER_QUEUE": "j.db"},     # DEMO_RECORDER_* stays the worker's
+         {"PATH": "/bin", "CONVEX_URL": "c", "DEMO_RECORDER_QUEUE": "w.db"}),
+    ],
+)
+def test_job_env_lays_the_enqueued_env_over_the_workers(job, expected):
+    worker = {"PATH": "/bin", "OPENAI_API_KEY": "worker", "DEMO_RECORDER_QUEUE": "w.db"}
+    assert job_env(worker, job) == expected
+
+
+def test_run_job_keeps_result_lines_and_uses_the_job_env(queue, clock, tmp_path, monkeypatch):
+    # Stands in for `python -m demo_recorder.cli`: prints what the CLI would
+    script = tmp_path / "record-demo"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import os\n"
+        "print('VERDICT: pass')\n"
+        "print('VIDEO_META: {not json')\n"
+        "print('VIDEO_URL: ' + os.environ.get('CONVEX_URL', 'unset'))\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setattr(jobqueue, "sys", SimpleNamespace(executable=str(script)))
+    monkeypatch.delenv("CONVEX_URL", raising=False)
+
+    job_id = queue.enqueue({**payload("a"), "cwd": str(tmp_path), "env": {"CONVEX_URL": "https://job"}})
+    asyncio.run(Worker(queue, name="w").run_job(queue.dequeue("w")))
+    row = queue.get(job_id)
+    assert row["state"] == "done"
+    assert row["result"] == {
+        "verdict": "pass", "video_meta": "{not json", "video_url": "https://job", "exit_code": 0,
+    }
@@ -0,0 +1,48 @@
+"""parse_probe: MediaInfo from ffprobe's JSON for the containers we record."""
+
+from pathlib import Path
+
+import pytest
+
+from demo_recorder.media import parse_probe
+
+VIDEO = Path("recording.mp4")
+
+
+def probe(fmt: dict | None = None, stream: dict | None = None) -> dict:
+    fmt = {"duration": "12.5", "size": "1000", "format_name": "mov,mp4", "bit_rate": "640", **(fmt or {})}
+    stream = {"codec_name": "h264", "width": 1920, "height": 1080, "nb_frames": "300",
+              "avg_frame_rate": "25/1", **(stream or {})}
+    return {"format": fmt, "streams": [stream]}
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        (probe(), {"duration": 12.5, "size_bytes": 1000, "frames": 300, "avg_fps": 25.0, "bitrate": 640}),
+        # webm/mkv have no nb_frames: the packet count stands in
+        (probe(stream={"nb_frames": None, "nb_read_packets": "287"}), {"frames": 287}),
+        (probe(stream={"nb_frames": "N/A"}), {"frames": None}),
+        (probe(stream={"avg_frame_rate": "30000/1001"}), {"avg_fps": 30000 / 1001}),
+        (probe(stream={"avg_frame_rate": "0/0"}), {"avg_fps": None}),   # unknown
+        (probe(fmt={"bit_rate": "N/A"}), {"bitrate": None}),
+        ({"format": {"duration": "3.0", "size": "10"}}, {"codec": None, "width": None, "frames": None}),
+    ],
+)
+def test_parse_probe(data, expected):
+    info = parse_probe(VIDEO, data)
+    assert {key: getattr(info, key) for key in expected} == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [{}, {"format": {}}, {"format": {"duration": "N/A"}}, {"format": {"duration": None}}],
+)
+def test_no_duration_is_not_a_video(data):
+    assert parse_probe(VIDEO, data) is None
+
+
+def test_size_falls_back_to_the_file(tmp_path):
+    path = tmp_path / "recording.webm"
+    path.write_bytes(b"\x1a" * 123)
+    assert parse_probe(path, probe(fmt={"size": None})).size_bytes == 123
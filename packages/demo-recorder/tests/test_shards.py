@@ -0,0 +1,71 @@
+"""shard_tasks: grouping by route or id prefix, balance across shards, order."""
+
+import pytest
+
+from demo_recorder.shards import shard_tasks
+
+
+def task(task_id: str, description: str = "Click id=go") -> dict:
+    return {"id": task_id, "description": description}
+
+
+def ids(shards: list[list[dict]]) -> list[list[str]]:
+    return [[t["id"] for t in shard] for shard in shards]
+
+
+def test_route_groups_keep_follow_up_tasks():
+    tasks = [
+        task("1", "Navigate to /login. Type admin into id=user."),
+        task("2", "Click id=submit."),                  # no Navigate: stays with /login
+        task("3", "Navigate to /settings. Click id=theme."),
+        task("4", "Confirm id=saved is visible."),      # stays with /settings
+    ]
+    assert ids(shard_tasks(tasks, 2)) == [["1", "2"], ["3", "4"]]
+
+
+def test_full_urls_group_by_path():
+    tasks = [
+        task("1", "Navigate to http://localhost:3000/login."),
+        task("2", "Navigate to /about."),
+        task("3", "Navigate to http://localhost:3000/login?next=/. Click id=go."),
+    ]
+    assert ids(shard_tasks(tasks, 2)) == [["1", "3"], ["2"]]
+
+
+def test_id_prefix_groups():
+    tasks = [task("auth-1"), task("cart-1"), task("auth-2"), task("cart-2"), task("home")]
+    assert ids(shard_tasks(tasks, 3, group_by="id")) == [["auth-1", "auth-2"], ["cart-1", "cart-2"], ["home"]]
+
+
+@pytest.mark.parametrize(
+    ("sizes", "shards", "loads"),
+    [
+        ([4, 1, 1, 1, 1], 2, [4, 4]),      # the big group alone, the small ones together
+        ([3, 3, 2, 2], 2, [5, 5]),
+        ([1, 1, 1, 1, 1, 1], 3, [2, 2, 2]),
+        ([2, 2], 5, [2, 2]),               # never more shards than groups
+        ([5], 3, [5]),
+    ],
+)
+def test_groups_are_balanced_by_task_count(sizes, shards, loads):
+    tasks = [task(f"g{g}-{i}") for g, size in enumerate(sizes) for i in range(1, size + 1)]
+    result = shard_tasks(tasks, shards, group_by="id")
+    assert sorted(len(shard) for shard in result) == sorted(loads)
+    for shard in result:   # whole groups only
+        for group in {t["id"].split("-")[0] for t in shard}:
+            assert sum(t["id"].startswith(group + "-") for t in shard) == sizes[int(group[1:])]
+
+
+def test_task_order_within_and_across_shards():
+    tasks = [task("b-1"), task("a-1"), task("b-2"), task("c-1"), task("a-2"), task("b-3")]
+    result = ids(shard_tasks(tasks, 2, group_by="id"))
+    position = {t["id"]: n for n, t in enumerate(tasks)}
+    for shard in result:
+        assert [position[i] for i in shard] == sorted(position[i] for i in shard)
+    assert [position[shard[0]] for shard in result] == sorted(position[shard[0]] for shard in result)
+    assert sorted(i for shard in result for i in shard) == sorted(position)
+
+
+def test_unknown_grouping():
+    with pytest.raises(ValueError, match="Unknown grouping"):
+        shard_tasks([task("1")], 2, group_by="page")
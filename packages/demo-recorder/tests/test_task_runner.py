@@ -0,0 +1,42 @@
+"""roll_up_verdicts: one verdict for a run made of agent chunks."""
+
+import pytest
+
+from demo_recorder.task_runner import roll_up_verdicts
+
+
+def tasks(*ids: str) -> list[dict]:
+    return [{"id": i} for i in ids]
+
+
+@pytest.mark.parametrize(
+    ("chunks", "skipped", "verdict"),
+    [
+        ([(tasks("1"), "pass", "ok")], None, "pass"),
+        ([(tasks("1"), "fail", "no")], None, "fail"),
+        ([(tasks("1"), "unverified", "replayed")], None, "unverified"),
+        ([(tasks("1", "2"), "pass", "ok"), (tasks("3"), "pass", "ok")], None, "pass"),
+        ([(tasks("1"), "pass", "ok"), (tasks("2"), "unverified", "replayed")], None, "unverified"),
+        ([(tasks("1"), "unverified", "replayed"), (tasks("2"), "fail", "no")], None, "fail"),
+        ([(tasks("1"), "pass", "ok"), (tasks("2"), "error", "crashed")], None, "fail"),
+        # Tasks left unrun after a failure fail the run even if every chunk passed
+        ([(tasks("1"), "pass", "ok")], tasks("2", "3"), "fail"),
+        ([(tasks("1"), "unverified", "replayed")], tasks("2"), "fail"),
+    ],
+)
+def test_roll_up_verdict(chunks, skipped, verdict):
+    assert roll_up_verdicts(chunks, skipped)[0] == verdict
+
+
+def test_reasoning_names_each_chunk_on_one_line():
+    _, reasoning = roll_up_verdicts(
+        [(tasks("1", "2"), "pass", "both done\n"), (tasks("3"), "fail", "  button missing")],
+        tasks("4", "5"),
+    )
+    assert reasoning == (
+        "[1..2] pass: both done | [3] fail: button missing | [4..5] not run after an earlier failure"
+    )
+
+
+def test_a_single_chunk_keeps_its_reasoning():
+    assert roll_up_verdicts([(tasks("1", "2"), "pass", "all good")]) == ("pass", "all good")
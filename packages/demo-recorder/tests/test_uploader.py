@@ -0,0 +1,255 @@
+"""Uploads, HLS segment uploads and the spool against local_convex, with injected faults."""
+
+import asyncio
+import gc
+import hashlib
+import json
+
+import httpx
+import pytest
+
+from demo_recorder import dedup, uploader
+from demo_recorder.capture import read_segments
+from demo_recorder.local_convex import LocalConvex
+from demo_recorder.spool import UploadSpool, upload_or_spool
+from demo_recorder.uploader import (
+    RetryPolicy,
+    SegmentUploader,
+    convex_client,
+    upload_blob,
+    upload_video,
+)
+
+NO_WAIT = RetryPolicy(attempts=3, base_sec=0.0)
+
+
+def run(start):
+    """Run start() on a fresh event loop (convex_client() is per loop)."""
+    async def main():
+        try:
+            return await start()
+        finally:
+            await uploader.close_convex_client()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    # The process-wide dedup index and retry policy, on a scratch file / no backoff
+    monkeypatch.setattr(dedup.ARTIFACT_INDEX, "path", tmp_path / "artifacts.db")
+    monkeypatch.setattr(dedup.ARTIFACT_INDEX, "_ready", False)
+    monkeypatch.setattr(uploader.DEFAULT_RETRY, "base_sec", 0.0)
+
+
+@pytest.fixture
+def convex(tmp_path):
+    with LocalConvex(store_dir=tmp_path / "store") as server:
+        yield server
+
+
+def video(tmp_path, content: bytes = b"\x00fmp4" * 50_000):
+    path = tmp_path / "out" / "recording.mp4"
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def fetch(url: str) -> bytes:
+    return httpx.get(url).content
+
+
+# ── Whole-file upload ──────────────────────────────────────────────────
+
+def test_upload_streams_the_file_and_returns_its_url(tmp_path, convex):
+    path = video(tmp_path)
+    uploaded = run(lambda: upload_video(convex.url, path))
+    assert uploaded.bytes == path.stat().st_size
+    assert fetch(uploaded.url) == path.read_bytes()
+    assert convex.stats.calls == {"runs:generateUploadUrl": 1, "upload": 1, "runs:getStorageUrl": 1}
+
+
+def test_identical_content_is_not_sent_twice(tmp_path, convex):
+    path = video(tmp_path)
+    sha256 = hashlib.sha256(path.read_bytes()).hexdigest()
+    first = run(lambda: upload_video(convex.url, path, sha256=sha256))
+    second = run(lambda: upload_video(convex.url, path, sha256=sha256))
+    assert (first.deduplicated, second.deduplicated) == (False, True)
+    assert second.storage_id == first.storage_id and second.bytes == 0
+    assert convex.stats.blobs == 1
+
+
+def test_a_hit_whose_blob_is_gone_uploads_again(tmp_path, convex):
+    first = run(lambda: upload_blob(convex_client(), convex.url, b"events", "application/json"))
+    convex.delete(first.storage_id)
+    again = run(lambda: upload_blob(convex_client(), convex.url, b"events", "application/json"))
+    assert not again.deduplicated and again.storage_id != first.storage_id
+    assert dedup.ARTIFACT_INDEX.lookup(convex.url, again.sha256) == (again.storage_id, again.url)
+
+
+# ── Retries and faults ─────────────────────────────────────────────────
+
+def test_transient_5xx_is_retried(tmp_path, convex):
+    convex.faults.fail_first = 2
+    uploaded = run(lambda: upload_video(convex.url, video(tmp_path), retry=NO_WAIT))
+    assert uploaded is not None
+    assert convex.stats.failures_injected == 2
+    assert convex.stats.blobs == 1
+
+
+def test_gives_up_after_the_last_attempt(tmp_path, convex):
+    convex.faults.fail_rate = 1.0
+    assert run(lambda: upload_video(convex.url, video(tmp_path), retry=NO_WAIT)) is None
+    assert convex.stats.calls["runs:generateUploadUrl"] == NO_WAIT.attempts
+    assert convex.stats.blobs == 0
+
+
+def test_client_errors_are_not_retried(tmp_path, convex):
+    convex.faults.fail_first, convex.faults.fail_status = 1, 400
+    assert run(lambda: upload_video(convex.url, video(tmp_path), retry=NO_WAIT)) is None
+    assert convex.stats.calls == {"runs:generateUploadUrl": 1}
+
+
+def test_a_used_upload_url_is_replaced_by_a_fresh_one(tmp_path, convex):
+    async def upload_twice_with_one_url():
+        client = convex_client()
+        url = await uploader.generate_upload_url(client, convex.url)
+        await upload_blob(client, convex.url, b"first", "text/plain", upload_url=url, retry=NO_WAIT)
+        return await upload_blob(client, convex.url, b"second", "text/plain", upload_url=url, retry=NO_WAIT)
+
+    uploaded = run(upload_twice_with_one_url)
+    assert fetch(uploaded.url) == b"second"
+    assert convex.stats.calls["upload"] == 3   # the stale URL, then a fresh one
+
+
+def test_slow_responses_time_out_and_are_retried(tmp_path, convex):
+    convex.faults.latency_ms = 300
+
+    async def upload_with_short_timeout():
+        async with httpx.AsyncClient(timeout=0.1) as client:
+            return await upload_blob(client, convex.url, b"slow", "text/plain", retry=NO_WAIT)
+
+    assert run(upload_with_short_timeout) is None
+    assert convex.stats.calls["runs:generateUploadUrl"] == NO_WAIT.attempts
+
+
+def test_latency_and_bandwidth_only_slow_the_upload(tmp_path, convex):
+    convex.faults.latency_ms, convex.faults.bandwidth_mbps = 50, 40
+    path = video(tmp_path, b"x" * 250_000)   # 2 Mbit at 40 Mbit/s: ~50 ms
+    uploaded = run(lambda: upload_video(convex.url, path))
+    assert uploaded.bytes == 250_000
+    assert uploaded.seconds >= 0.1   # the body's transfer plus the reply's latency
+
+
+# ── HLS segments ───────────────────────────────────────────────────────
+
+def segments_dir(tmp_path, spans: list[int]):
+    directory = tmp_path / "out" / "segments"
+    directory.mkdir(parents=True)
+    for span, count in enumerate(spans):
+        lines = ["#EXTM3U"]
+        for n in range(count):
+            name = f"span{span:03d}_{n:05d}.ts"
+            (directory / name).write_bytes(f"segment {span}/{n}".encode() * 100)
+            lines += ["#EXTINF:2.000000,", name]
+        (directory / f"span{span:03d}.m3u8").write_text("\n".join(lines) + "\n")
+    return directory
+
+
+async def commit(convex_url: str, directory, uploaded=None) -> tuple[SegmentUploader, str | None]:
+    segments = SegmentUploader(convex_url, lambda: read_segments(directory), uploaded=uploaded)
+    return segments, await segments.finish()
+
+
+def test_segments_and_playlist_are_committed(tmp_path, convex):
+    directory = segments_dir(tmp_path, [2, 1])
+    segments, playlist_url = run(lambda: commit(convex.url, directory))
+    playlist = fetch(playlist_url).decode()
+    assert playlist.count("#EXTINF:2.000000,") == 3
+    assert "#EXT-X-DISCONTINUITY" in playlist   # between the two spans
+    stored = [line for line in playlist.splitlines() if line.startswith("http")]
+    assert stored == [segments.uploaded[seg.path] for seg in read_segments(directory)]
+    assert segments.stats()["segments"] == 3
+
+
+def test_segments_already_stored_are_not_sent_again(tmp_path, convex):
+    directory = segments_dir(tmp_path, [3])
+    first, *rest = read_segments(directory)
+    _, playlist_url = run(lambda: commit(convex.url, directory, uploaded={first.path: "http://stored/0"}))
+    playlist = fetch(playlist_url).decode()
+    assert "http://stored/0" in playlist
+    assert convex.stats.calls["upload"] == len(rest) + 1   # the missing segments and the playlist
+
+
+def test_no_playlist_while_a_segment_is_missing(tmp_path, convex):
+    directory = segments_dir(tmp_path, [2])
+    convex.faults.fail_rate = 1.0
+    segments, playlist_url = run(lambda: commit(convex.url, directory))
+    assert playlist_url is None
+    assert segments.uploaded == {}
+
+
+# ── Spool ──────────────────────────────────────────────────────────────
+
+def test_failed_upload_is_spooled_then_drained(tmp_path, convex, capsys):
+    path = video(tmp_path)
+    spool = UploadSpool(tmp_path / "spool")
+    convex.faults.fail_rate = 1.0
+    url, _ = run(lambda: upload_or_spool(convex.url, path, path.parent, spool=spool))
+    assert url is None and "UPLOAD_SPOOLED:" in capsys.readouterr().out
+    (entry,) = spool.entries()
+    assert (entry.kind, entry.path) == ("file", str(path))
+    assert entry.sha256 == hashlib.sha256(path.read_bytes()).hexdigest()
+
+    convex.faults.fail_rate = 0.0
+    ((drained, url),) = run(spool.drain)
+    assert drained.id == entry.id and fetch(url) == path.read_bytes()
+    assert spool.entries() == []
+    assert json.loads((path.parent / "upload.json").read_text())["video_url"] == url
+
+
+def test_a_failed_drain_keeps_the_entry(tmp_path, convex):
+    path = video(tmp_path)
+    spool = UploadSpool(tmp_path / "spool")
+    convex.faults.fail_rate = 1.0
+    run(lambda: upload_or_spool(convex.url, path, path.parent, spool=spool))
+    run(spool.drain)
+    (entry,) = spool.entries()
+    assert entry.attempts == 1 and entry.last_error
+
+
+def test_upload_or_spool_reports_dedup(tmp_path, convex, capsys):
+    path = video(tmp_path)
+    spool = UploadSpool(tmp_path / "spool")
+    run(lambda: upload_or_spool(convex.url, path, path.parent, spool=spool))
+    url, stats = run(lambda: upload_or_spool(convex.url, path, path.parent, spool=spool))
+    out = capsys.readouterr().out
+    assert "UPLOAD_DEDUP: miss" in out and "UPLOAD_DEDUP: hit" in out
+    assert stats["dedup"] == "hit" and fetch(url) == path.read_bytes()
+    assert spool.entries() == []
+
+
+# ── Upload URL prefetch ────────────────────────────────────────────────
+
+def test_a_failed_prefetch_never_surfaces_as_unretrieved(tmp_path, convex):
+    convex.faults.fail_rate = 1.0
+    unhandled = []
+
+    async def prefetch_and_drop():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        prefetch = uploader.UploadUrlPrefetch(convex.url)
+        await asyncio.sleep(0.3)   # the prefetch fails; nobody calls take()
+        del prefetch
+        gc.collect()
+
+    run(prefetch_and_drop)
+    assert unhandled == []
+
+
+def test_take_reports_a_failed_prefetch_as_no_url(tmp_path, convex):
+    convex.faults.fail_rate = 1.0
+
+    async def take():
+        return await uploader.UploadUrlPrefetch(convex.url).take()
+
+    assert run(take) is None